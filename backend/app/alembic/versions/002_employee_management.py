@@ -16,76 +16,122 @@ branch_labels = None
 depends_on = None
 
 
+# Strings are TEXT rather than VARCHAR(n): Postgres stores them identically,
+# but changing a VARCHAR length rewrites the table under an exclusive lock.
+# Real length limits are CHECK constraints, which can be swapped without one.
+# Timestamps stay naive UTC (the app writes datetime.utcnow() throughout);
+# created_at/updated_at default server-side so raw inserts need not send them.
+
+
 def upgrade() -> None:
+    # gen_random_uuid() lets the database fill primary keys server-side
+    op.execute('CREATE EXTENSION IF NOT EXISTS pgcrypto')
+
     # Create department table
     op.create_table(
         'department',
-        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
-        sa.Column('name', sa.String(length=100), nullable=False),
-        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
         sa.Column('is_active', sa.Boolean(), nullable=False, server_default='true'),
-        sa.Column('created_at', sa.DateTime(), nullable=False),
-        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
         sa.PrimaryKeyConstraint('id')
     )
     
-    # Add indexes for department
-    op.create_index('ix_department_name', 'department', ['name'])
-    
     # Create employee table
     op.create_table(
         'employee',
-        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
-        sa.Column('employee_id', sa.String(length=20), nullable=False),
-        sa.Column('cnic', sa.String(length=15), nullable=False),
-        sa.Column('first_name', sa.String(length=100), nullable=False),
-        sa.Column('last_name', sa.String(length=100), nullable=False),
-        sa.Column('phone', sa.String(length=20), nullable=False),
-        sa.Column('address', sa.String(length=500), nullable=True),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('employee_id', sa.Text(), nullable=False),
+        sa.Column('cnic', sa.Text(), nullable=False),
+        sa.Column('first_name', sa.Text(), nullable=False),
+        sa.Column('last_name', sa.Text(), nullable=False),
+        sa.Column('phone', sa.Text(), nullable=False),
+        sa.Column('address', sa.Text(), nullable=True),
         sa.Column('date_of_birth', sa.DateTime(), nullable=True),
         sa.Column('hire_date', sa.DateTime(), nullable=False),
         sa.Column('salary', sa.Float(), nullable=True),
         sa.Column('is_active', sa.Boolean(), nullable=False, server_default='true'),
-        sa.Column('emergency_contact_name', sa.String(length=100), nullable=True),
-        sa.Column('emergency_contact_phone', sa.String(length=20), nullable=True),
+        sa.Column('emergency_contact_name', sa.Text(), nullable=True),
+        sa.Column('emergency_contact_phone', sa.Text(), nullable=True),
         sa.Column('department_id', postgresql.UUID(as_uuid=True), nullable=False),
         sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True),
-        sa.Column('created_at', sa.DateTime(), nullable=False),
-        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
         sa.ForeignKeyConstraint(['department_id'], ['department.id'], ondelete='CASCADE'),
         sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='SET NULL'),
         sa.PrimaryKeyConstraint('id'),
         sa.UniqueConstraint('employee_id'),
-        sa.UniqueConstraint('cnic')
+        sa.UniqueConstraint('cnic'),
+        sa.CheckConstraint('length(employee_id) <= 20', name='ck_employee_employee_id_len'),
+        sa.CheckConstraint('length(cnic) <= 15', name='ck_employee_cnic_len'),
     )
     
-    # Add indexes for employee
-    op.create_index('ix_employee_employee_id', 'employee', ['employee_id'])
-    op.create_index('ix_employee_cnic', 'employee', ['cnic'])
-    op.create_index('ix_employee_department_id', 'employee', ['department_id'])
-    op.create_index('ix_employee_user_id', 'employee', ['user_id'])
-    
-    # Create attendance table
+    # Create attendance table, range-partitioned by month on check_in_time so
+    # date-filtered queries prune to a single partition and old months can be
+    # detached cheaply. The partition key must be part of the primary key.
+    # Monthly partitions are created ahead of time by
+    # app.core.db.ensure_attendance_partitions; the default partition only
+    # catches rows outside the months created so far.
     op.create_table(
         'attendance',
-        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('gen_random_uuid()')),
         sa.Column('check_in_time', sa.DateTime(), nullable=False),
         sa.Column('check_out_time', sa.DateTime(), nullable=True),
-        sa.Column('device_id', sa.String(length=100), nullable=True),
+        sa.Column('device_id', sa.Text(), nullable=True),
         sa.Column('employee_id', postgresql.UUID(as_uuid=True), nullable=False),
-        sa.Column('created_at', sa.DateTime(), nullable=False),
-        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
         sa.ForeignKeyConstraint(['employee_id'], ['employee.id'], ondelete='CASCADE'),
-        sa.PrimaryKeyConstraint('id')
+        sa.PrimaryKeyConstraint('id', 'check_in_time'),
+        postgresql_partition_by='RANGE (check_in_time)',
+    )
+    # Storage parameters can only be set on the partitions, not the parent.
+    # A low vacuum threshold keeps the visibility map current so lookups
+    # through the covering index below stay index-only; fillfactor leaves
+    # room on each page for HOT updates when check_out_time is set.
+    op.execute(
+        'CREATE TABLE attendance_default PARTITION OF attendance DEFAULT '
+        'WITH (autovacuum_vacuum_scale_factor = 0.05, fillfactor = 80)'
+    )
+
+    # Partitioned tables don't support CREATE INDEX CONCURRENTLY; attendance
+    # was created empty above, so build its indexes in the transaction.
+    # "Latest check-in for employee X" is answered from this index alone.
+    op.create_index(
+        'ix_attendance_employee_id', 'attendance',
+        ['employee_id', sa.text('check_in_time DESC')],
+        postgresql_include=['check_out_time'],
+    )
+    # check_in_time grows with insertion order, so a BRIN summary is a
+    # fraction of the size of a B-tree and costs O(1) per insert
+    op.create_index(
+        'ix_attendance_check_in_time', 'attendance', ['check_in_time'],
+        postgresql_using='brin', postgresql_with={'pages_per_range': 32},
+    )
+    # Only open sessions (not yet checked out): "who is checked in now" reads
+    # a tiny index, and rows leave it on check-out
+    op.create_index(
+        'ix_attendance_open', 'attendance',
+        ['employee_id', sa.text('check_in_time DESC')],
+        postgresql_where=sa.text('check_out_time IS NULL'),
     )
     
-    # Add indexes for attendance
-    op.create_index('ix_attendance_employee_id', 'attendance', ['employee_id'])
-    op.create_index('ix_attendance_check_in_time', 'attendance', ['check_in_time'])
+    # Build all indexes after the tables exist, outside the migration
+    # transaction: CREATE INDEX CONCURRENTLY does not block writers when
+    # this revision is re-applied against populated tables
+    with op.get_context().autocommit_block():
+        op.create_index('ix_department_name', 'department', ['name'], postgresql_concurrently=True)
+        op.create_index('ix_employee_employee_id', 'employee', ['employee_id'], postgresql_concurrently=True)
+        op.create_index('ix_employee_cnic', 'employee', ['cnic'], postgresql_concurrently=True)
+        op.create_index('ix_employee_department_id', 'employee', ['department_id'], postgresql_concurrently=True)
+        op.create_index('ix_employee_user_id', 'employee', ['user_id'], postgresql_concurrently=True)
 
 
 def downgrade() -> None:
     # Drop attendance table
+    op.drop_index('ix_attendance_open', table_name='attendance')
     op.drop_index('ix_attendance_check_in_time', table_name='attendance')
     op.drop_index('ix_attendance_employee_id', table_name='attendance')
     op.drop_table('attendance')
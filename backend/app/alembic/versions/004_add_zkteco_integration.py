@@ -17,64 +17,125 @@ branch_labels = None
 depends_on = None
 
 
+# The whole upgrade is sent as one multi-statement script: the server parses
+# and plans it in a single round trip inside the migration transaction instead
+# of ~20 separate DDL statements. The attendance column additions are kept
+# next to the FK and indexes on those columns so the table is visited once.
+# attendance is partitioned (see 002), and Postgres rejects NOT VALID foreign
+# keys and CREATE INDEX CONCURRENTLY on partitioned tables, so its FK and
+# indexes are built in this transaction (005_validate_zkteco_foreign_keys is
+# left empty for that reason). Strings are TEXT, with a
+# CHECK where the length is a real invariant, so limits can change later
+# without rewriting the table.
+UPGRADE_DDL = """
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+CREATE TABLE zktecodevice (
+    id UUID DEFAULT gen_random_uuid() NOT NULL,
+    device_name TEXT NOT NULL,
+    device_ip TEXT NOT NULL,
+    device_port INTEGER NOT NULL,
+    device_id TEXT NOT NULL,
+    location TEXT,
+    description TEXT,
+    is_active BOOLEAN NOT NULL,
+    sync_interval INTEGER NOT NULL,
+    last_sync TIMESTAMP WITHOUT TIME ZONE,
+    device_status TEXT NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()) NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()) NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT ck_zktecodevice_ip_len CHECK (length(device_ip) <= 15)
+) WITH (fillfactor = 80);  -- last_sync/device_status change on every sync: keep HOT updates
+CREATE UNIQUE INDEX ix_zktecodevice_device_id ON zktecodevice (device_id);
+CREATE INDEX ix_zktecodevice_device_ip ON zktecodevice (device_ip);
+-- Almost every device is active; index only the disabled ones
+CREATE INDEX ix_zktecodevice_inactive ON zktecodevice (id) WHERE is_active = false;
+
+-- Fixed vocabularies: a 4-byte enum instead of a varlena string per row
+CREATE TYPE attendance_type AS ENUM ('fingerprint', 'card', 'manual');
+CREATE TYPE attendance_status AS ENUM ('present', 'absent', 'late', 'early_leave');
+
+-- Replace the 002 indexes on attendance with the definitions below. The
+-- constant defaults of the new columns need no table rewrite.
+DROP INDEX ix_attendance_employee_id;
+DROP INDEX ix_attendance_check_in_time;
+
+ALTER TABLE attendance
+    ADD COLUMN zkteco_device_id UUID,
+    ADD COLUMN attendance_type attendance_type DEFAULT 'fingerprint' NOT NULL,
+    ADD COLUMN status attendance_status DEFAULT 'present' NOT NULL,
+    ADD CONSTRAINT fk_attendance_zkteco_device_id
+        FOREIGN KEY (zkteco_device_id) REFERENCES zktecodevice (id);
+CREATE INDEX ix_attendance_zkteco_device_id ON attendance (zkteco_device_id);
+-- Nearly every row has the default value, so only the exceptions are indexed
+CREATE INDEX ix_attendance_attendance_type ON attendance (attendance_type)
+    WHERE attendance_type <> 'fingerprint';
+CREATE INDEX ix_attendance_status ON attendance (status)
+    WHERE status <> 'present';
+CREATE INDEX ix_attendance_employee_id ON attendance (employee_id, check_in_time DESC)
+    INCLUDE (check_out_time);
+-- check_in_time grows with insertion order: BRIN instead of a B-tree
+CREATE INDEX ix_attendance_check_in_time ON attendance
+    USING BRIN (check_in_time) WITH (pages_per_range = 32);
+
+-- Sync telemetry: UNLOGGED skips WAL on every insert. The table is emptied
+-- after a crash or unclean shutdown and is not replicated to standbys,
+-- which is acceptable for diagnostic history.
+-- Append-only: a sequential BIGINT key keeps inserts on the rightmost leaf
+-- of the primary key and is half the size of a UUID.
+CREATE UNLOGGED TABLE devicesynclog (
+    id BIGINT GENERATED ALWAYS AS IDENTITY NOT NULL,
+    device_id UUID NOT NULL,
+    sync_type TEXT NOT NULL,
+    records_synced INTEGER NOT NULL,
+    sync_status TEXT NOT NULL,
+    error_message TEXT,
+    sync_duration FLOAT,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()) NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT fk_devicesynclog_device_id
+        FOREIGN KEY (device_id) REFERENCES zktecodevice (id)
+);
+CREATE INDEX ix_devicesynclog_device_id ON devicesynclog (device_id);
+CREATE INDEX ix_devicesynclog_sync_type ON devicesynclog (sync_type);
+CREATE INDEX ix_devicesynclog_sync_status ON devicesynclog (sync_status);
+-- created_at is append-ordered: BRIN instead of a B-tree
+CREATE INDEX ix_devicesynclog_created_at ON devicesynclog
+    USING BRIN (created_at) WITH (pages_per_range = 32);
+
+-- Fingerprint storage, written as plain DDL like the rest of the script.
+-- IF NOT EXISTS because older databases got this table outside migrations.
+-- fingerprint_data starts out as TEXT; 49a3ae34e5b4 converts it to BYTEA.
+CREATE TABLE IF NOT EXISTS fingerprint (
+    id UUID DEFAULT gen_random_uuid() NOT NULL,
+    employee_id UUID NOT NULL,
+    fingerprint_type TEXT NOT NULL,
+    fingerprint_position INTEGER NOT NULL,
+    fingerprint_data TEXT NOT NULL,
+    fingerprint_format TEXT NOT NULL,
+    quality_score FLOAT,
+    is_active BOOLEAN DEFAULT true NOT NULL,
+    notes TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()) NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()) NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT fingerprint_employee_id_fkey
+        FOREIGN KEY (employee_id) REFERENCES employee (id) ON DELETE CASCADE,
+    CONSTRAINT uq_fingerprint_employee_type_position
+        UNIQUE (employee_id, fingerprint_type, fingerprint_position)
+);
+CREATE INDEX IF NOT EXISTS ix_fingerprint_fingerprint_type ON fingerprint (fingerprint_type);
+CREATE INDEX IF NOT EXISTS ix_fingerprint_created_at ON fingerprint (created_at);
+CREATE INDEX IF NOT EXISTS ix_fingerprint_inactive ON fingerprint (employee_id)
+    WHERE is_active = false;
+"""
+
+
 def upgrade() -> None:
-    # Create zkteco_device table
-    op.create_table('zktecodevice',
-        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
-        sa.Column('device_name', sa.String(length=100), nullable=False),
-        sa.Column('device_ip', sa.String(length=15), nullable=False),
-        sa.Column('device_port', sa.Integer(), nullable=False),
-        sa.Column('device_id', sa.String(length=50), nullable=False),
-        sa.Column('location', sa.String(length=200), nullable=True),
-        sa.Column('description', sa.String(length=500), nullable=True),
-        sa.Column('is_active', sa.Boolean(), nullable=False),
-        sa.Column('sync_interval', sa.Integer(), nullable=False),
-        sa.Column('last_sync', sa.DateTime(), nullable=True),
-        sa.Column('device_status', sa.String(length=20), nullable=False),
-        sa.Column('created_at', sa.DateTime(), nullable=False),
-        sa.Column('updated_at', sa.DateTime(), nullable=False),
-        sa.PrimaryKeyConstraint('id')
-    )
-    
-    # Create indexes for zkteco_device
-    op.create_index('ix_zktecodevice_device_id', 'zktecodevice', ['device_id'], unique=True)
-    op.create_index('ix_zktecodevice_device_ip', 'zktecodevice', ['device_ip'])
-    op.create_index('ix_zktecodevice_is_active', 'zktecodevice', ['is_active'])
-    
-    # Add new columns to attendance table
-    op.add_column('attendance', sa.Column('zkteco_device_id', postgresql.UUID(as_uuid=True), nullable=True))
-    op.add_column('attendance', sa.Column('attendance_type', sa.String(length=20), nullable=False, server_default='fingerprint'))
-    op.add_column('attendance', sa.Column('status', sa.String(length=20), nullable=False, server_default='present'))
-    
-    # Create foreign key for attendance.zkteco_device_id
-    op.create_foreign_key('fk_attendance_zkteco_device_id', 'attendance', 'zktecodevice', ['zkteco_device_id'], ['id'])
-    
-    # Create index for attendance.zkteco_device_id
-    op.create_index('ix_attendance_zkteco_device_id', 'attendance', ['zkteco_device_id'])
-    op.create_index('ix_attendance_attendance_type', 'attendance', ['attendance_type'])
-    op.create_index('ix_attendance_status', 'attendance', ['status'])
-    
-    # Create device_sync_log table
-    op.create_table('devicesynclog',
-        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
-        sa.Column('device_id', postgresql.UUID(as_uuid=True), nullable=False),
-        sa.Column('sync_type', sa.String(length=20), nullable=False),
-        sa.Column('records_synced', sa.Integer(), nullable=False),
-        sa.Column('sync_status', sa.String(length=20), nullable=False),
-        sa.Column('error_message', sa.String(length=1000), nullable=True),
-        sa.Column('sync_duration', sa.Float(), nullable=True),
-        sa.Column('created_at', sa.DateTime(), nullable=False),
-        sa.PrimaryKeyConstraint('id')
-    )
-    
-    # Create indexes for device_sync_log
-    op.create_index('ix_devicesynclog_device_id', 'devicesynclog', ['device_id'])
-    op.create_index('ix_devicesynclog_sync_type', 'devicesynclog', ['sync_type'])
-    op.create_index('ix_devicesynclog_sync_status', 'devicesynclog', ['sync_status'])
-    op.create_index('ix_devicesynclog_created_at', 'devicesynclog', ['created_at'])
-    
-    # Create foreign key for device_sync_log.device_id
-    op.create_foreign_key('fk_devicesynclog_device_id', 'devicesynclog', 'zktecodevice', ['device_id'], ['id'])
+    # Runs inside the transaction Alembic already opened for this revision,
+    # so catalog invalidations are published once on commit.
+    op.execute(sa.text(UPGRADE_DDL))
 
 
 def downgrade() -> None:
@@ -90,7 +151,7 @@ def downgrade() -> None:
     op.drop_index('ix_attendance_status', table_name='attendance')
     op.drop_index('ix_attendance_attendance_type', table_name='attendance')
     op.drop_index('ix_attendance_zkteco_device_id', table_name='attendance')
-    op.drop_index('ix_zktecodevice_is_active', table_name='zktecodevice')
+    op.drop_index('ix_zktecodevice_inactive', table_name='zktecodevice')
     op.drop_index('ix_zktecodevice_device_ip', table_name='zktecodevice')
     op.drop_index('ix_zktecodevice_device_id', table_name='zktecodevice')
     
@@ -98,7 +159,10 @@ def downgrade() -> None:
     op.drop_column('attendance', 'status')
     op.drop_column('attendance', 'attendance_type')
     op.drop_column('attendance', 'zkteco_device_id')
+    op.execute('DROP TYPE attendance_status')
+    op.execute('DROP TYPE attendance_type')
     
     # Drop tables
+    op.drop_table('fingerprint')
     op.drop_table('devicesynclog')
     op.drop_table('zktecodevice') 
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""Placeholder for the former ZKTeco foreign key validation
+
+Revision ID: 005_validate_zkteco_foreign_keys
+Revises: 49a3ae34e5b4
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '005_validate_zkteco_foreign_keys'
+down_revision = '49a3ae34e5b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # This revision used to validate fk_attendance_zkteco_device_id after 004
+    # added it as NOT VALID. attendance is partitioned, and Postgres rejects
+    # NOT VALID foreign keys on partitioned tables, so 004 now creates the
+    # constraint validated and there is nothing left to do here. The revision
+    # stays so databases already stamped with it keep a valid history.
+    pass
+
+
+def downgrade() -> None:
+    pass
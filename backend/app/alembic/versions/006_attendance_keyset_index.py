@@ -0,0 +1,30 @@
+"""Index attendance for keyset pagination
+
+Revision ID: 006_attendance_keyset_index
+Revises: 005_validate_zkteco_foreign_keys
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_attendance_keyset_index'
+down_revision = '005_validate_zkteco_foreign_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves ORDER BY check_in_time DESC, id DESC with a
+    # (check_in_time, id) < cursor bound, so each page is a short range scan.
+    # attendance is partitioned, which rules out CREATE INDEX CONCURRENTLY.
+    op.create_index(
+        'ix_attendance_check_in_time_id', 'attendance',
+        [sa.text('check_in_time DESC'), sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_check_in_time_id', table_name='attendance')
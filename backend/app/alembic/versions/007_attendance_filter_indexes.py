@@ -0,0 +1,37 @@
+"""Index attendance by employee and by device over time
+
+Revision ID: 007_attendance_filter_indexes
+Revises: 006_attendance_keyset_index
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_attendance_filter_indexes'
+down_revision = '006_attendance_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 49a3ae34e5b4 dropped the per-column indexes from 004, leaving the
+    # employee_id and zkteco_device_id filters of get_attendances to seq scans.
+    # Both lead with the equality column and end in the check_in_time range.
+    # attendance is partitioned, which rules out CREATE INDEX CONCURRENTLY.
+    op.create_index(
+        'ix_attendance_employee_id_check_in_time', 'attendance',
+        ['employee_id', sa.text('check_in_time DESC')],
+        postgresql_include=['check_out_time'],
+    )
+    op.create_index(
+        'ix_attendance_zkteco_device_id_check_in_time', 'attendance',
+        ['zkteco_device_id', sa.text('check_in_time DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_zkteco_device_id_check_in_time', table_name='attendance')
+    op.drop_index('ix_attendance_employee_id_check_in_time', table_name='attendance')
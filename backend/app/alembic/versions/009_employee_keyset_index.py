@@ -0,0 +1,29 @@
+"""Index employees for keyset pagination
+
+Revision ID: 009_employee_keyset_index
+Revises: 008_attendance_status_index
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_employee_keyset_index'
+down_revision = '008_attendance_status_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves ORDER BY created_at DESC, id DESC with a (created_at, id) < cursor
+    # bound for the employee list. Devices are few enough to sort in memory.
+    op.create_index(
+        'ix_employee_created_at_id', 'employee',
+        [sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_employee_created_at_id', table_name='employee')
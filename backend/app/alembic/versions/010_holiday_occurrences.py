@@ -0,0 +1,33 @@
+"""Add the holiday_occurrence table
+
+Revision ID: 010_holiday_occurrences
+Revises: 009_employee_keyset_index
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '010_holiday_occurrences'
+down_revision = '009_employee_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filled by app.core.db.ensure_holiday_occurrences, which init_db runs
+    # on every start. The primary key leads with the date for range scans.
+    op.create_table(
+        'holiday_occurrence',
+        sa.Column('occurrence_date', sa.Date(), nullable=False),
+        sa.Column('holiday_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(['holiday_id'], ['holiday.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('occurrence_date', 'holiday_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('holiday_occurrence')
@@ -0,0 +1,43 @@
+"""Cascade employee deletes to attendance and fingerprints
+
+Revision ID: 011_employee_cascade_fks
+Revises: 010_holiday_occurrences
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '011_employee_cascade_fks'
+down_revision = '010_holiday_occurrences'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # crud.delete_employee is a single DELETE and relies on the database to
+    # remove dependent rows, but 49a3ae34e5b4 recreated both foreign keys
+    # without ON DELETE CASCADE. attendance is partitioned, which rules out
+    # adding the constraint as NOT VALID.
+    op.drop_constraint('attendance_employee_id_fkey', 'attendance', type_='foreignkey')
+    op.create_foreign_key(
+        'attendance_employee_id_fkey', 'attendance', 'employee',
+        ['employee_id'], ['id'], ondelete='CASCADE',
+    )
+    op.drop_constraint('fingerprint_employee_id_fkey', 'fingerprint', type_='foreignkey')
+    op.create_foreign_key(
+        'fingerprint_employee_id_fkey', 'fingerprint', 'employee',
+        ['employee_id'], ['id'], ondelete='CASCADE',
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('fingerprint_employee_id_fkey', 'fingerprint', type_='foreignkey')
+    op.create_foreign_key(
+        'fingerprint_employee_id_fkey', 'fingerprint', 'employee', ['employee_id'], ['id'],
+    )
+    op.drop_constraint('attendance_employee_id_fkey', 'attendance', type_='foreignkey')
+    op.create_foreign_key(
+        'attendance_employee_id_fkey', 'attendance', 'employee', ['employee_id'], ['id'],
+    )
@@ -0,0 +1,46 @@
+"""Store the fingerprint image media type in its own column
+
+Revision ID: 012_fingerprint_media_type
+Revises: 011_employee_cascade_fks
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '012_fingerprint_media_type'
+down_revision = '011_employee_cascade_fks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'fingerprint',
+        sa.Column('fingerprint_media_type', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+    )
+    # 49a3ae34e5b4 left the 'data:<media type>;base64,' header in front of
+    # the decoded image bytes; move the media type out and keep the bytes.
+    # The header holds no comma, so the first one ends it.
+    op.execute("""
+        UPDATE fingerprint
+        SET fingerprint_media_type = convert_from(
+                substring(fingerprint_data from 6 for position(','::bytea in fingerprint_data) - 13), 'UTF8'
+            ),
+            fingerprint_data = substring(fingerprint_data from position(','::bytea in fingerprint_data) + 1)
+        WHERE substring(fingerprint_data for 5) = 'data:'::bytea
+          AND position(','::bytea in fingerprint_data) > 13
+          AND substring(fingerprint_data from position(','::bytea in fingerprint_data) - 7 for 7) = ';base64'::bytea
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE fingerprint
+        SET fingerprint_data = convert_to('data:' || fingerprint_media_type || ';base64,', 'UTF8') || fingerprint_data
+        WHERE fingerprint_media_type IS NOT NULL
+    """)
+    op.drop_column('fingerprint', 'fingerprint_media_type')
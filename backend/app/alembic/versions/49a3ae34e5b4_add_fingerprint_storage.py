@@ -19,14 +19,14 @@ depends_on = None
 
 def upgrade():
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index('ix_attendance_attendance_type', table_name='attendance')
-    op.drop_index('ix_attendance_check_in_time', table_name='attendance')
+    # ix_attendance_attendance_type and ix_attendance_status (kept, see
+    # app.models.Attendance) are partial indexes on the non-default values
+    # ix_attendance_check_in_time (kept, see app.models.Attendance) is BRIN
     op.drop_index('ix_attendance_employee_id', table_name='attendance')
-    op.drop_index('ix_attendance_status', table_name='attendance')
     op.drop_index('ix_attendance_zkteco_device_id', table_name='attendance')
     op.drop_constraint('attendance_employee_id_fkey', 'attendance', type_='foreignkey')
     op.create_foreign_key(None, 'attendance', 'employee', ['employee_id'], ['id'])
-    op.drop_index('ix_devicesynclog_created_at', table_name='devicesynclog')
+    # ix_devicesynclog_created_at (kept, see app.models.DeviceSyncLog) is BRIN
     op.drop_index('ix_devicesynclog_device_id', table_name='devicesynclog')
     op.drop_index('ix_devicesynclog_sync_status', table_name='devicesynclog')
     op.drop_index('ix_devicesynclog_sync_type', table_name='devicesynclog')
@@ -43,41 +43,63 @@ def upgrade():
     op.drop_constraint('employee_user_id_fkey', 'employee', type_='foreignkey')
     op.create_foreign_key(None, 'employee', 'department', ['department_id'], ['id'])
     op.create_foreign_key(None, 'employee', 'user', ['user_id'], ['id'])
+    # Store fingerprint images as raw bytes: base64 data URLs keep their
+    # header, the payload is decoded in place. 012_fingerprint_media_type
+    # moves the header's media type into a column of its own.
     op.alter_column('fingerprint', 'fingerprint_data',
                existing_type=sa.TEXT(),
-               type_=sqlmodel.sql.sqltypes.AutoString(length=1000000),
-               existing_nullable=False)
+               type_=sa.LargeBinary(),
+               existing_nullable=False,
+               postgresql_using=(
+                   "CASE WHEN split_part(fingerprint_data, ',', 1) LIKE 'data:%;base64' "
+                   "THEN convert_to(split_part(fingerprint_data, ',', 1) || ',', 'UTF8')"
+                   " || decode(split_part(fingerprint_data, ',', 2), 'base64') "
+                   "ELSE convert_to(fingerprint_data, 'UTF8') END"
+               ))
     op.drop_index('ix_fingerprint_created_at', table_name='fingerprint')
-    op.drop_index('ix_fingerprint_employee_id', table_name='fingerprint')
+    # uq_fingerprint_employee_type_position (kept, see app.models.Fingerprint)
+    # leads with employee_id, so a separate index on that column is redundant
+    op.drop_index('ix_fingerprint_employee_id', table_name='fingerprint', if_exists=True)
     op.drop_index('ix_fingerprint_fingerprint_type', table_name='fingerprint')
-    op.drop_index('ix_fingerprint_is_active', table_name='fingerprint')
-    op.drop_constraint('uq_fingerprint_employee_type_position', 'fingerprint', type_='unique')
+    op.drop_index('ix_fingerprint_is_active', table_name='fingerprint', if_exists=True)
+    # Almost every fingerprint is active; index only the disabled ones
+    op.create_index(
+        'ix_fingerprint_inactive', 'fingerprint', ['employee_id'],
+        postgresql_where=sa.text('is_active = false'),
+        if_not_exists=True,
+    )
     op.drop_constraint('fingerprint_employee_id_fkey', 'fingerprint', type_='foreignkey')
     op.create_foreign_key(None, 'fingerprint', 'employee', ['employee_id'], ['id'])
-    op.drop_index('ix_zktecodevice_device_id', table_name='zktecodevice')
     op.drop_index('ix_zktecodevice_device_ip', table_name='zktecodevice')
-    op.drop_index('ix_zktecodevice_is_active', table_name='zktecodevice')
-    op.create_unique_constraint(None, 'zktecodevice', ['device_id'])
+    # Promote the existing unique index to the model's unique constraint
+    # rather than building a second B-tree on device_id
+    op.execute(
+        'ALTER TABLE zktecodevice ADD CONSTRAINT zktecodevice_device_id_key '
+        'UNIQUE USING INDEX ix_zktecodevice_device_id'
+    )
     # ### end Alembic commands ###
 
 
 def downgrade():
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_constraint(None, 'zktecodevice', type_='unique')
-    op.create_index('ix_zktecodevice_is_active', 'zktecodevice', ['is_active'], unique=False)
+    op.drop_constraint('zktecodevice_device_id_key', 'zktecodevice', type_='unique')
     op.create_index('ix_zktecodevice_device_ip', 'zktecodevice', ['device_ip'], unique=False)
     op.create_index('ix_zktecodevice_device_id', 'zktecodevice', ['device_id'], unique=True)
     op.drop_constraint(None, 'fingerprint', type_='foreignkey')
     op.create_foreign_key('fingerprint_employee_id_fkey', 'fingerprint', 'employee', ['employee_id'], ['id'], ondelete='CASCADE')
-    op.create_unique_constraint('uq_fingerprint_employee_type_position', 'fingerprint', ['employee_id', 'fingerprint_type', 'fingerprint_position'])
-    op.create_index('ix_fingerprint_is_active', 'fingerprint', ['is_active'], unique=False)
     op.create_index('ix_fingerprint_fingerprint_type', 'fingerprint', ['fingerprint_type'], unique=False)
-    op.create_index('ix_fingerprint_employee_id', 'fingerprint', ['employee_id'], unique=False)
     op.create_index('ix_fingerprint_created_at', 'fingerprint', ['created_at'], unique=False)
     op.alter_column('fingerprint', 'fingerprint_data',
-               existing_type=sqlmodel.sql.sqltypes.AutoString(length=1000000),
+               existing_type=sa.LargeBinary(),
                type_=sa.TEXT(),
-               existing_nullable=False)
+               existing_nullable=False,
+               postgresql_using=(
+                   "CASE WHEN convert_from(substring(fingerprint_data for position(','::bytea in fingerprint_data)), 'UTF8')"
+                   " LIKE 'data:%;base64,' "
+                   "THEN convert_from(substring(fingerprint_data for position(','::bytea in fingerprint_data)), 'UTF8')"
+                   " || replace(encode(substring(fingerprint_data from position(','::bytea in fingerprint_data) + 1), 'base64'), E'\\n', '') "
+                   "ELSE convert_from(fingerprint_data, 'UTF8') END"
+               ))
     op.drop_constraint(None, 'employee', type_='foreignkey')
     op.drop_constraint(None, 'employee', type_='foreignkey')
     op.create_foreign_key('employee_user_id_fkey', 'employee', 'user', ['user_id'], ['id'], ondelete='SET NULL')
@@ -94,12 +116,8 @@ def downgrade():
     op.create_index('ix_devicesynclog_sync_type', 'devicesynclog', ['sync_type'], unique=False)
     op.create_index('ix_devicesynclog_sync_status', 'devicesynclog', ['sync_status'], unique=False)
     op.create_index('ix_devicesynclog_device_id', 'devicesynclog', ['device_id'], unique=False)
-    op.create_index('ix_devicesynclog_created_at', 'devicesynclog', ['created_at'], unique=False)
     op.drop_constraint(None, 'attendance', type_='foreignkey')
     op.create_foreign_key('attendance_employee_id_fkey', 'attendance', 'employee', ['employee_id'], ['id'], ondelete='CASCADE')
     op.create_index('ix_attendance_zkteco_device_id', 'attendance', ['zkteco_device_id'], unique=False)
-    op.create_index('ix_attendance_status', 'attendance', ['status'], unique=False)
     op.create_index('ix_attendance_employee_id', 'attendance', ['employee_id'], unique=False)
-    op.create_index('ix_attendance_check_in_time', 'attendance', ['check_in_time'], unique=False)
-    op.create_index('ix_attendance_attendance_type', 'attendance', ['attendance_type'], unique=False)
     # ### end Alembic commands ###
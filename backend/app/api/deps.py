@@ -1,16 +1,17 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, engine
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -23,7 +24,37 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+
+# Room for the multipart boundaries and part headers around the file
+_MULTIPART_OVERHEAD = 16 * 1024
+
+
+MAX_BULK_THUMBS = 5
+
+
+def _check_content_length(request: Request, max_files: int) -> None:
+    content_length = request.headers.get("content-length", "")
+    limit = max_files * (settings.MAX_FINGERPRINT_BYTES + _MULTIPART_OVERHEAD)
+    if content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail="Fingerprint image too large")
+
+
+def check_fingerprint_upload_size(request: Request) -> None:
+    """Refuse a fingerprint upload by its Content-Length before the file is read"""
+    _check_content_length(request, max_files=1)
+
+
+def check_bulk_thumb_upload_size(request: Request) -> None:
+    """check_fingerprint_upload_size for up to MAX_BULK_THUMBS images"""
+    _check_content_length(request, max_files=MAX_BULK_THUMBS)
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
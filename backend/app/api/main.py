@@ -1,19 +1,44 @@
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
 
 from app.api.routes import attendance, departments, employees, fingerprints, holidays, items, login, private, users, utils
 from app.core.config import settings
 
-api_router = APIRouter()
-api_router.include_router(login.router)
-api_router.include_router(users.router)
-api_router.include_router(utils.router)
-api_router.include_router(items.router)
-api_router.include_router(departments.router, prefix="/departments", tags=["departments"])
-api_router.include_router(employees.router, prefix="/employees", tags=["employees"])
-api_router.include_router(fingerprints.router, prefix="/fingerprints", tags=["fingerprints"])
-api_router.include_router(holidays.router, prefix="/holidays", tags=["holidays"])
-api_router.include_router(attendance.router, prefix="/attendance", tags=["attendance"])
+__all__ = ["ROUTERS", "api_router", "custom_generate_unique_id"]
 
 
+def custom_generate_unique_id(route: APIRoute) -> str:
+    if route.tags and len(route.tags) > 0:
+        return f"{route.tags[0]}-{route.name}"
+    else:
+        return route.name
+
+
+# (router, prefix, tags) in include order
+ROUTERS: tuple[tuple[APIRouter, str, list[str] | None], ...] = (
+    (login.router, "", None),
+    (users.router, "", None),
+    (utils.router, "", None),
+    (items.router, "", None),
+    (departments.router, "/departments", ["departments"]),
+    (employees.router, "/employees", ["employees"]),
+    (fingerprints.router, "/fingerprints", ["fingerprints"]),
+    (holidays.router, "/holidays", ["holidays"]),
+    (attendance.router, "/attendance", ["attendance"]),
+)
+
 if settings.ENVIRONMENT == "local":
-    api_router.include_router(private.router)
+    ROUTERS += ((private.router, "", None),)
+
+# Routes are built once with their final /api/v1 paths and operation ids, so
+# the app can take them as-is instead of copying every route a second time
+# through app.include_router. The app's default_response_class does not reach
+# routes added that way, so it is set here as well.
+api_router = APIRouter(
+    prefix=settings.API_V1_STR,
+    default_response_class=ORJSONResponse,
+    generate_unique_id_function=custom_generate_unique_id,
+)
+for router, prefix, tags in ROUTERS:
+    api_router.include_router(router, prefix=prefix, tags=tags)
@@ -1,81 +1,148 @@
+import asyncio
 import uuid
-from datetime import datetime, date, timedelta
-from typing import Any, List
+from datetime import datetime, date, time, timedelta
+from typing import Any, Iterator, List
 
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from sqlmodel import Session
+import anyio.from_thread
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.api import deps
+from app.core.cache import (
+    daily_report_key, get_cached, invalidate_devices, invalidate_reports, monthly_report_key, set_cached
+)
+from app.core.db import engine
+from app.core.responses import ORJSONDefaultResponse, PydanticResponse, construct_all
 from app.models import (
-    Attendance, AttendanceCreate, AttendancePublic, AttendanceUpdate, AttendancesPublic,
+    AttendanceCreate, AttendancePublic, AttendanceUpdate, AttendancesPublic,
     ZKTecoDevice, ZKTecoDeviceCreate, ZKTecoDevicePublic, ZKTecoDeviceUpdate, ZKTecoDevicesPublic,
-    DeviceSyncLog
+    DeviceSyncLog, DeviceSyncLogBase, DeviceSyncLogPublic, FingerprintPunch, FingerprintPunchBatchResult
 )
-from app.services.zkteco_service import ZKTecoManager
+from app.services.attendance_service import AttendanceService
+from app.services.zkteco_service import ZKTecoManager, enqueue_syncs, probe_device
+from app.utils import decode_cursor, encode_cursor, parse_iso_date
 
 router = APIRouter()
 
+MAX_PUNCH_BATCH = 500
+
+
+def get_zkteco_manager(db: Session = Depends(deps.get_db)) -> ZKTecoManager:
+    return ZKTecoManager(db)
+
+
+def _parse_date_range(start_date: str | None, end_date: str | None) -> tuple[datetime | None, datetime | None]:
+    """Turn the YYYY-MM-DD filters into a [start, end) datetime range."""
+    start_datetime = None
+    end_datetime = None
+    
+    if start_date:
+        try:
+            start_datetime = datetime.combine(parse_iso_date(start_date), time.min)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid start date format")
+    
+    if end_date:
+        try:
+            # Exclusive bound: the start of the day after end_date
+            end_datetime = datetime.combine(parse_iso_date(end_date), time.min) + timedelta(days=1)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid end date format")
+    
+    return start_datetime, end_datetime
+
 
 # Attendance Routes
 @router.get("/", response_model=AttendancesPublic)
-def read_attendances(
-    db: Session = Depends(deps.get_db),
+async def read_attendances(
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    employee_id: str | None = Query(None, description="Filter by employee ID"),
-    device_id: str | None = Query(None, description="Filter by device ID"),
+    employee_id: uuid.UUID | None = Query(None, description="Filter by employee ID"),
+    device_id: uuid.UUID | None = Query(None, description="Filter by device ID"),
     start_date: str | None = Query(None, description="Filter by start date (YYYY-MM-DD)"),
     end_date: str | None = Query(None, description="Filter by end date (YYYY-MM-DD)"),
     status: str | None = Query(None, description="Filter by status"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
 ) -> Any:
     """
-    Retrieve attendance records.
+    Retrieve attendance records, newest first.
+
+    Pass the returned next_cursor to fetch the following page; unlike skip it
+    does not rescan the rows already returned.
     """
-    # Parse UUIDs
-    employee_uuid = None
-    device_uuid = None
+    start_datetime, end_datetime = _parse_date_range(start_date, end_date)
     
-    if employee_id:
+    cursor_key = None
+    if cursor:
         try:
-            employee_uuid = uuid.UUID(employee_id)
+            cursor_key = decode_cursor(cursor)
         except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid employee ID")
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    if device_id:
-        try:
-            device_uuid = uuid.UUID(device_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    # Parse dates
-    start_datetime = None
-    end_datetime = None
-    
-    if start_date:
-        try:
-            start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid start date format")
-    
-    if end_date:
-        try:
-            end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1) - timedelta(seconds=1)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid end date format")
-    
-    attendances = crud.get_attendances(
+    # One extra row tells whether another page exists
+    rows = await crud.get_attendances(
         session=db,
         skip=skip,
-        limit=limit,
-        employee_id=employee_uuid,
-        device_id=device_uuid,
+        limit=limit + 1,
+        employee_id=employee_id,
+        device_id=device_id,
         start_date=start_datetime,
         end_date=end_datetime,
-        status=status
+        status=status,
+        cursor=cursor_key
     )
     
-    return AttendancesPublic(data=attendances, count=len(attendances))
+    total = rows[0].total if rows else 0
+    attendances = [row.Attendance for row in rows]
+    
+    next_cursor = None
+    if len(attendances) > limit:
+        attendances = attendances[:limit]
+        next_cursor = encode_cursor(attendances[-1].check_in_time, attendances[-1].id)
+    
+    return PydanticResponse(AttendancesPublic.model_construct(
+        data=construct_all(AttendancePublic, attendances), count=total, next_cursor=next_cursor
+    ))
+
+
+@router.get("/stream", response_model=AttendancesPublic)
+def stream_attendances(
+    employee_id: uuid.UUID | None = Query(None, description="Filter by employee ID"),
+    device_id: uuid.UUID | None = Query(None, description="Filter by device ID"),
+    start_date: str | None = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: str | None = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    status: str | None = Query(None, description="Filter by status"),
+) -> Any:
+    """
+    Stream every matching attendance record, newest first, in one response
+    shaped like the paged list. Rows are sent as the database returns them.
+    """
+    start_datetime, end_datetime = _parse_date_range(start_date, end_date)
+    
+    def generate() -> Iterator[bytes]:
+        count = 0
+        # Own session: the response body is sent after the request's one closes
+        with Session(engine) as session:
+            yield b'{"data":['
+            for rows in crud.stream_attendances(
+                session=session,
+                employee_id=employee_id,
+                device_id=device_id,
+                start_date=start_datetime,
+                end_date=end_datetime,
+                status=status
+            ):
+                chunk = b",".join(orjson.dumps(row._asdict()) for row in rows)
+                yield (b"," + chunk) if count else chunk
+                count += len(rows)
+        yield b'],"count":%d,"next_cursor":null}' % count
+    
+    return StreamingResponse(generate(), media_type="application/json")
 
 
 @router.post("/", response_model=AttendancePublic)
@@ -99,24 +166,39 @@ def create_attendance(
             raise HTTPException(status_code=404, detail="Device not found")
     
     attendance = crud.create_attendance(session=db, attendance_in=attendance_in)
+    invalidate_reports(attendance.check_in_time.date())
     return attendance
 
 
+@router.post("/fingerprint/batch", response_model=FingerprintPunchBatchResult)
+def mark_attendance_batch(
+    *,
+    db: Session = Depends(deps.get_db),
+    punches: List[FingerprintPunch],
+) -> Any:
+    """
+    Mark attendance for a batch of fingerprint punches collected on devices.
+    Punches that cannot be applied are listed in the result by position.
+    """
+    if len(punches) > MAX_PUNCH_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PUNCH_BATCH} punches per batch")
+    
+    result = AttendanceService(db).mark_attendance_batch(punches)
+    if result.checked_in or result.checked_out:
+        invalidate_reports(*{punch.timestamp.date() for punch in punches})
+    return result
+
+
 @router.get("/{attendance_id}", response_model=AttendancePublic)
 def read_attendance(
     *,
     db: Session = Depends(deps.get_db),
-    attendance_id: str,
+    attendance_id: uuid.UUID,
 ) -> Any:
     """
     Get attendance by ID.
     """
-    try:
-        attendance_uuid = uuid.UUID(attendance_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid attendance ID")
-    
-    attendance = crud.get_attendance(session=db, attendance_id=attendance_uuid)
+    attendance = crud.get_attendance(session=db, attendance_id=attendance_id)
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
     return attendance
@@ -126,22 +208,19 @@ def read_attendance(
 def update_attendance(
     *,
     db: Session = Depends(deps.get_db),
-    attendance_id: str,
+    attendance_id: uuid.UUID,
     attendance_in: AttendanceUpdate,
 ) -> Any:
     """
     Update attendance record.
     """
-    try:
-        attendance_uuid = uuid.UUID(attendance_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid attendance ID")
-    
-    attendance = crud.get_attendance(session=db, attendance_id=attendance_uuid)
+    attendance = crud.get_attendance(session=db, attendance_id=attendance_id)
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
     
+    previous_day = attendance.check_in_time.date()
     attendance = crud.update_attendance(session=db, db_attendance=attendance, attendance_in=attendance_in)
+    invalidate_reports(previous_day, attendance.check_in_time.date())
     return attendance
 
 
@@ -149,20 +228,19 @@ def update_attendance(
 def delete_attendance(
     *,
     db: Session = Depends(deps.get_db),
-    attendance_id: str,
+    attendance_id: uuid.UUID,
 ) -> Any:
     """
     Delete attendance record.
     """
-    try:
-        attendance_uuid = uuid.UUID(attendance_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid attendance ID")
-    
-    success = crud.delete_attendance(session=db, attendance_id=attendance_uuid)
-    if not success:
+    attendance = crud.get_attendance(session=db, attendance_id=attendance_id)
+    if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
     
+    day = attendance.check_in_time.date()
+    crud.delete_attendance(session=db, attendance_id=attendance_id)
+    invalidate_reports(day)
+    
     return {"message": "Attendance record deleted successfully"}
 
 
@@ -170,25 +248,20 @@ def delete_attendance(
 def read_employee_attendances(
     *,
     db: Session = Depends(deps.get_db),
-    employee_id: str,
+    employee_id: uuid.UUID,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
 ) -> Any:
     """
     Get attendance records for a specific employee.
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
     # Verify employee exists
-    employee = crud.get_employee(session=db, employee_id=employee_uuid)
+    employee = crud.get_employee(session=db, employee_id=employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
     attendances = crud.get_employee_attendances(
-        session=db, employee_id=employee_uuid, skip=skip, limit=limit
+        session=db, employee_id=employee_id, skip=skip, limit=limit
     )
     return AttendancesPublic(data=attendances, count=len(attendances))
 
@@ -200,12 +273,33 @@ def read_zkteco_devices(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     is_active: bool | None = Query(None, description="Filter by active status"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
 ) -> Any:
     """
-    Retrieve ZKTeco devices.
+    Retrieve ZKTeco devices, newest first.
     """
-    devices = crud.get_zkteco_devices(session=db, skip=skip, limit=limit, is_active=is_active)
-    return ZKTecoDevicesPublic(data=devices, count=len(devices))
+    cursor_key = None
+    if cursor:
+        try:
+            cursor_key = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # One extra row tells whether another page exists
+    rows = crud.get_zkteco_devices_page(
+        session=db, skip=skip, limit=limit + 1, is_active=is_active, cursor=cursor_key
+    )
+    total = rows[0].total if rows else 0
+    devices = [row.ZKTecoDevice for row in rows]
+    
+    next_cursor = None
+    if len(devices) > limit:
+        devices = devices[:limit]
+        next_cursor = encode_cursor(devices[-1].created_at, devices[-1].id)
+    
+    return PydanticResponse(ZKTecoDevicesPublic.model_construct(
+        data=construct_all(ZKTecoDevicePublic, devices), count=total, next_cursor=next_cursor
+    ))
 
 
 @router.post("/devices/", response_model=ZKTecoDevicePublic)
@@ -223,24 +317,52 @@ def create_zkteco_device(
         raise HTTPException(status_code=400, detail="Device ID already exists")
     
     device = crud.create_zkteco_device(session=db, device_in=device_in)
+    invalidate_devices()
     return device
 
 
+@router.get("/devices/status")
+async def get_devices_status(
+    db: Session = Depends(deps.get_db),
+    is_active: bool | None = Query(None, description="Filter by active status"),
+) -> Any:
+    """
+    Check network status of all ZKTeco devices at once.
+    """
+    # The session is sync; query in a thread so the loop keeps serving requests
+    devices = await asyncio.to_thread(crud.get_zkteco_devices, session=db, is_active=is_active)
+    
+    # Probe concurrently so the whole check takes one timeout, not one per device
+    results = await asyncio.gather(*(probe_device(device) for device in devices))
+    
+    return {
+        "data": [
+            {
+                "id": str(device.id),
+                "device_name": device.device_name,
+                "device_ip": device.device_ip,
+                "device_port": device.device_port,
+                "database_status": device.device_status,
+                "network_status": "online" if result == 0 else "offline",
+                "network_error_code": result if result != 0 else None,
+            }
+            for device, result in zip(devices, results, strict=True)
+        ],
+        "count": len(devices),
+        "online": sum(1 for result in results if result == 0),
+    }
+
+
 @router.get("/devices/{device_id}", response_model=ZKTecoDevicePublic)
 def read_zkteco_device(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Get ZKTeco device by ID.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     return device
@@ -250,22 +372,18 @@ def read_zkteco_device(
 def update_zkteco_device(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    device_id: uuid.UUID,
     device_in: ZKTecoDeviceUpdate,
 ) -> Any:
     """
     Update ZKTeco device.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
     device = crud.update_zkteco_device(session=db, db_device=device, device_in=device_in)
+    invalidate_devices()
     return device
 
 
@@ -273,18 +391,14 @@ def update_zkteco_device(
 def delete_zkteco_device(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    manager: ZKTecoManager = Depends(get_zkteco_manager),
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Delete ZKTeco device.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
     # Get device details before deletion for better error messages
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
@@ -292,7 +406,6 @@ def delete_zkteco_device(
     device_ip = device.device_ip
     
     # Check if device is currently connected
-    manager = ZKTecoManager(db)
     service = manager.get_service(device.id)
     
     # Disconnect device if connected
@@ -300,16 +413,17 @@ def delete_zkteco_device(
         service.disconnect_device(device.device_id)
     
     # Delete the device
-    success = crud.delete_zkteco_device(session=db, device_id=device_uuid)
+    success = crud.delete_zkteco_device(session=db, device_id=device_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete device")
+    invalidate_devices()
     
     return {
         "message": f"Device '{device_name}' ({device_ip}) deleted successfully",
         "deleted_device": {
             "name": device_name,
             "ip": device_ip,
-            "id": str(device_uuid)
+            "id": str(device_id)
         }
     }
 
@@ -318,6 +432,7 @@ def delete_zkteco_device(
 def delete_multiple_devices(
     *,
     db: Session = Depends(deps.get_db),
+    manager: ZKTecoManager = Depends(get_zkteco_manager),
     device_ids: List[str],
 ) -> Any:
     """
@@ -329,51 +444,46 @@ def delete_multiple_devices(
     deleted_devices = []
     failed_deletions = []
     
+    device_uuids = {}
     for device_id in device_ids:
         try:
-            device_uuid = uuid.UUID(device_id)
-            device = crud.get_zkteco_device(session=db, device_id=device_uuid)
-            
-            if device:
-                device_name = device.device_name
-                device_ip = device.device_ip
-                
-                # Disconnect device if connected
-                manager = ZKTecoManager(db)
-                service = manager.get_service(device.id)
-                if device.device_id in service.devices:
-                    service.disconnect_device(device.device_id)
-                
-                # Delete the device
-                success = crud.delete_zkteco_device(session=db, device_id=device_uuid)
-                if success:
-                    deleted_devices.append({
-                        "id": device_id,
-                        "name": device_name,
-                        "ip": device_ip
-                    })
-                else:
-                    failed_deletions.append({
-                        "id": device_id,
-                        "error": "Failed to delete device"
-                    })
-            else:
-                failed_deletions.append({
-                    "id": device_id,
-                    "error": "Device not found"
-                })
-                
+            device_uuids[uuid.UUID(device_id)] = device_id
         except ValueError:
             failed_deletions.append({
                 "id": device_id,
                 "error": "Invalid device ID format"
             })
-        except Exception as e:
+    
+    # One SELECT for all devices instead of one per id
+    devices = crud.get_zkteco_devices_by_ids(session=db, device_ids=list(device_uuids))
+    found_ids = {device.id for device in devices}
+    for device_uuid, device_id in device_uuids.items():
+        if device_uuid not in found_ids:
             failed_deletions.append({
                 "id": device_id,
-                "error": str(e)
+                "error": "Device not found"
             })
     
+    # Disconnect devices if connected
+    for device in devices:
+        service = manager.get_service(device.id)
+        if device.device_id in service.devices:
+            service.disconnect_device(device.device_id)
+    
+    # Delete the devices in a single statement
+    try:
+        crud.delete_zkteco_devices(session=db, device_ids=list(found_ids))
+        invalidate_devices()
+        deleted_devices = [
+            {"id": device_uuids[device.id], "name": device.device_name, "ip": device.device_ip}
+            for device in devices
+        ]
+    except Exception as e:
+        db.rollback()
+        failed_deletions.extend(
+            {"id": device_uuids[device.id], "error": str(e)} for device in devices
+        )
+    
     return {
         "message": f"Deleted {len(deleted_devices)} devices, {len(failed_deletions)} failed",
         "deleted_devices": deleted_devices,
@@ -385,6 +495,7 @@ def delete_multiple_devices(
 def delete_all_devices(
     *,
     db: Session = Depends(deps.get_db),
+    manager: ZKTecoManager = Depends(get_zkteco_manager),
 ) -> Any:
     """
     Delete all ZKTeco devices (use with caution).
@@ -401,38 +512,26 @@ def delete_all_devices(
     deleted_devices = []
     failed_deletions = []
     
+    # Disconnect devices if connected
     for device in devices:
-        try:
-            device_name = device.device_name
-            device_ip = device.device_ip
-            
-            # Disconnect device if connected
-            manager = ZKTecoManager(db)
-            service = manager.get_service(device.id)
-            if device.device_id in service.devices:
-                service.disconnect_device(device.device_id)
-            
-            # Delete the device
-            success = crud.delete_zkteco_device(session=db, device_id=device.id)
-            if success:
-                deleted_devices.append({
-                    "id": str(device.id),
-                    "name": device_name,
-                    "ip": device_ip
-                })
-            else:
-                failed_deletions.append({
-                    "id": str(device.id),
-                    "name": device_name,
-                    "error": "Failed to delete device"
-                })
-                
-        except Exception as e:
-            failed_deletions.append({
-                "id": str(device.id),
-                "name": device.device_name,
-                "error": str(e)
-            })
+        service = manager.get_service(device.id)
+        if device.device_id in service.devices:
+            service.disconnect_device(device.device_id)
+    
+    # Delete the devices in a single statement
+    try:
+        crud.delete_zkteco_devices(session=db, device_ids=[device.id for device in devices])
+        invalidate_devices()
+        deleted_devices = [
+            {"id": str(device.id), "name": device.device_name, "ip": device.device_ip}
+            for device in devices
+        ]
+    except Exception as e:
+        db.rollback()
+        failed_deletions = [
+            {"id": str(device.id), "name": device.device_name, "error": str(e)}
+            for device in devices
+        ]
     
     return {
         "message": f"Deleted {len(deleted_devices)} devices, {len(failed_deletions)} failed",
@@ -447,17 +546,13 @@ def delete_all_devices(
 def connect_device(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    manager: ZKTecoManager = Depends(get_zkteco_manager),
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Connect to a ZKTeco device.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
@@ -468,15 +563,16 @@ def connect_device(
             detail=f"Device {device.device_name} is offline. Please check: 1) Device is powered on, 2) Ethernet cable is connected, 3) Device is in network mode"
         )
     
-    manager = ZKTecoManager(db)
     service = manager.get_service(device.id)
     success = service.connect_device(device)
+    # Connecting updates the device status either way
+    invalidate_devices()
     
     if success:
         return {"message": f"Successfully connected to device {device.device_name}"}
     else:
         # Get the current device status to provide better error message
-        device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+        device = crud.get_zkteco_device(session=db, device_id=device_id)
         if device.device_status == "offline":
             raise HTTPException(
                 status_code=503,
@@ -489,81 +585,91 @@ def connect_device(
             )
 
 
-@router.post("/devices/{device_id}/sync")
+@router.post("/devices/{device_id}/sync", status_code=202)
 def sync_device_attendance(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    device_id: uuid.UUID,
 ) -> Any:
     """
-    Sync attendance records from a ZKTeco device.
+    Queue an attendance sync from a ZKTeco device.
+    Poll GET /attendance/syncs/{sync_id} for the result.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
-    manager = ZKTecoManager(db)
-    service = manager.get_service(device.id)
-    records_synced, status = service.sync_attendance_from_device(device)
+    sync_log = crud.create_device_sync_log(
+        session=db,
+        sync_log_in=DeviceSyncLogBase(device_id=device.id, sync_type="attendance", sync_status="queued"),
+    )
+    # The session is sync, so this runs in the threadpool; the queue lives on the loop
+    anyio.from_thread.run(enqueue_syncs, [sync_log.id])
     
     return {
-        "message": f"Sync completed with status: {status}",
-        "records_synced": records_synced,
-        "status": status
+        "message": f"Sync queued for device {device.device_name}",
+        "sync_id": sync_log.id,
+        "status": sync_log.sync_status
     }
 
 
-@router.post("/devices/sync-all")
+@router.post("/devices/sync-all", status_code=202)
 def sync_all_devices(
     *,
     db: Session = Depends(deps.get_db),
 ) -> Any:
     """
-    Sync attendance records from all active devices.
+    Queue attendance syncs for all active devices.
+    Poll GET /attendance/syncs/{sync_id} for each result.
     """
-    manager = ZKTecoManager(db)
-    results = manager.sync_all_devices()
-    
-    total_records = sum(records for records, _ in results.values())
-    success_count = sum(1 for _, status in results.values() if status == "success")
+    devices = db.exec(select(ZKTecoDevice).where(ZKTecoDevice.is_active == True)).all()
+    sync_logs = [
+        DeviceSyncLog(device_id=device.id, sync_type="attendance", sync_status="queued")
+        for device in devices
+    ]
+    db.add_all(sync_logs)
+    db.flush()
+    sync_ids = [sync_log.id for sync_log in sync_logs]
+    db.commit()
+    anyio.from_thread.run(enqueue_syncs, sync_ids)
     
     return {
-        "message": f"Sync completed for {len(results)} devices",
-        "total_records_synced": total_records,
-        "successful_syncs": success_count,
-        "device_results": results
+        "message": f"Sync queued for {len(sync_ids)} devices",
+        "sync_ids": sync_ids,
+        "status": "queued"
     }
 
 
+@router.get("/syncs/{sync_id}", response_model=DeviceSyncLogPublic)
+def read_device_sync(
+    *,
+    db: Session = Depends(deps.get_db),
+    sync_id: int,
+) -> Any:
+    """
+    Get the status of a queued device sync.
+    """
+    sync_log = crud.get_device_sync_log(session=db, log_id=sync_id)
+    if not sync_log:
+        raise HTTPException(status_code=404, detail="Sync not found")
+    return sync_log
+
+
 @router.get("/devices/{device_id}/status")
-def get_device_status(
+async def get_device_status(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Check the current status of a ZKTeco device.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = await asyncio.to_thread(crud.get_zkteco_device, session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
     # Check network connectivity
-    import socket
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(5)
-    result = sock.connect_ex((device.device_ip, device.device_port))
-    sock.close()
+    result = await probe_device(device)
     
     network_status = "online" if result == 0 else "offline"
     
@@ -618,21 +724,16 @@ def get_troubleshooting_tips(error_code: int) -> list:
 def get_device_info(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    manager: ZKTecoManager = Depends(get_zkteco_manager),
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Get detailed information about a ZKTeco device.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
-    manager = ZKTecoManager(db)
     service = manager.get_service(device.id)
     info = service.get_device_info(device)
     
@@ -643,21 +744,16 @@ def get_device_info(
 def restart_device(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    manager: ZKTecoManager = Depends(get_zkteco_manager),
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Restart a ZKTeco device.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
-    manager = ZKTecoManager(db)
     service = manager.get_service(device.id)
     success = service.restart_device(device)
     
@@ -671,21 +767,16 @@ def restart_device(
 def clear_device_attendance(
     *,
     db: Session = Depends(deps.get_db),
-    device_id: str,
+    manager: ZKTecoManager = Depends(get_zkteco_manager),
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Clear attendance records from a ZKTeco device.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
-    manager = ZKTecoManager(db)
     service = manager.get_service(device.id)
     success = service.clear_device_attendance(device)
     
@@ -696,143 +787,113 @@ def clear_device_attendance(
 
 
 # Reporting Routes
-@router.get("/reports/daily")
+@router.get("/reports/daily", response_class=ORJSONDefaultResponse)
 def get_daily_attendance_report(
     *,
     db: Session = Depends(deps.get_db),
     date: str = Query(..., description="Date in YYYY-MM-DD format"),
-    department_id: str | None = Query(None, description="Filter by department ID"),
+    department_id: uuid.UUID | None = Query(None, description="Filter by department ID"),
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None, description="next_after from the previous page"),
 ) -> Any:
     """
-    Get daily attendance report.
+    Get daily attendance report, one page of employees at a time.
     """
     try:
-        report_date = datetime.strptime(date, "%Y-%m-%d")
+        report_date = datetime.combine(parse_iso_date(date), time.min)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
+    cache_key = daily_report_key(report_date.date(), department_id, page=f"{after or ''}:{limit}")
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return ORJSONDefaultResponse(cached)
+    
     start_date = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_date = start_date + timedelta(days=1) - timedelta(seconds=1)
+    end_date = start_date + timedelta(days=1)
     
-    # Get all employees
-    employees = crud.get_employees(session=db)
-    if department_id:
-        try:
-            dept_uuid = uuid.UUID(department_id)
-            employees = [e for e in employees if e.department_id == dept_uuid]
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid department ID")
+    # First open check-in and last check-out per employee, in one query
+    summary = crud.get_daily_attendance_summary(
+        session=db,
+        start_date=start_date,
+        end_date=end_date,
+        department_id=department_id,
+        after=after,
+        limit=limit + 1
+    )
+    next_after = summary[limit - 1].employee_id if len(summary) > limit else None
+    summary = summary[:limit]
     
     report_data = []
-    for employee in employees:
-        # Get attendance for this employee on the specified date
-        attendances = crud.get_attendances(
-            session=db,
-            employee_id=employee.id,
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        check_in = None
-        check_out = None
-        status = "absent"
-        
-        if attendances:
-            # Get first check-in and last check-out
-            check_ins = [a for a in attendances if a.check_out_time is None]
-            check_outs = [a for a in attendances if a.check_out_time is not None]
-            
-            if check_ins:
-                check_in = min(check_ins, key=lambda x: x.check_in_time).check_in_time
-            if check_outs:
-                check_out = max(check_outs, key=lambda x: x.check_out_time).check_out_time
-            
-            if check_in:
-                status = "present"
-        
+    present_count = 0
+    for row in summary:
+        present = row.check_in is not None
+        present_count += present
         report_data.append({
-            "employee_id": employee.employee_id,
-            "employee_name": f"{employee.first_name} {employee.last_name}",
-            "department": employee.department.name,
-            "check_in": check_in.isoformat() if check_in else None,
-            "check_out": check_out.isoformat() if check_out else None,
-            "status": status,
+            "employee_id": row.employee_id,
+            "employee_name": f"{row.first_name} {row.last_name}",
+            "department": row.department_name,
+            "check_in": row.check_in,
+            "check_out": row.check_out,
+            "status": "present" if present else "absent",
             "total_hours": None  # Calculate if needed
         })
     
-    return {
+    report = {
         "date": date,
         "total_employees": len(report_data),
-        "present_count": sum(1 for r in report_data if r["status"] == "present"),
-        "absent_count": sum(1 for r in report_data if r["status"] == "absent"),
-        "attendance_data": report_data
+        "present_count": present_count,
+        "absent_count": len(report_data) - present_count,
+        "attendance_data": report_data,
+        "next_after": next_after
     }
+    set_cached(cache_key, report)
+    return ORJSONDefaultResponse(report)
 
 
-@router.get("/reports/monthly")
+@router.get("/reports/monthly", response_class=ORJSONDefaultResponse)
 def get_monthly_attendance_report(
     *,
     db: Session = Depends(deps.get_db),
     year: int = Query(..., description="Year"),
     month: int = Query(..., description="Month (1-12)"),
-    department_id: str | None = Query(None, description="Filter by department ID"),
+    department_id: uuid.UUID | None = Query(None, description="Filter by department ID"),
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None, description="next_after from the previous page"),
 ) -> Any:
     """
-    Get monthly attendance report.
+    Get monthly attendance report, one page of employees at a time.
     """
     if month < 1 or month > 12:
         raise HTTPException(status_code=400, detail="Invalid month")
     
+    cache_key = monthly_report_key(year, month, department_id, page=f"{after or ''}:{limit}")
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return ORJSONDefaultResponse(cached)
+    
     start_date = datetime(year, month, 1)
     if month == 12:
-        end_date = datetime(year + 1, 1, 1) - timedelta(seconds=1)
+        end_date = datetime(year + 1, 1, 1)
     else:
-        end_date = datetime(year, month + 1, 1) - timedelta(seconds=1)
+        end_date = datetime(year, month + 1, 1)
     
-    # Get all employees
-    employees = crud.get_employees(session=db)
-    if department_id:
-        try:
-            dept_uuid = uuid.UUID(department_id)
-            employees = [e for e in employees if e.department_id == dept_uuid]
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid department ID")
+    # Days present and hours worked per employee, aggregated in one query
+    summary = crud.get_monthly_attendance_summary(
+        session=db,
+        start_date=start_date,
+        end_date=end_date,
+        department_id=department_id,
+        after=after,
+        limit=limit + 1
+    )
+    next_after = summary[limit - 1].employee_id if len(summary) > limit else None
+    summary = summary[:limit]
     
     report_data = []
-    for employee in employees:
-        # Get all attendance records for this employee in the month
-        attendances = crud.get_attendances(
-            session=db,
-            employee_id=employee.id,
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        # Calculate attendance statistics
-        present_days = 0
-        absent_days = 0
-        total_hours = 0
-        
-        # Group by date
-        attendance_by_date = {}
-        for attendance in attendances:
-            date_key = attendance.check_in_time.date()
-            if date_key not in attendance_by_date:
-                attendance_by_date[date_key] = []
-            attendance_by_date[date_key].append(attendance)
-        
-        for date_key, day_attendances in attendance_by_date.items():
-            if day_attendances:
-                present_days += 1
-                # Calculate hours worked for this day
-                check_ins = [a for a in day_attendances if a.check_out_time is None]
-                check_outs = [a for a in day_attendances if a.check_out_time is not None]
-                
-                if check_ins and check_outs:
-                    first_check_in = min(check_ins, key=lambda x: x.check_in_time).check_in_time
-                    last_check_out = max(check_outs, key=lambda x: x.check_out_time).check_out_time
-                    hours_worked = (last_check_out - first_check_in).total_seconds() / 3600
-                    total_hours += hours_worked
+    for row in summary:
+        present_days = row.present_days
+        total_hours = float(row.total_hours)
         
         # Calculate absent days (working days - present days)
         # This is a simplified calculation - you might want to consider holidays
@@ -840,21 +901,25 @@ def get_monthly_attendance_report(
         absent_days = max(0, working_days - present_days)
         
         report_data.append({
-            "employee_id": employee.employee_id,
-            "employee_name": f"{employee.first_name} {employee.last_name}",
-            "department": employee.department.name,
+            "employee_id": row.employee_id,
+            "employee_name": f"{row.first_name} {row.last_name}",
+            "department": row.department_name,
             "present_days": present_days,
             "absent_days": absent_days,
             "total_hours": round(total_hours, 2),
             "attendance_percentage": round((present_days / working_days) * 100, 2) if working_days > 0 else 0
         })
     
-    return {
+    report = {
         "year": year,
         "month": month,
         "total_employees": len(report_data),
         "average_attendance_percentage": round(
             sum(r["attendance_percentage"] for r in report_data) / len(report_data), 2
         ) if report_data else 0,
-        "employee_data": report_data
-    } 
\ No newline at end of file
+        "employee_data": report_data,
+        "next_after": next_after
+    }
+    set_cached(cache_key, report)
+    return ORJSONDefaultResponse(report)
+ 
\ No newline at end of file
@@ -1,29 +1,46 @@
 import uuid
-from datetime import datetime, date
+from datetime import datetime, date, time
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Response
 from sqlmodel import Session
 
+from app import crud
 from app.api import deps
-from app.core.exceptions import handle_attendance_exception
+from app.core.cache import (
+    DEVICE_DASHBOARD_KEY, department_summary_key, employee_summary_key,
+    get_cached, invalidate_reports, set_cached
+)
 from app.models import (
     AttendanceCreate, AttendancePublic, AttendanceUpdate, AttendancesPublic,
     ZKTecoDeviceCreate, ZKTecoDevicePublic, ZKTecoDeviceUpdate, ZKTecoDevicesPublic
 )
 from app.services.attendance_service import AttendanceService
 from app.services.device_management_service import DeviceManagementService
+from app.utils import parse_iso_date
 
 router = APIRouter()
 
+# Summaries are recomputed at most this often; writes invalidate them sooner
+SUMMARY_CACHE_TTL = 30
+DASHBOARD_CACHE_TTL = 10
+
+
+def get_attendance_service(db: Session = Depends(deps.get_db)) -> AttendanceService:
+    return AttendanceService(db)
+
+
+def get_device_service(db: Session = Depends(deps.get_db)) -> DeviceManagementService:
+    return DeviceManagementService(db)
+
 
 @router.get("/", response_model=AttendancesPublic)
 def read_attendances(
-    db: Session = Depends(deps.get_db),
+    attendance_service: AttendanceService = Depends(get_attendance_service),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    employee_id: str | None = Query(None, description="Filter by employee ID"),
-    device_id: str | None = Query(None, description="Filter by device ID"),
+    employee_id: uuid.UUID | None = Query(None, description="Filter by employee ID"),
+    device_id: uuid.UUID | None = Query(None, description="Filter by device ID"),
     start_date: str | None = Query(None, description="Filter by start date (YYYY-MM-DD)"),
     end_date: str | None = Query(None, description="Filter by end date (YYYY-MM-DD)"),
     status: str | None = Query(None, description="Filter by status"),
@@ -31,216 +48,156 @@ def read_attendances(
     """
     Retrieve attendance records with filtering options.
     """
-    try:
-        # Parse UUIDs
-        employee_uuid = None
-        device_uuid = None
-        
-        if employee_id:
-            try:
-                employee_uuid = uuid.UUID(employee_id)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid employee ID")
-        
-        if device_id:
-            try:
-                device_uuid = uuid.UUID(device_id)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid device ID")
-        
-        # Parse dates
-        start_datetime = None
-        end_datetime = None
-        
-        if start_date:
-            try:
-                start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid start date format")
-        
-        if end_date:
-            try:
-                end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid end date format")
-        
-        # Use service to get attendances
-        attendance_service = AttendanceService(db)
-        attendances = attendance_service.get_attendances(
-            skip=skip,
-            limit=limit,
-            employee_id=employee_uuid,
-            device_id=device_uuid,
-            start_date=start_datetime,
-            end_date=end_datetime,
-            status=status
-        )
-        
-        return AttendancesPublic(data=attendances, count=len(attendances))
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving attendances: {str(e)}")
+    # Parse dates
+    start_datetime = None
+    end_datetime = None
+    
+    if start_date:
+        try:
+            start_datetime = datetime.combine(parse_iso_date(start_date), time.min)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid start date format")
+    
+    if end_date:
+        try:
+            end_datetime = datetime.combine(parse_iso_date(end_date), time.min)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid end date format")
+    
+    # Use service to get attendances
+    attendances = attendance_service.get_attendances(
+        skip=skip,
+        limit=limit,
+        employee_id=employee_id,
+        device_id=device_id,
+        start_date=start_datetime,
+        end_date=end_datetime,
+        status=status
+    )
+    
+    return AttendancesPublic(data=attendances, count=len(attendances))
 
 
 @router.post("/", response_model=AttendancePublic)
 def create_attendance(
     *,
-    db: Session = Depends(deps.get_db),
+    attendance_service: AttendanceService = Depends(get_attendance_service),
     attendance_in: AttendanceCreate,
 ) -> Any:
     """
     Create new attendance record with validation.
     """
-    try:
-        attendance_service = AttendanceService(db)
-        attendance = attendance_service.create_attendance(attendance_in)
-        return attendance
-        
-    except Exception as e:
-        # Handle custom exceptions
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error creating attendance: {str(e)}")
+    attendance = attendance_service.create_attendance(attendance_in)
+    invalidate_reports(attendance.check_in_time.date())
+    return attendance
 
 
 @router.put("/{attendance_id}", response_model=AttendancePublic)
 def update_attendance(
     *,
     db: Session = Depends(deps.get_db),
-    attendance_id: str,
+    attendance_service: AttendanceService = Depends(get_attendance_service),
+    attendance_id: uuid.UUID,
     attendance_in: AttendanceUpdate,
 ) -> Any:
     """
     Update an existing attendance record.
     """
-    try:
-        # Parse attendance ID
-        try:
-            attendance_uuid = uuid.UUID(attendance_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid attendance ID")
-        
-        attendance_service = AttendanceService(db)
-        attendance = attendance_service.update_attendance(attendance_uuid, attendance_in)
-        return attendance
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error updating attendance: {str(e)}")
+    previous = crud.get_attendance(session=db, attendance_id=attendance_id)
+    previous_day = previous.check_in_time.date() if previous else None
+    attendance = attendance_service.update_attendance(attendance_id, attendance_in)
+    invalidate_reports(previous_day, attendance.check_in_time.date())
+    return attendance
 
 
 @router.get("/{attendance_id}", response_model=AttendancePublic)
 def read_attendance(
     *,
-    db: Session = Depends(deps.get_db),
-    attendance_id: str,
+    attendance_service: AttendanceService = Depends(get_attendance_service),
+    attendance_id: uuid.UUID,
 ) -> Any:
     """
     Get attendance by ID.
     """
-    try:
-        # Parse attendance ID
-        try:
-            attendance_uuid = uuid.UUID(attendance_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid attendance ID")
-        
-        attendance_service = AttendanceService(db)
-        attendance = attendance_service.get_attendance(attendance_uuid)
-        
-        if not attendance:
-            raise HTTPException(status_code=404, detail="Attendance not found")
-        
-        return attendance
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error retrieving attendance: {str(e)}")
+    attendance = attendance_service.get_attendance(attendance_id)
+    
+    if not attendance:
+        raise HTTPException(status_code=404, detail="Attendance not found")
+    
+    return attendance
 
 
 @router.get("/employee/{employee_id}/summary")
 def get_employee_attendance_summary(
     *,
-    db: Session = Depends(deps.get_db),
-    employee_id: str,
+    attendance_service: AttendanceService = Depends(get_attendance_service),
+    response: Response,
+    employee_id: uuid.UUID,
     start_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
     end_date: str = Query(..., description="End date (YYYY-MM-DD)"),
 ) -> Any:
     """
     Get attendance summary for an employee within a date range.
     """
+    # Parse dates
     try:
-        # Parse employee ID
-        try:
-            employee_uuid = uuid.UUID(employee_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid employee ID")
-        
-        # Parse dates
-        try:
-            start_date_parsed = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end_date_parsed = datetime.strptime(end_date, "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format")
-        
-        attendance_service = AttendanceService(db)
-        summary = attendance_service.get_employee_attendance_summary(
-            employee_id=employee_uuid,
-            start_date=start_date_parsed,
-            end_date=end_date_parsed
-        )
-        
-        return summary
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error retrieving attendance summary: {str(e)}")
+        start_date_parsed = parse_iso_date(start_date)
+        end_date_parsed = parse_iso_date(end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    
+    response.headers["Cache-Control"] = f"max-age={SUMMARY_CACHE_TTL}"
+    cache_key = employee_summary_key(employee_id, start_date_parsed, end_date_parsed)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return cached
+    
+    summary = attendance_service.get_employee_attendance_summary(
+        employee_id=employee_id,
+        start_date=start_date_parsed,
+        end_date=end_date_parsed
+    )
+    
+    set_cached(cache_key, summary, ttl=SUMMARY_CACHE_TTL)
+    return summary
 
 
 @router.get("/department/{department_id}/summary")
 def get_department_attendance_summary(
     *,
-    db: Session = Depends(deps.get_db),
-    department_id: str,
+    attendance_service: AttendanceService = Depends(get_attendance_service),
+    response: Response,
+    department_id: uuid.UUID,
     attendance_date: str = Query(..., description="Attendance date (YYYY-MM-DD)"),
 ) -> Any:
     """
     Get attendance summary for all employees in a department on a specific date.
     """
+    # Parse date
     try:
-        # Parse department ID
-        try:
-            department_uuid = uuid.UUID(department_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid department ID")
-        
-        # Parse date
-        try:
-            attendance_date_parsed = datetime.strptime(attendance_date, "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format")
-        
-        attendance_service = AttendanceService(db)
-        summary = attendance_service.get_department_attendance_summary(
-            department_id=department_uuid,
-            attendance_date=attendance_date_parsed
-        )
-        
-        return summary
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error retrieving department summary: {str(e)}")
+        attendance_date_parsed = parse_iso_date(attendance_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    
+    response.headers["Cache-Control"] = f"max-age={SUMMARY_CACHE_TTL}"
+    cache_key = department_summary_key(attendance_date_parsed, department_id)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return cached
+    
+    summary = attendance_service.get_department_attendance_summary(
+        department_id=department_id,
+        attendance_date=attendance_date_parsed
+    )
+    
+    set_cached(cache_key, summary, ttl=SUMMARY_CACHE_TTL)
+    return summary
 
 
 @router.post("/fingerprint/mark")
 def mark_attendance_by_fingerprint(
     *,
-    db: Session = Depends(deps.get_db),
+    attendance_service: AttendanceService = Depends(get_attendance_service),
     device_id: str,
     employee_device_id: str,
     timestamp: datetime,
@@ -248,170 +205,113 @@ def mark_attendance_by_fingerprint(
     """
     Mark attendance when fingerprint is verified on device.
     """
-    try:
-        attendance_service = AttendanceService(db)
-        attendance = attendance_service.mark_attendance_by_fingerprint(
-            device_id=device_id,
-            employee_device_id=employee_device_id,
-            timestamp=timestamp
-        )
-        
-        return {
-            "message": "Attendance marked successfully",
-            "attendance": {
-                "id": str(attendance.id),
-                "employee_id": str(attendance.employee_id),
-                "check_in_time": attendance.check_in_time.isoformat(),
-                "check_out_time": attendance.check_out_time.isoformat() if attendance.check_out_time else None,
-                "status": attendance.status
-            }
+    attendance = attendance_service.mark_attendance_by_fingerprint(
+        device_id=device_id,
+        employee_device_id=employee_device_id,
+        timestamp=timestamp
+    )
+    
+    return {
+        "message": "Attendance marked successfully",
+        "attendance": {
+            "id": str(attendance.id),
+            "employee_id": str(attendance.employee_id),
+            "check_in_time": attendance.check_in_time.isoformat(),
+            "check_out_time": attendance.check_out_time.isoformat() if attendance.check_out_time else None,
+            "status": attendance.status
         }
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error marking attendance: {str(e)}")
+    }
 
 
 # Device Management Routes
 @router.get("/devices/", response_model=ZKTecoDevicesPublic)
 def read_devices(
-    db: Session = Depends(deps.get_db),
+    device_service: DeviceManagementService = Depends(get_device_service),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
 ) -> Any:
     """
     Retrieve ZKTeco devices.
     """
-    try:
-        device_service = DeviceManagementService(db)
-        devices = device_service.get_devices(skip=skip, limit=limit)
-        return ZKTecoDevicesPublic(data=devices, count=len(devices))
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving devices: {str(e)}")
+    devices = device_service.get_devices(skip=skip, limit=limit)
+    return ZKTecoDevicesPublic(data=devices, count=len(devices))
 
 
 @router.post("/devices/", response_model=ZKTecoDevicePublic)
 def create_device(
     *,
-    db: Session = Depends(deps.get_db),
+    device_service: DeviceManagementService = Depends(get_device_service),
     device_in: ZKTecoDeviceCreate,
 ) -> Any:
     """
     Register a new ZKTeco device.
     """
-    try:
-        device_service = DeviceManagementService(db)
-        device = device_service.register_device(device_in)
-        return device
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error registering device: {str(e)}")
+    device = device_service.register_device(device_in)
+    return device
 
 
 @router.get("/devices/{device_id}", response_model=ZKTecoDevicePublic)
 def read_device(
     *,
-    db: Session = Depends(deps.get_db),
-    device_id: str,
+    device_service: DeviceManagementService = Depends(get_device_service),
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Get device by ID.
     """
-    try:
-        # Parse device ID
-        try:
-            device_uuid = uuid.UUID(device_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid device ID")
-        
-        device_service = DeviceManagementService(db)
-        device = device_service.get_device(device_uuid)
-        
-        if not device:
-            raise HTTPException(status_code=404, detail="Device not found")
-        
-        return device
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error retrieving device: {str(e)}")
+    device = device_service.get_device(device_id)
+    
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    
+    return device
 
 
 @router.get("/devices/{device_id}/status")
 def get_device_status(
     *,
-    db: Session = Depends(deps.get_db),
-    device_id: str,
+    device_service: DeviceManagementService = Depends(get_device_service),
+    device_id: uuid.UUID,
 ) -> Any:
     """
     Get detailed device status and health information.
     """
-    try:
-        # Parse device ID
-        try:
-            device_uuid = uuid.UUID(device_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid device ID")
-        
-        device_service = DeviceManagementService(db)
-        status = device_service.get_device_status(device_uuid)
-        return status
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error retrieving device status: {str(e)}")
+    status = device_service.get_device_status(device_id)
+    return status
 
 
 @router.post("/devices/{device_id}/sync")
 def sync_device_attendance(
     *,
-    db: Session = Depends(deps.get_db),
-    device_id: str,
+    device_service: DeviceManagementService = Depends(get_device_service),
+    device_id: uuid.UUID,
     background_tasks: BackgroundTasks,
 ) -> Any:
     """
     Sync attendance data from a ZKTeco device.
     """
-    try:
-        # Parse device ID
-        try:
-            device_uuid = uuid.UUID(device_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid device ID")
-        
-        device_service = DeviceManagementService(db)
-        
-        # Run sync in background
-        background_tasks.add_task(device_service.sync_device_attendance, device_uuid)
-        
-        return {
-            "message": "Device sync started in background",
-            "device_id": device_id
-        }
-        
-    except Exception as e:
-        if hasattr(e, 'status_code'):
-            raise handle_attendance_exception(e)
-        raise HTTPException(status_code=500, detail=f"Error starting device sync: {str(e)}")
+    # Run sync in background
+    background_tasks.add_task(device_service.sync_device_attendance, device_id)
+    
+    return {
+        "message": "Device sync started in background",
+        "device_id": device_id
+    }
 
 
 @router.get("/devices/health/dashboard")
 def get_device_health_dashboard(
-    db: Session = Depends(deps.get_db),
+    response: Response,
+    device_service: DeviceManagementService = Depends(get_device_service),
 ) -> Any:
     """
     Get overall device health dashboard.
     """
-    try:
-        device_service = DeviceManagementService(db)
-        dashboard = device_service.get_device_health_dashboard()
-        return dashboard
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving device dashboard: {str(e)}")
+    response.headers["Cache-Control"] = f"max-age={DASHBOARD_CACHE_TTL}"
+    cached = get_cached(DEVICE_DASHBOARD_KEY)
+    if cached is not None:
+        return cached
+    
+    dashboard = device_service.get_device_health_dashboard()
+    set_cached(DEVICE_DASHBOARD_KEY, dashboard, ttl=DASHBOARD_CACHE_TTL)
+    return dashboard
@@ -1,15 +1,19 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
 from sqlmodel import Session
 
 from app import crud
 from app.api import deps
+from app.core.responses import PydanticResponse, construct_all
 from app.models import Department, DepartmentCreate, DepartmentPublic, DepartmentUpdate
 
 router = APIRouter()
 
+_departments_adapter = TypeAdapter(list[DepartmentPublic])
+
 
 @router.get("/", response_model=list[DepartmentPublic])
 def read_departments(
@@ -21,7 +25,10 @@ def read_departments(
     Retrieve departments.
     """
     departments = crud.get_departments(session=db, skip=skip, limit=limit)
-    return departments
+    return PydanticResponse(
+        construct_all(DepartmentPublic, departments),
+        adapter=_departments_adapter,
+    )
 
 
 @router.post("/", response_model=DepartmentPublic)
@@ -41,17 +48,12 @@ def create_department(
 def read_department(
     *,
     db: Session = Depends(deps.get_db),
-    department_id: str,
+    department_id: uuid.UUID,
 ) -> Any:
     """
     Get department by ID.
     """
-    try:
-        department_uuid = uuid.UUID(department_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid department ID")
-    
-    department = crud.get_department(session=db, department_id=department_uuid)
+    department = crud.get_department(session=db, department_id=department_id)
     if not department:
         raise HTTPException(status_code=404, detail="Department not found")
     return department
@@ -61,40 +63,27 @@ def read_department(
 def update_department(
     *,
     db: Session = Depends(deps.get_db),
-    department_id: str,
+    department_id: uuid.UUID,
     department_in: DepartmentUpdate,
 ) -> Any:
     """
     Update department.
     """
-    try:
-        department_uuid = uuid.UUID(department_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid department ID")
-    
-    department = crud.get_department(session=db, department_id=department_uuid)
+    department = crud.get_department(session=db, department_id=department_id)
     if not department:
         raise HTTPException(status_code=404, detail="Department not found")
     department = crud.update_department(session=db, db_department=department, department_in=department_in)
     return department
 
 
-@router.delete("/{department_id}")
+@router.delete("/{department_id}", status_code=204, response_class=Response)
 def delete_department(
     *,
     db: Session = Depends(deps.get_db),
-    department_id: str,
-) -> Any:
+    department_id: uuid.UUID,
+) -> None:
     """
     Delete department.
     """
-    try:
-        department_uuid = uuid.UUID(department_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid department ID")
-    
-    department = crud.get_department(session=db, department_id=department_uuid)
-    if not department:
+    if not crud.delete_department(session=db, department_id=department_id):
         raise HTTPException(status_code=404, detail="Department not found")
-    crud.delete_department(session=db, department_id=department_uuid)
-    return {"message": "Department deleted successfully"} 
\ No newline at end of file
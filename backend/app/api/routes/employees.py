@@ -1,35 +1,70 @@
 import uuid
+from datetime import datetime
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.api import deps
+from app.core.cache import (
+    employee_key, employee_list_key, get_cached, get_cached_async,
+    invalidate_employees, set_cached, set_cached_async
+)
+from app.core.responses import ORJSONDefaultResponse, PydanticResponse, construct_all
 from app.models import Employee, EmployeeCreate, EmployeePublic, EmployeeUpdate, EmployeesPublic
+from app.utils import decode_cursor, encode_cursor, etag_matches, make_etag
 
 router = APIRouter()
 
+# Cached employee reads expire after this; writes here invalidate them sooner
+EMPLOYEE_CACHE_TTL = 30
+
 
 @router.get("/", response_model=EmployeesPublic)
-def read_employees(
-    db: Session = Depends(deps.get_db),
+async def read_employees(
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    department_id: str | None = Query(None, description="Filter by department ID"),
+    department_id: uuid.UUID | None = Query(None, description="Filter by department ID"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
 ) -> Any:
     """
-    Retrieve employees.
+    Retrieve employees, newest first.
+
+    Pass the returned next_cursor to fetch the following page; unlike skip it
+    does not rescan the rows already returned.
     """
-    dept_uuid = None
-    if department_id:
+    cursor_key = None
+    if cursor:
         try:
-            dept_uuid = uuid.UUID(department_id)
+            cursor_key = decode_cursor(cursor)
         except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid department ID")
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    cache_key = employee_list_key(department_id, skip, limit, cursor)
+    cached = await get_cached_async(cache_key)
+    if cached is not None:
+        return ORJSONDefaultResponse(cached)
     
-    employees = crud.get_employees(session=db, skip=skip, limit=limit, department_id=dept_uuid)
-    return EmployeesPublic(data=employees, count=len(employees))
+    # One extra row tells whether another page exists
+    rows = await crud.get_employees(
+        session=db, skip=skip, limit=limit + 1, department_id=department_id, cursor=cursor_key
+    )
+    total = rows[0].total if rows else 0
+    employees = [row.Employee for row in rows]
+    
+    next_cursor = None
+    if len(employees) > limit:
+        employees = employees[:limit]
+        next_cursor = encode_cursor(employees[-1].created_at, employees[-1].id)
+    
+    page = EmployeesPublic.model_construct(
+        data=construct_all(EmployeePublic, employees), count=total, next_cursor=next_cursor
+    )
+    await set_cached_async(cache_key, page, ttl=EMPLOYEE_CACHE_TTL)
+    return PydanticResponse(page)
 
 
 @router.post("/", response_model=EmployeePublic)
@@ -41,23 +76,22 @@ def create_employee(
     """
     Create new employee.
     """
-    # Check if employee_id already exists
-    existing_employee = crud.get_employee_by_employee_id(session=db, employee_id=employee_in.employee_id)
-    if existing_employee:
+    # Check employee_id and CNIC are free and the department exists, in one query
+    employee_id_taken, cnic_taken, department_exists = crud.preflight_employee_write(
+        session=db,
+        employee_id=employee_in.employee_id,
+        cnic=employee_in.cnic,
+        department_id=employee_in.department_id
+    )
+    if employee_id_taken:
         raise HTTPException(status_code=400, detail="Employee ID already exists")
-    
-    # Check if CNIC already exists
-    existing_cnic = crud.get_employee_by_cnic(session=db, cnic=employee_in.cnic)
-    if existing_cnic:
+    if cnic_taken:
         raise HTTPException(status_code=400, detail="CNIC already exists")
-    
-    # Verify department exists
-    if employee_in.department_id:
-        department = crud.get_department(session=db, department_id=employee_in.department_id)
-        if not department:
-            raise HTTPException(status_code=404, detail="Department not found")
+    if not department_exists:
+        raise HTTPException(status_code=404, detail="Department not found")
     
     employee = crud.create_employee(session=db, employee_in=employee_in)
+    invalidate_employees()
     return employee
 
 
@@ -65,20 +99,35 @@ def create_employee(
 def read_employee(
     *,
     db: Session = Depends(deps.get_db),
-    employee_id: str,
+    request: Request,
+    employee_id: uuid.UUID,
 ) -> Any:
     """
     Get employee by ID.
+
+    Answers 304 when If-None-Match carries the employee's current ETag.
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Just the version column; the row is only loaded if it changed
+        updated_at = crud.get_employee_updated_at(session=db, employee_id=employee_id)
+        if updated_at is not None:
+            etag = make_etag(employee_id, updated_at)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
     
-    employee = crud.get_employee(session=db, employee_id=employee_uuid)
+    cache_key = employee_key(employee_id)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        etag = make_etag(employee_id, datetime.fromisoformat(cached["updated_at"]))
+        return ORJSONDefaultResponse(cached, headers={"ETag": etag})
+    
+    employee = crud.get_employee(session=db, employee_id=employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
-    return employee
+    employee_out = EmployeePublic.model_construct(**employee.__dict__)
+    set_cached(cache_key, employee_out, ttl=EMPLOYEE_CACHE_TTL)
+    return PydanticResponse(employee_out, headers={"ETag": make_etag(employee.id, employee.updated_at)})
 
 
 @router.get("/by-employee-id/{employee_id}", response_model=EmployeePublic)
@@ -115,59 +164,42 @@ def read_employee_by_cnic(
 def update_employee(
     *,
     db: Session = Depends(deps.get_db),
-    employee_id: str,
+    employee_id: uuid.UUID,
     employee_in: EmployeeUpdate,
 ) -> Any:
     """
     Update employee.
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
+    employee = crud.update_employee_checked(session=db, employee_id=employee_id, employee_in=employee_in)
+    if employee:
+        invalidate_employees()
+        return employee
     
-    employee = crud.get_employee(session=db, employee_id=employee_uuid)
-    if not employee:
+    # Nothing was updated; only now look up why
+    if not crud.get_employee(session=db, employee_id=employee_id):
         raise HTTPException(status_code=404, detail="Employee not found")
-    
-    # Check if employee_id is being updated and if it already exists
-    if employee_in.employee_id and employee_in.employee_id != employee.employee_id:
-        existing_employee = crud.get_employee_by_employee_id(session=db, employee_id=employee_in.employee_id)
-        if existing_employee:
-            raise HTTPException(status_code=400, detail="Employee ID already exists")
-    
-    # Check if CNIC is being updated and if it already exists
-    if employee_in.cnic and employee_in.cnic != employee.cnic:
-        existing_cnic = crud.get_employee_by_cnic(session=db, cnic=employee_in.cnic)
-        if existing_cnic:
-            raise HTTPException(status_code=400, detail="CNIC already exists")
-    
-    # Verify department exists if being updated
-    if employee_in.department_id:
-        department = crud.get_department(session=db, department_id=employee_in.department_id)
-        if not department:
-            raise HTTPException(status_code=404, detail="Department not found")
-    
-    employee = crud.update_employee(session=db, db_employee=employee, employee_in=employee_in)
-    return employee
+    employee_id_taken, cnic_taken, _ = crud.preflight_employee_write(
+        session=db,
+        employee_id=employee_in.employee_id,
+        cnic=employee_in.cnic,
+        exclude_id=employee_id
+    )
+    if employee_id_taken:
+        raise HTTPException(status_code=400, detail="Employee ID already exists")
+    if cnic_taken:
+        raise HTTPException(status_code=400, detail="CNIC already exists")
+    raise HTTPException(status_code=404, detail="Department not found")
 
 
-@router.delete("/{employee_id}")
+@router.delete("/{employee_id}", status_code=204, response_class=Response)
 def delete_employee(
     *,
     db: Session = Depends(deps.get_db),
-    employee_id: str,
-) -> Any:
+    employee_id: uuid.UUID,
+) -> None:
     """
     Delete employee.
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
-    employee = crud.get_employee(session=db, employee_id=employee_uuid)
-    if not employee:
+    if not crud.delete_employee(session=db, employee_id=employee_id):
         raise HTTPException(status_code=404, detail="Employee not found")
-    crud.delete_employee(session=db, employee_id=employee_uuid)
-    return {"message": "Employee deleted successfully"} 
\ No newline at end of file
+    invalidate_employees()
@@ -2,56 +2,76 @@ import uuid
 from typing import Any, List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+import anyio.from_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.api import deps
+from app.core.cache import (
+    AVAILABLE_DEVICES_KEY, FINGERPRINT_STATISTICS_KEY, fingerprint_summary_key, get_cached,
+    get_cached_many, invalidate_fingerprint_summaries, set_cached, set_cached_many
+)
+from app.core.config import settings
+from app.core.responses import ORJSONDefaultResponse, PydanticResponse, construct_all
 from app.models import (
     Employee, Fingerprint, FingerprintCreate, FingerprintPublic, FingerprintUpdate, 
-    FingerprintsPublic, EmployeeFingerprintSummary, BulkFingerprintCreate, BulkFingerprintResponse,
-    ZKTecoDevice
+    FingerprintSummariesPublic, FingerprintSummaryPublic, EmployeeFingerprintSummary, BulkFingerprintCreate, BulkFingerprintResponse,
+    ZKTecoDevice, DeviceSyncLogBase
 )
+from app.services.fingerprint_storage_service import FingerprintStorageService
 from app.services.zkteco_fingerprint_service import ZKTecoFingerprintService
+from app.services.zkteco_service import enqueue_enrollment, enqueue_fingerprint_sync
+from app.utils import etag_matches, make_etag, read_upload_base64
 
 router = APIRouter()
 
+MAX_SUMMARY_BATCH = 100
 
-@router.get("/", response_model=FingerprintsPublic)
-def read_fingerprints(
-    db: Session = Depends(deps.get_db),
+# Cached summaries and statistics expire after this; fingerprint writes here invalidate them sooner
+SUMMARY_CACHE_TTL = 30
+# Device status changes without a write here, so the device list is kept briefly
+DEVICES_CACHE_TTL = 10
+
+
+def get_storage_service(db: Session = Depends(deps.get_db)) -> FingerprintStorageService:
+    return FingerprintStorageService(db)
+
+
+def get_device_fingerprint_service(db: Session = Depends(deps.get_db)) -> ZKTecoFingerprintService:
+    return ZKTecoFingerprintService(db)
+
+
+@router.get("/", response_model=FingerprintSummariesPublic)
+async def read_fingerprints(
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    employee_id: str | None = Query(None, description="Filter by employee ID"),
+    employee_id: uuid.UUID | None = Query(None, description="Filter by employee ID"),
     fingerprint_type: str | None = Query(None, description="Filter by fingerprint type"),
     is_active: bool | None = Query(None, description="Filter by active status"),
 ) -> Any:
     """
     Retrieve fingerprints with optional filtering.
+    Images are left out; fetch each from /fingerprints/{id}/image.
     """
-    # Parse employee_id if provided
-    employee_uuid = None
-    if employee_id:
-        try:
-            employee_uuid = uuid.UUID(employee_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid employee ID")
+    # One employee's fingerprints are the active ones unless asked otherwise
+    if employee_id and is_active is None:
+        is_active = True
     
-    # Get fingerprints using CRUD functions
-    if employee_uuid:
-        fingerprints = crud.get_employee_fingerprints(session=db, employee_id=employee_uuid)
-    else:
-        # Get all fingerprints (you might want to add pagination here)
-        fingerprints = crud.get_fingerprints(
-            session=db,
-            skip=skip,
-            limit=limit,
-            employee_id=employee_uuid,
-            fingerprint_type=fingerprint_type,
-            is_active=is_active
-        )
+    fingerprints = await crud.get_fingerprints(
+        session=db,
+        skip=skip,
+        limit=limit,
+        employee_id=employee_id,
+        fingerprint_type=fingerprint_type,
+        is_active=is_active
+    )
     
-    return FingerprintsPublic(data=fingerprints, count=len(fingerprints))
+    return PydanticResponse(FingerprintSummariesPublic.model_construct(
+        data=construct_all(FingerprintSummaryPublic, fingerprints), count=len(fingerprints)
+    ))
 
 
 @router.post("/", response_model=FingerprintPublic)
@@ -65,18 +85,17 @@ def create_fingerprint(
     """
     try:
         fingerprint = crud.create_fingerprint(session=db, fingerprint_in=fingerprint_in)
-        return fingerprint
+        invalidate_fingerprint_summaries()
+        return FingerprintPublic.from_fingerprint(fingerprint)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating fingerprint: {str(e)}")
 
 
-@router.post("/upload-image")
+@router.post("/upload-image", dependencies=[Depends(deps.check_fingerprint_upload_size)])
 def upload_fingerprint_image(
     *,
-    db: Session = Depends(deps.get_db),
-    employee_id: str = Query(..., description="Employee ID"),
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    employee_id: uuid.UUID = Query(..., description="Employee ID"),
     fingerprint_type: str = Query("thumb", description="Fingerprint type (thumb, index, middle, ring, pinky)"),
     fingerprint_position: int = Query(..., description="Position number (1-5)"),
     file: UploadFile = File(...),
@@ -85,26 +104,20 @@ def upload_fingerprint_image(
     """
     Upload fingerprint image file.
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
     # Validate file type
-    if not file.content_type.startswith("image/"):
+    if not (file.content_type or "").startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Read and encode file
-    file_content = file.file.read()
-    import base64
-    encoded_data = base64.b64encode(file_content).decode("utf-8")
-    
-    # Create fingerprint data
+    # Read and encode file, stopping at the size limit
+    try:
+        encoded_data = read_upload_base64(file.file, max_bytes=settings.MAX_FINGERPRINT_BYTES)
+    except ValueError:
+        raise HTTPException(status_code=413, detail="Fingerprint image too large")
     fingerprint_data = f"data:{file.content_type};base64,{encoded_data}"
     
     # Create fingerprint record
     fingerprint_in = FingerprintCreate(
-        employee_id=employee_uuid,
+        employee_id=employee_id,
         fingerprint_type=fingerprint_type,
         fingerprint_position=fingerprint_position,
         fingerprint_data=fingerprint_data,
@@ -112,139 +125,235 @@ def upload_fingerprint_image(
         notes=notes
     )
     
-    fingerprint_service = FingerprintStorageService(db)
-    
     try:
         fingerprint = fingerprint_service.create_fingerprint(fingerprint_in)
-        return {
+        invalidate_fingerprint_summaries()
+        # orjson writes the UUID itself, without a str() or jsonable_encoder pass
+        return ORJSONDefaultResponse({
             "message": "Fingerprint uploaded successfully",
-            "fingerprint_id": str(fingerprint.id),
+            "fingerprint_id": fingerprint.id,
             "quality_score": fingerprint.quality_score,
             "file_path": fingerprint.notes
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading fingerprint: {str(e)}")
+
+
+# Static paths go before /{fingerprint_id}, which would otherwise match them
+@router.get("/statistics")
+def get_fingerprint_statistics(
+    *,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+) -> Any:
+    """
+    Get overall fingerprint statistics.
+    """
+    cached = get_cached(FINGERPRINT_STATISTICS_KEY)
+    if cached is not None:
+        return ORJSONDefaultResponse(cached)
+    
+    stats = fingerprint_service.get_fingerprint_statistics()
+    set_cached(FINGERPRINT_STATISTICS_KEY, stats, ttl=SUMMARY_CACHE_TTL)
+    return stats
+
+
+@router.get("/available-devices")
+def get_available_devices(
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Get all available ZKTeco devices from device management.
+    Only returns devices that are added through device management.
+    """
+    cached = get_cached(AVAILABLE_DEVICES_KEY)
+    if cached is not None:
+        return ORJSONDefaultResponse(cached)
+    
+    devices = crud.get_zkteco_devices(session=db, is_active=True)
+    
+    device_list = []
+    for device in devices:
+        device_list.append({
+            "id": str(device.id),
+            "device_id": device.device_id,
+            "device_name": device.device_name,
+            "device_ip": device.device_ip,
+            "device_port": device.device_port,
+            "device_status": device.device_status,
+            "is_active": device.is_active,
+            "last_sync": device.last_sync.isoformat() if device.last_sync else None
+        })
+    
+    available = {
+        "devices": device_list,
+        "count": len(device_list),
+        "message": "Only devices added through device management are shown"
+    }
+    set_cached(AVAILABLE_DEVICES_KEY, available, ttl=DEVICES_CACHE_TTL)
+    return available
 
 
 @router.get("/{fingerprint_id}", response_model=FingerprintPublic)
 def read_fingerprint(
     *,
     db: Session = Depends(deps.get_db),
-    fingerprint_id: str,
+    request: Request,
+    fingerprint_id: uuid.UUID,
 ) -> Any:
     """
     Get fingerprint by ID.
+    Answers 304 when If-None-Match carries the fingerprint's current ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Skips loading the image when the client already has this version
+        updated_at = crud.get_fingerprint_updated_at(session=db, fingerprint_id=fingerprint_id)
+        if updated_at is not None:
+            etag = make_etag(fingerprint_id, updated_at)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+    
+    fingerprint = crud.get_fingerprint(session=db, fingerprint_id=fingerprint_id)
+    if not fingerprint:
+        raise HTTPException(status_code=404, detail="Fingerprint not found")
+    
+    return PydanticResponse(
+        FingerprintPublic.from_fingerprint(fingerprint),
+        headers={"ETag": make_etag(fingerprint.id, fingerprint.updated_at)},
+    )
+
+
+@router.get("/{fingerprint_id}/image", response_class=Response, responses={200: {"content": {"image/*": {}}}})
+def read_fingerprint_image(
+    *,
+    db: Session = Depends(deps.get_db),
+    request: Request,
+    fingerprint_id: uuid.UUID,
+) -> Any:
     """
-    try:
-        fingerprint_uuid = uuid.UUID(fingerprint_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid fingerprint ID")
+    Get the fingerprint image as raw bytes rather than a base64 data URL.
+    Answers 304 when If-None-Match carries the fingerprint's current ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        updated_at = crud.get_fingerprint_updated_at(session=db, fingerprint_id=fingerprint_id)
+        if updated_at is not None:
+            etag = make_etag(fingerprint_id, updated_at)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
     
-    fingerprint = crud.get_fingerprint(session=db, fingerprint_id=fingerprint_uuid)
-    if not fingerprint:
+    image = crud.get_fingerprint_image(session=db, fingerprint_id=fingerprint_id)
+    if not image:
         raise HTTPException(status_code=404, detail="Fingerprint not found")
     
-    return fingerprint
+    media_type, content, updated_at = image
+    return Response(
+        content=content,
+        media_type=media_type or "application/octet-stream",
+        headers={"ETag": make_etag(fingerprint_id, updated_at)},
+    )
 
 
 @router.put("/{fingerprint_id}", response_model=FingerprintPublic)
 def update_fingerprint(
     *,
-    db: Session = Depends(deps.get_db),
-    fingerprint_id: str,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    fingerprint_id: uuid.UUID,
     fingerprint_in: FingerprintUpdate,
 ) -> Any:
     """
     Update fingerprint.
     """
-    try:
-        fingerprint_uuid = uuid.UUID(fingerprint_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid fingerprint ID")
-    
-    fingerprint = crud.get_fingerprint(session=db, fingerprint_id=fingerprint_uuid)
-    if not fingerprint:
+    updated_fingerprint = fingerprint_service.update_fingerprint(fingerprint_id, fingerprint_in)
+    if not updated_fingerprint:
         raise HTTPException(status_code=404, detail="Fingerprint not found")
-    
-    fingerprint_service = FingerprintStorageService(db)
-    
-    try:
-        updated_fingerprint = fingerprint_service.update_fingerprint(fingerprint_uuid, fingerprint_in)
-        return updated_fingerprint
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error updating fingerprint: {str(e)}")
+    invalidate_fingerprint_summaries()
+    return FingerprintPublic.from_fingerprint(updated_fingerprint)
 
 
 @router.delete("/{fingerprint_id}")
 def delete_fingerprint(
     *,
-    db: Session = Depends(deps.get_db),
-    fingerprint_id: str,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    fingerprint_id: uuid.UUID,
 ) -> Any:
     """
     Delete fingerprint.
     """
-    try:
-        fingerprint_uuid = uuid.UUID(fingerprint_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid fingerprint ID")
-    
-    fingerprint_service = FingerprintStorageService(db)
-    
-    success = fingerprint_service.delete_fingerprint(fingerprint_uuid)
+    success = fingerprint_service.delete_fingerprint(fingerprint_id)
     if not success:
         raise HTTPException(status_code=404, detail="Fingerprint not found")
+    invalidate_fingerprint_summaries()
     
     return {"message": "Fingerprint deleted successfully"}
 
 
+@router.get("/employee/summaries", response_model=List[EmployeeFingerprintSummary])
+def get_employee_fingerprint_summaries(
+    *,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    employee_ids: List[uuid.UUID] = Query(..., description="Employee IDs"),
+) -> Any:
+    """
+    Get fingerprint summaries for several employees at once.
+    Unknown employees are left out.
+    """
+    if len(employee_ids) > MAX_SUMMARY_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SUMMARY_BATCH} employees per request")
+    employee_ids = list(dict.fromkeys(employee_ids))
+    
+    # Only the employees missing from the cache go to the database, in one query
+    keys = [fingerprint_summary_key(employee_id) for employee_id in employee_ids]
+    cached = dict(zip(employee_ids, get_cached_many(keys), strict=True))
+    missing = [employee_id for employee_id, summary in cached.items() if summary is None]
+    
+    loaded = fingerprint_service.get_fingerprint_summaries(missing)
+    set_cached_many(
+        {fingerprint_summary_key(employee_id): summary for employee_id, summary in loaded.items()},
+        ttl=SUMMARY_CACHE_TTL,
+    )
+    
+    summaries = [cached[employee_id] or loaded.get(employee_id) for employee_id in employee_ids]
+    return ORJSONDefaultResponse([summary for summary in summaries if summary is not None])
+
+
 @router.get("/employee/{employee_id}/summary", response_model=EmployeeFingerprintSummary)
 def get_employee_fingerprint_summary(
     *,
-    db: Session = Depends(deps.get_db),
-    employee_id: str,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    employee_id: uuid.UUID,
 ) -> Any:
     """
     Get fingerprint summary for an employee.
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
-    fingerprint_service = FingerprintStorageService(db)
+    cache_key = fingerprint_summary_key(employee_id)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return ORJSONDefaultResponse(cached)
     
     try:
-        summary = fingerprint_service.get_fingerprint_summary(employee_uuid)
-        return summary
+        summary = fingerprint_service.get_fingerprint_summary(employee_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    set_cached(cache_key, summary, ttl=SUMMARY_CACHE_TTL)
+    return summary
 
 
-@router.get("/employee/{employee_id}/fingerprints", response_model=FingerprintsPublic)
+@router.get("/employee/{employee_id}/fingerprints", response_model=FingerprintSummariesPublic)
 def get_employee_fingerprints(
     *,
-    db: Session = Depends(deps.get_db),
-    employee_id: str,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    employee_id: uuid.UUID,
     fingerprint_type: str | None = Query(None, description="Filter by fingerprint type"),
 ) -> Any:
     """
-    Get all fingerprints for an employee.
+    Get all fingerprints for an employee, without their images.
     """
     try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
-    fingerprint_service = FingerprintStorageService(db)
-    
-    try:
-        fingerprints = fingerprint_service.get_employee_fingerprints(employee_uuid, fingerprint_type)
-        return FingerprintsPublic(data=fingerprints, count=len(fingerprints))
+        fingerprints = fingerprint_service.get_employee_fingerprints(employee_id, fingerprint_type)
+        return PydanticResponse(FingerprintSummariesPublic.model_construct(
+            data=construct_all(FingerprintSummaryPublic, fingerprints), count=len(fingerprints)
+        ))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -252,22 +361,15 @@ def get_employee_fingerprints(
 @router.get("/employee/{employee_id}/available-positions")
 def get_available_positions(
     *,
-    db: Session = Depends(deps.get_db),
-    employee_id: str,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    employee_id: uuid.UUID,
     fingerprint_type: str = Query(..., description="Fingerprint type"),
 ) -> Any:
     """
     Get available positions for a fingerprint type.
     """
     try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
-    fingerprint_service = FingerprintStorageService(db)
-    
-    try:
-        available_positions = fingerprint_service.get_available_positions(employee_uuid, fingerprint_type)
+        available_positions = fingerprint_service.get_available_positions(employee_id, fingerprint_type)
         return {
             "employee_id": employee_id,
             "fingerprint_type": fingerprint_type,
@@ -281,58 +383,45 @@ def get_available_positions(
 @router.post("/employee/{employee_id}/bulk", response_model=BulkFingerprintResponse)
 def bulk_create_fingerprints(
     *,
-    db: Session = Depends(deps.get_db),
-    employee_id: str,
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    employee_id: uuid.UUID,
     bulk_data: BulkFingerprintCreate,
 ) -> Any:
     """
     Bulk create fingerprints for an employee.
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
     # Validate employee_id matches
-    if bulk_data.employee_id != employee_uuid:
+    if bulk_data.employee_id != employee_id:
         raise HTTPException(status_code=400, detail="Employee ID mismatch")
     
-    fingerprint_service = FingerprintStorageService(db)
-    
     try:
-        results = fingerprint_service.bulk_create_fingerprints(employee_uuid, bulk_data.fingerprints)
+        results = fingerprint_service.bulk_create_fingerprints(employee_id, bulk_data.fingerprints)
+        invalidate_fingerprint_summaries()
         return BulkFingerprintResponse(**results)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating fingerprints: {str(e)}")
 
 
-@router.post("/employee/{employee_id}/bulk-thumbs")
+@router.post("/employee/{employee_id}/bulk-thumbs", dependencies=[Depends(deps.check_bulk_thumb_upload_size)])
 def bulk_create_thumb_fingerprints(
     *,
-    db: Session = Depends(deps.get_db),
-    employee_id: str,
-    fingerprint_data_list: List[str] = Query(..., description="List of base64 encoded fingerprint images"),
+    fingerprint_service: FingerprintStorageService = Depends(get_storage_service),
+    employee_id: uuid.UUID,
+    files: List[UploadFile] = File(..., description="Thumb fingerprint images"),
     notes: str | None = Query(None, description="Optional notes"),
 ) -> Any:
     """
     Bulk create thumb fingerprints for an employee (up to 5 thumbs).
     """
-    try:
-        employee_uuid = uuid.UUID(employee_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid employee ID")
-    
-    if len(fingerprint_data_list) > 5:
-        raise HTTPException(status_code=400, detail="Maximum 5 thumb fingerprints allowed")
-    
-    fingerprint_service = FingerprintStorageService(db)
+    if len(files) > deps.MAX_BULK_THUMBS:
+        raise HTTPException(status_code=400, detail=f"Maximum {deps.MAX_BULK_THUMBS} thumb fingerprints allowed")
+    if not all((file.content_type or "").startswith("image/") for file in files):
+        raise HTTPException(status_code=400, detail="Files must be images")
     
     # Get available positions
-    available_positions = fingerprint_service.get_available_positions(employee_uuid, "thumb")
+    available_positions = fingerprint_service.get_available_positions(employee_id, "thumb")
     
-    if len(fingerprint_data_list) > len(available_positions):
+    if len(files) > len(available_positions):
         raise HTTPException(
             status_code=400, 
             detail=f"Only {len(available_positions)} positions available for thumb fingerprints"
@@ -340,59 +429,39 @@ def bulk_create_thumb_fingerprints(
     
     # Create fingerprint records
     fingerprints = []
-    for i, fingerprint_data in enumerate(fingerprint_data_list):
+    for file, position in zip(files, available_positions, strict=False):
+        try:
+            encoded_data = read_upload_base64(file.file, max_bytes=settings.MAX_FINGERPRINT_BYTES)
+        except ValueError:
+            raise HTTPException(status_code=413, detail="Fingerprint image too large")
         fingerprint_in = FingerprintCreate(
-            employee_id=employee_uuid,
+            employee_id=employee_id,
             fingerprint_type="thumb",
-            fingerprint_position=available_positions[i],
-            fingerprint_data=fingerprint_data,
+            fingerprint_position=position,
+            fingerprint_data=f"data:{file.content_type};base64,{encoded_data}",
             fingerprint_format="image",
             notes=notes
         )
         fingerprints.append(fingerprint_in)
     
-    try:
-        results = fingerprint_service.bulk_create_fingerprints(employee_uuid, fingerprints)
-        return {
-            "message": f"Successfully created {results['total_added']} thumb fingerprints",
-            "results": results
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating thumb fingerprints: {str(e)}")
-
-
-@router.get("/statistics")
-def get_fingerprint_statistics(
-    *,
-    db: Session = Depends(deps.get_db),
-) -> Any:
-    """
-    Get overall fingerprint statistics.
-    """
-    fingerprint_service = FingerprintStorageService(db)
-    
-    try:
-        stats = fingerprint_service.get_fingerprint_statistics()
-        return stats
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting statistics: {str(e)}")
+    results = fingerprint_service.bulk_create_fingerprints(employee_id, fingerprints)
+    invalidate_fingerprint_summaries()
+    return {
+        "message": f"Successfully created {results['total_added']} thumb fingerprints",
+        "results": results
+    }
 
 
 @router.get("/validate/{fingerprint_id}")
 def validate_fingerprint_quality(
     *,
     db: Session = Depends(deps.get_db),
-    fingerprint_id: str,
+    fingerprint_id: uuid.UUID,
 ) -> Any:
     """
     Validate fingerprint quality and provide recommendations.
     """
-    try:
-        fingerprint_uuid = uuid.UUID(fingerprint_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid fingerprint ID")
-    
-    fingerprint = crud.get_fingerprint(session=db, fingerprint_id=fingerprint_uuid)
+    fingerprint = crud.get_fingerprint(session=db, fingerprint_id=fingerprint_id)
     if not fingerprint:
         raise HTTPException(status_code=404, detail="Fingerprint not found")
     
@@ -425,23 +494,19 @@ def validate_fingerprint_quality(
 
 @router.post("/capture-from-device/{device_id}/{employee_id}")
 def capture_fingerprint_from_device(
-    device_id: str,
+    device_id: uuid.UUID,
     employee_id: UUID,
     fingerprint_type: str = "thumb",
     position: int = 1,
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    fingerprint_service: ZKTecoFingerprintService = Depends(get_device_fingerprint_service)
 ):
     """
     Capture fingerprint directly from ZKTeco device.
     Device must be added and connected through device management first.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
     # Get device from database (must be added through device management)
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device_cached(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found. Please add device through device management first.")
     
@@ -452,43 +517,33 @@ def capture_fingerprint_from_device(
             detail=f"Device {device.device_name} is not connected. Please connect the device through device management first."
         )
     
-    # Use ZKTeco fingerprint service
-    fingerprint_service = ZKTecoFingerprintService(db)
+    fingerprint = fingerprint_service.capture_fingerprint_from_device(
+        device=device,
+        employee_id=employee_id,
+        fingerprint_type=fingerprint_type,
+        position=position
+    )
     
-    try:
-        fingerprint = fingerprint_service.capture_fingerprint_from_device(
-            device=device,
-            employee_id=employee_id,
-            fingerprint_type=fingerprint_type,
-            position=position
-        )
-        
-        if not fingerprint:
-            raise HTTPException(status_code=400, detail="Failed to capture fingerprint from device")
-        
-        return fingerprint
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error capturing fingerprint: {str(e)}")
+    if not fingerprint:
+        raise HTTPException(status_code=400, detail="Failed to capture fingerprint from device")
+    invalidate_fingerprint_summaries()
+    
+    return fingerprint
 
 
 @router.post("/verify-on-device/{device_id}/{employee_id}")
 def verify_fingerprint_on_device(
-    device_id: str,
+    device_id: uuid.UUID,
     employee_id: UUID,
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    fingerprint_service: ZKTecoFingerprintService = Depends(get_device_fingerprint_service)
 ):
     """
     Verify fingerprint on ZKTeco device in real-time.
     Device must be added and connected through device management first.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
     # Get device from database (must be added through device management)
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device_cached(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found. Please add device through device management first.")
     
@@ -499,37 +554,26 @@ def verify_fingerprint_on_device(
             detail=f"Device {device.device_name} is not connected. Please connect the device through device management first."
         )
     
-    # Use ZKTeco fingerprint service
-    fingerprint_service = ZKTecoFingerprintService(db)
+    is_verified = fingerprint_service.verify_fingerprint_on_device(
+        device=device,
+        employee_id=employee_id
+    )
     
-    try:
-        is_verified = fingerprint_service.verify_fingerprint_on_device(
-            device=device,
-            employee_id=employee_id
-        )
-        
-        return {"verified": is_verified, "employee_id": employee_id, "device_id": device_id}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error verifying fingerprint: {str(e)}")
+    return {"verified": is_verified, "employee_id": employee_id, "device_id": device_id}
 
 
-@router.post("/sync-from-device/{device_id}")
+@router.post("/sync-from-device/{device_id}", status_code=202)
 def sync_fingerprints_from_device(
-    device_id: str,
+    device_id: uuid.UUID,
     db: Session = Depends(deps.get_db)
 ):
     """
-    Sync all fingerprints from ZKTeco device to database.
+    Queue a sync of all fingerprints from ZKTeco device to database.
     Device must be added and connected through device management first.
+    Poll GET /attendance/syncs/{sync_id} for the result.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
     # Get device from database (must be added through device management)
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device_cached(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found. Please add device through device management first.")
     
@@ -540,41 +584,36 @@ def sync_fingerprints_from_device(
             detail=f"Device {device.device_name} is not connected. Please connect the device through device management first."
         )
     
-    # Use ZKTeco fingerprint service
-    fingerprint_service = ZKTecoFingerprintService(db)
+    # The device scan and inserts run on a sync worker, not in the request
+    sync_log = crud.create_device_sync_log(
+        session=db,
+        sync_log_in=DeviceSyncLogBase(device_id=device.id, sync_type="fingerprints", sync_status="queued"),
+    )
+    anyio.from_thread.run(enqueue_fingerprint_sync, sync_log.id)
     
-    try:
-        count, status = fingerprint_service.sync_fingerprints_from_device(device)
-        
-        return {
-            "fingerprints_synced": count,
-            "status": status,
-            "device_id": device_id
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error syncing fingerprints: {str(e)}")
+    return {
+        "message": f"Fingerprint sync queued for device {device.device_name}",
+        "sync_id": sync_log.id,
+        "device_id": device_id,
+        "status": sync_log.sync_status
+    }
 
 
-@router.post("/enroll-on-device/{device_id}/{employee_id}")
+@router.post("/enroll-on-device/{device_id}/{employee_id}", status_code=202)
 def enroll_fingerprint_on_device(
-    device_id: str,
+    device_id: uuid.UUID,
     employee_id: UUID,
     fingerprint_type: str = "thumb",
     position: int = 1,
     db: Session = Depends(deps.get_db)
 ):
     """
-    Enroll a new fingerprint on ZKTeco device.
+    Queue enrollment of a new fingerprint on ZKTeco device.
     Device must be added and connected through device management first.
+    Poll GET /attendance/syncs/{enrollment_id} for the result.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
     # Get device from database (must be added through device management)
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device_cached(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found. Please add device through device management first.")
     
@@ -585,42 +624,35 @@ def enroll_fingerprint_on_device(
             detail=f"Device {device.device_name} is not connected. Please connect the device through device management first."
         )
     
-    # Use ZKTeco fingerprint service
-    fingerprint_service = ZKTecoFingerprintService(db)
+    # The device round trip runs on a sync worker, not in the request
+    sync_log = crud.create_device_sync_log(
+        session=db,
+        sync_log_in=DeviceSyncLogBase(device_id=device.id, sync_type="enroll", sync_status="queued"),
+    )
+    # The session is sync, so this runs in the threadpool; the queue lives on the loop
+    anyio.from_thread.run(enqueue_enrollment, sync_log.id, employee_id, fingerprint_type, position)
     
-    try:
-        success = fingerprint_service.enroll_fingerprint_on_device(
-            device=device,
-            employee_id=employee_id,
-            fingerprint_type=fingerprint_type,
-            position=position
-        )
-        
-        if not success:
-            raise HTTPException(status_code=400, detail="Failed to enroll fingerprint on device")
-        
-        return {"success": True, "employee_id": employee_id, "device_id": device_id}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error enrolling fingerprint: {str(e)}")
+    return {
+        "message": f"Enrollment queued on device {device.device_name}",
+        "enrollment_id": sync_log.id,
+        "employee_id": employee_id,
+        "device_id": device_id,
+        "status": sync_log.sync_status
+    }
 
 
 @router.get("/device-users/{device_id}")
 def get_device_users(
-    device_id: str,
-    db: Session = Depends(deps.get_db)
+    device_id: uuid.UUID,
+    db: Session = Depends(deps.get_db),
+    fingerprint_service: ZKTecoFingerprintService = Depends(get_device_fingerprint_service)
 ):
     """
     Get all users from ZKTeco device.
     Device must be added and connected through device management first.
     """
-    try:
-        device_uuid = uuid.UUID(device_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid device ID")
-    
     # Get device from database (must be added through device management)
-    device = crud.get_zkteco_device(session=db, device_id=device_uuid)
+    device = crud.get_zkteco_device_cached(session=db, device_id=device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found. Please add device through device management first.")
     
@@ -631,47 +663,6 @@ def get_device_users(
             detail=f"Device {device.device_name} is not connected. Please connect the device through device management first."
         )
     
-    # Use ZKTeco fingerprint service
-    fingerprint_service = ZKTecoFingerprintService(db)
+    users = fingerprint_service.get_device_users(device)
     
-    try:
-        users = fingerprint_service.get_device_users(device)
-        
-        return {"users": users, "count": len(users), "device_id": device_id}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting device users: {str(e)}")
-
-
-@router.get("/available-devices")
-def get_available_devices(
-    db: Session = Depends(deps.get_db)
-):
-    """
-    Get all available ZKTeco devices from device management.
-    Only returns devices that are added through device management.
-    """
-    try:
-        devices = crud.get_zkteco_devices(session=db, is_active=True)
-        
-        device_list = []
-        for device in devices:
-            device_list.append({
-                "id": str(device.id),
-                "device_id": device.device_id,
-                "device_name": device.device_name,
-                "device_ip": device.device_ip,
-                "device_port": device.device_port,
-                "device_status": device.device_status,
-                "is_active": device.is_active,
-                "last_sync": device.last_sync.isoformat() if device.last_sync else None
-            })
-        
-        return {
-            "devices": device_list,
-            "count": len(device_list),
-            "message": "Only devices added through device management are shown"
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting available devices: {str(e)}")
+    return {"users": users, "count": len(users), "device_id": device_id}
@@ -3,10 +3,12 @@ from datetime import date, timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.api import deps
+from app.core.cache import calendar_month_key, get_cached_async, invalidate_calendar_async, set_cached_async
+from app.core.responses import ORJSONDefaultResponse, PydanticResponse
 from app.models import (
     Holiday, HolidayCreate, HolidayPublic, HolidayUpdate, 
     HolidaysPublic, CalendarEvent, CalendarView
@@ -14,10 +16,30 @@ from app.models import (
 
 router = APIRouter()
 
+# Cached calendar months expire after this; holiday writes here invalidate them sooner
+CALENDAR_CACHE_TTL = 300
+
+
+def _calendar_events(occurrences: list[tuple[Holiday, date]]) -> list[CalendarEvent]:
+    # Built from loaded rows, so the fields need no validation
+    return [
+        CalendarEvent.model_construct(
+            id=holiday.id,
+            title=holiday.title,
+            description=holiday.description,
+            date=occurrence_date,
+            holiday_type=holiday.holiday_type,
+            color=holiday.color,
+            is_recurring=holiday.is_recurring,
+            recurrence_pattern=holiday.recurrence_pattern
+        )
+        for holiday, occurrence_date in occurrences
+    ]
+
 
 @router.get("/", response_model=HolidaysPublic)
-def read_holidays(
-    db: Session = Depends(deps.get_db),
+async def read_holidays(
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     year: int | None = Query(None, description="Filter by year"),
@@ -27,7 +49,7 @@ def read_holidays(
     """
     Retrieve holidays.
     """
-    holidays = crud.get_holidays(
+    holidays = await crud.get_holidays(
         session=db, 
         skip=skip, 
         limit=limit, 
@@ -39,98 +61,86 @@ def read_holidays(
 
 
 @router.post("/", response_model=HolidayPublic)
-def create_holiday(
+async def create_holiday(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: deps.CurrentUser,
     holiday_in: HolidayCreate,
 ) -> Any:
     """
     Create new holiday.
     """
-    holiday = crud.create_holiday(
+    holiday = await crud.create_holiday(
         session=db, 
         holiday_in=holiday_in, 
         created_by=current_user.id
     )
+    await invalidate_calendar_async()
     return holiday
 
 
 @router.get("/{holiday_id}", response_model=HolidayPublic)
-def read_holiday(
+async def read_holiday(
     *,
-    db: Session = Depends(deps.get_db),
-    holiday_id: str,
+    db: AsyncSession = Depends(deps.get_async_db),
+    holiday_id: uuid.UUID,
 ) -> Any:
     """
     Get holiday by ID.
     """
-    try:
-        holiday_uuid = uuid.UUID(holiday_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid holiday ID")
-    
-    holiday = crud.get_holiday(session=db, holiday_id=holiday_uuid)
+    holiday = await crud.get_holiday(session=db, holiday_id=holiday_id)
     if not holiday:
         raise HTTPException(status_code=404, detail="Holiday not found")
     return holiday
 
 
 @router.put("/{holiday_id}", response_model=HolidayPublic)
-def update_holiday(
+async def update_holiday(
     *,
-    db: Session = Depends(deps.get_db),
-    holiday_id: str,
+    db: AsyncSession = Depends(deps.get_async_db),
+    holiday_id: uuid.UUID,
     holiday_in: HolidayUpdate,
 ) -> Any:
     """
     Update holiday.
     """
-    try:
-        holiday_uuid = uuid.UUID(holiday_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid holiday ID")
-    
-    holiday = crud.get_holiday(session=db, holiday_id=holiday_uuid)
+    holiday = await crud.update_holiday(session=db, holiday_id=holiday_id, holiday_in=holiday_in)
     if not holiday:
         raise HTTPException(status_code=404, detail="Holiday not found")
-    
-    holiday = crud.update_holiday(session=db, db_holiday=holiday, holiday_in=holiday_in)
+    await invalidate_calendar_async()
     return holiday
 
 
 @router.delete("/{holiday_id}")
-def delete_holiday(
+async def delete_holiday(
     *,
-    db: Session = Depends(deps.get_db),
-    holiday_id: str,
+    db: AsyncSession = Depends(deps.get_async_db),
+    holiday_id: uuid.UUID,
 ) -> Any:
     """
     Delete holiday.
     """
-    try:
-        holiday_uuid = uuid.UUID(holiday_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid holiday ID")
-    
-    holiday = crud.get_holiday(session=db, holiday_id=holiday_uuid)
-    if not holiday:
+    if not await crud.delete_holiday(session=db, holiday_id=holiday_id):
         raise HTTPException(status_code=404, detail="Holiday not found")
-    
-    crud.delete_holiday(session=db, holiday_id=holiday_uuid)
+    await invalidate_calendar_async()
     return {"message": "Holiday deleted successfully"}
 
 
 @router.get("/calendar/{year}/{month}", response_model=CalendarView)
-def get_calendar_view(
+async def get_calendar_view(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     year: int,
     month: int,
 ) -> Any:
     """
     Get calendar view for a specific month.
     """
+    cache_key = calendar_month_key(year, month)
+    cached = await get_cached_async(cache_key)
+    if cached is not None:
+        return ORJSONDefaultResponse(cached)
+    
     # Calculate start and end dates for the month
     start_date = date(year, month, 1)
     if month == 12:
@@ -139,66 +149,45 @@ def get_calendar_view(
         end_date = date(year, month + 1, 1) - timedelta(days=1)
     
     # Get holidays for the month (including recurring ones)
-    holidays = crud.get_holidays_for_date_range(
+    holidays = await crud.get_holidays_for_date_range(
         session=db, 
         start_date=start_date, 
         end_date=end_date
     )
     
-    # Convert to CalendarEvent format
-    calendar_events = []
-    for holiday in holidays:
-        calendar_events.append(CalendarEvent(
-            id=holiday.id,
-            title=holiday.title,
-            description=holiday.description,
-            date=holiday.holiday_date,
-            holiday_type=holiday.holiday_type,
-            color=holiday.color,
-            is_recurring=holiday.is_recurring,
-            recurrence_pattern=holiday.recurrence_pattern
-        ))
+    calendar_events = _calendar_events(holidays)
     
-    return CalendarView(
+    calendar_view = CalendarView.model_construct(
         year=year,
         month=month,
         events=calendar_events,
         holidays=calendar_events
     )
+    await set_cached_async(cache_key, calendar_view, ttl=CALENDAR_CACHE_TTL)
+    return PydanticResponse(calendar_view)
 
 
 @router.get("/calendar/range/")
-def get_calendar_range(
+async def get_calendar_range(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     start_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
     end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
 ) -> Any:
     """
     Get calendar events for a date range.
     """
-    holidays = crud.get_holidays_for_date_range(
+    holidays = await crud.get_holidays_for_date_range(
         session=db, 
         start_date=start_date, 
         end_date=end_date
     )
     
-    calendar_events = []
-    for holiday in holidays:
-        calendar_events.append(CalendarEvent(
-            id=holiday.id,
-            title=holiday.title,
-            description=holiday.description,
-            date=holiday.holiday_date,
-            holiday_type=holiday.holiday_type,
-            color=holiday.color,
-            is_recurring=holiday.is_recurring,
-            recurrence_pattern=holiday.recurrence_pattern
-        ))
+    calendar_events = _calendar_events(holidays)
     
-    return {
+    return ORJSONDefaultResponse({
         "start_date": start_date,
         "end_date": end_date,
         "events": calendar_events,
         "count": len(calendar_events)
-    } 
\ No newline at end of file
+    }) 
\ No newline at end of file
@@ -4,6 +4,7 @@ from sqlmodel import func, select
 from datetime import datetime, timedelta
 
 from app.api.deps import get_current_active_superuser, SessionDep
+from app.core.db import async_engine, engine
 from app.models import Message, Department, Employee
 from app.utils import generate_test_email, send_email
 
@@ -33,6 +34,22 @@ async def health_check() -> bool:
     return True
 
 
+@router.get("/db-pool/", dependencies=[Depends(get_current_active_superuser)])
+def db_pool_status() -> dict:
+    """
+    Connection pool usage of this worker process, per engine.
+    """
+    return {
+        name: {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+        for name, pool in (("sync", engine.pool), ("async", async_engine.pool))
+    }
+
+
 @router.get("/dashboard-stats/")
 def get_dashboard_stats(session: SessionDep) -> dict:
     """
@@ -44,25 +61,27 @@ def get_dashboard_stats(session: SessionDep) -> dict:
     active_employees = session.exec(select(func.count(Employee.id)).where(Employee.is_active == True)).one()
     inactive_employees = total_employees - active_employees
 
-    # Get employees by department
-    departments = session.exec(select(Department)).all()
-    department_stats = []
-    
-    for dept in departments:
-        dept_employees = session.exec(
-            select(Employee).where(Employee.department_id == dept.id)
-        ).all()
-        
-        dept_active = len([e for e in dept_employees if e.is_active])
-        dept_inactive = len(dept_employees) - dept_active
-        
-        department_stats.append({
-            "id": str(dept.id),
-            "name": dept.name,
-            "total_employees": len(dept_employees),
-            "active_employees": dept_active,
-            "inactive_employees": dept_inactive
-        })
+    # Get employees by department, counted in SQL rather than loading every employee
+    department_rows = session.exec(
+        select(
+            Department.id,
+            Department.name,
+            func.count(Employee.id).label("total_employees"),
+            func.count(Employee.id).filter(Employee.is_active == True).label("active_employees"),
+        )
+        .outerjoin(Employee, Employee.department_id == Department.id)
+        .group_by(Department.id)
+    ).all()
+    department_stats = [
+        {
+            "id": str(row.id),
+            "name": row.name,
+            "total_employees": row.total_employees,
+            "active_employees": row.active_employees,
+            "inactive_employees": row.total_employees - row.active_employees
+        }
+        for row in department_rows
+    ]
 
     # Get recent hires (last 6 months)
     six_months_ago = datetime.utcnow() - timedelta(days=180)
@@ -0,0 +1,209 @@
+import logging
+from datetime import date
+from typing import Any
+
+import orjson
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+from app.core.responses import orjson_default
+
+logger = logging.getLogger(__name__)
+
+# Caching is off when REDIS_URL is not set (e.g. local development)
+redis_client = redis.Redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
+# For async routes, so a cache round trip does not block the event loop
+async_redis_client = redis.asyncio.Redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
+
+
+def daily_report_key(report_date: date, department_id: Any = None, page: str = "") -> str:
+    return f"report:daily:{report_date.isoformat()}:{department_id or 'all'}:{page}"
+
+
+def monthly_report_key(year: int, month: int, department_id: Any = None, page: str = "") -> str:
+    return f"report:monthly:{year:04d}-{month:02d}:{department_id or 'all'}:{page}"
+
+
+def employee_summary_key(employee_id: Any, start_date: date, end_date: date) -> str:
+    return f"report:employee:{employee_id}:{start_date.isoformat()}:{end_date.isoformat()}"
+
+
+def department_summary_key(attendance_date: date, department_id: Any) -> str:
+    return f"report:department:{attendance_date.isoformat()}:{department_id}"
+
+
+DEVICE_DASHBOARD_KEY = "report:devices:dashboard"
+
+
+def employee_list_key(department_id: Any, skip: int, limit: int, cursor: str | None) -> str:
+    return f"employees:list:{department_id or 'all'}:{skip}:{limit}:{cursor or ''}"
+
+
+def employee_key(employee_id: Any) -> str:
+    return f"employees:{employee_id}"
+
+
+def fingerprint_summary_key(employee_id: Any) -> str:
+    # Under employees: so employee writes drop it along with the employee
+    return f"employees:{employee_id}:fingerprint-summary"
+
+
+def calendar_month_key(year: int, month: int) -> str:
+    return f"calendar:{year:04d}-{month:02d}"
+
+
+AVAILABLE_DEVICES_KEY = "devices:available"
+FINGERPRINT_STATISTICS_KEY = "fingerprints:statistics"
+
+
+def get_cached(key: str) -> Any | None:
+    """Return the JSON value stored under key, or None on a miss or Redis error"""
+    if redis_client is None:
+        return None
+    try:
+        value = redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {str(e)}")
+        return None
+    return orjson.loads(value) if value is not None else None
+
+
+def set_cached(key: str, value: Any, ttl: int = settings.CACHE_TTL) -> None:
+    if redis_client is None:
+        return
+    try:
+        redis_client.setex(key, ttl, orjson.dumps(value, default=orjson_default))
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+
+def get_cached_many(keys: list[str]) -> list[Any | None]:
+    """get_cached for several keys in one round trip, None for each miss"""
+    if redis_client is None or not keys:
+        return [None] * len(keys)
+    try:
+        values = redis_client.mget(keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {len(keys)} keys: {str(e)}")
+        return [None] * len(keys)
+    return [orjson.loads(value) if value is not None else None for value in values]
+
+
+def set_cached_many(values: dict[str, Any], ttl: int = settings.CACHE_TTL) -> None:
+    if redis_client is None or not values:
+        return
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.setex(key, ttl, orjson.dumps(value, default=orjson_default))
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {len(values)} keys: {str(e)}")
+
+
+async def get_cached_async(key: str) -> Any | None:
+    """get_cached for async routes"""
+    if async_redis_client is None:
+        return None
+    try:
+        value = await async_redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {str(e)}")
+        return None
+    return orjson.loads(value) if value is not None else None
+
+
+async def set_cached_async(key: str, value: Any, ttl: int = settings.CACHE_TTL) -> None:
+    if async_redis_client is None:
+        return
+    try:
+        await async_redis_client.setex(key, ttl, orjson.dumps(value, default=orjson_default))
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+
+def _unlink_matching(patterns: set[str]) -> None:
+    try:
+        for pattern in patterns:
+            keys = list(redis_client.scan_iter(match=pattern, count=500))
+            if keys:
+                redis_client.unlink(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation failed: {str(e)}")
+
+
+async def _unlink_matching_async(patterns: set[str]) -> None:
+    try:
+        for pattern in patterns:
+            keys = [key async for key in async_redis_client.scan_iter(match=pattern, count=500)]
+            if keys:
+                await async_redis_client.unlink(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation failed: {str(e)}")
+
+
+def invalidate_reports(*days: date) -> None:
+    """Drop cached reports covering the given days, or every report if none are given"""
+    if redis_client is None:
+        return
+    if days:
+        patterns = set()
+        for day in days:
+            patterns.add(f"report:daily:{day.isoformat()}:*")
+            patterns.add(f"report:monthly:{day.year:04d}-{day.month:02d}:*")
+            patterns.add(f"report:department:{day.isoformat()}:*")
+        # Employee summaries cover arbitrary ranges, so drop them all
+        patterns.add("report:employee:*")
+    else:
+        patterns = {"report:*"}
+    _unlink_matching(patterns)
+
+
+def invalidate_employees() -> None:
+    """Drop every cached employee list and employee"""
+    if redis_client is None:
+        return
+    _unlink_matching({"employees:*"})
+
+
+def invalidate_fingerprint_summaries() -> None:
+    """Drop every cached employee fingerprint summary and the fingerprint statistics"""
+    if redis_client is None:
+        return
+    _unlink_matching({"employees:*:fingerprint-summary", FINGERPRINT_STATISTICS_KEY})
+
+
+def invalidate_devices() -> None:
+    """Drop the cached list of available devices"""
+    if redis_client is None:
+        return
+    try:
+        redis_client.unlink(AVAILABLE_DEVICES_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation failed: {str(e)}")
+
+
+async def invalidate_calendar_async() -> None:
+    """Drop every cached calendar month"""
+    if async_redis_client is None:
+        return
+    await _unlink_matching_async({"calendar:*"})
+
+
+async def warm_up_redis() -> None:
+    """Connect both clients now rather than on the first cached request"""
+    if redis_client is None:
+        return
+    try:
+        redis_client.ping()
+        await async_redis_client.ping()
+    except redis.RedisError as e:
+        logger.warning(f"Redis is not reachable yet: {str(e)}")
+
+
+async def close_redis() -> None:
+    if redis_client is None:
+        return
+    redis_client.close()
+    await async_redis_client.aclose()
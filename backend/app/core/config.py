@@ -69,6 +69,46 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> PostgresDsn:
+        return MultiHostUrl.build(
+            scheme="postgresql+asyncpg",
+            username=self.POSTGRES_USER,
+            password=self.POSTGRES_PASSWORD,
+            host=self.POSTGRES_SERVER,
+            port=self.POSTGRES_PORT,
+            path=self.POSTGRES_DB,
+        )
+
+    # Connection pool per engine and per worker process. The app runs a sync
+    # and an async engine in each uvicorn worker, so keep
+    # workers * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) within Postgres
+    # max_connections minus its reserved connections (100 - 10 with 4 workers)
+    DB_POOL_SIZE: int = 8
+    DB_MAX_OVERFLOW: int = 3
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 3600
+    # Set when POSTGRES_SERVER is a transaction-mode pooler such as PgBouncer,
+    # which may hand each transaction a different server connection
+    POSTGRES_TRANSACTION_POOLING: bool = False
+    # Postgres itself, for work that needs a server session of its own such
+    # as the scheduler's advisory lock; unset means POSTGRES_SERVER is Postgres
+    POSTGRES_DIRECT_SERVER: str | None = None
+    POSTGRES_DIRECT_PORT: int = 5432
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def SQLALCHEMY_DIRECT_DATABASE_URI(self) -> PostgresDsn:
+        return MultiHostUrl.build(
+            scheme="postgresql+psycopg",
+            username=self.POSTGRES_USER,
+            password=self.POSTGRES_PASSWORD,
+            host=self.POSTGRES_DIRECT_SERVER or self.POSTGRES_SERVER,
+            port=self.POSTGRES_DIRECT_PORT if self.POSTGRES_DIRECT_SERVER else self.POSTGRES_PORT,
+            path=self.POSTGRES_DB,
+        )
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -107,6 +147,9 @@ class Settings(BaseSettings):
     # File upload settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_FILE_TYPES: list[str] = ["image/jpeg", "image/png", "image/gif"]
+    # Raw fingerprint image; its base64 data URL must fit the 1,000,000
+    # characters FingerprintCreate.fingerprint_data allows
+    MAX_FINGERPRINT_BYTES: int = 700 * 1024
     
     # Cache settings
     CACHE_TTL: int = 300  # 5 minutes
@@ -1,11 +1,69 @@
+import asyncio
+from contextlib import AsyncExitStack, ExitStack
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
-from app.models import User, UserCreate, Holiday, HolidayCreate
+from app.models import User, UserCreate, Holiday, HolidayCreate, HolidayOccurrence
 from datetime import date
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+_pool_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    # Replace connections Postgres or a proxy closed while they sat idle
+    "pool_pre_ping": True,
+}
+_connect_args: dict[str, Any] = {}
+# asyncpg prepares every statement; keep more of them per connection than its
+# default 100 so the hot lookups are not re-prepared
+_async_connect_args: dict[str, Any] = {"prepared_statement_cache_size": 256}
+if settings.POSTGRES_TRANSACTION_POOLING:
+    # Server-side prepared statements belong to one server connection, so
+    # psycopg must not prepare and asyncpg must not cache them. asyncpg still
+    # prepares each statement once, under a name unique across clients.
+    _connect_args = {"prepare_threshold": None}
+    _async_connect_args = {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), connect_args=_connect_args, **_pool_options)
+# asyncpg speaks the binary protocol, so uuid and timestamp columns skip text parsing
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_ASYNC_DATABASE_URI), connect_args=_async_connect_args, **_pool_options
+)
+
+
+async def warm_up_pools(size: int = settings.DB_POOL_SIZE) -> None:
+    """Open `size` connections on each engine before the first request needs them.
+
+    They are held together so the pools really grow to that size, then go
+    back to the pools for requests to reuse.
+    """
+    def warm_sync() -> None:
+        with ExitStack() as stack:
+            for _ in range(size):
+                stack.enter_context(engine.connect()).execute(text("SELECT 1"))
+
+    async with AsyncExitStack() as stack:
+        for _ in range(size):
+            connection = await stack.enter_async_context(async_engine.connect())
+            await connection.execute(text("SELECT 1"))
+    await asyncio.to_thread(warm_sync)
+
+
+async def dispose_pools() -> None:
+    engine.dispose()
+    await async_engine.dispose()
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -13,6 +71,73 @@ engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 # for more details: https://github.com/fastapi/full-stack-fastapi-template/issues/28
 
 
+# Monthly attendance partitions kept ready beyond the current month
+ATTENDANCE_PARTITION_MONTHS_AHEAD = 3
+# pg_advisory_xact_lock keys serializing each maintenance job between prestart
+# and the schedulers of every app process
+_ATTENDANCE_PARTITION_LOCK = 4_870_001
+_HOLIDAY_OCCURRENCE_LOCK = 4_870_003
+
+
+def ensure_attendance_partitions(session: Session, months_ahead: int = ATTENDANCE_PARTITION_MONTHS_AHEAD) -> None:
+    """Create the monthly attendance partitions for this month and the next ones."""
+    session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ATTENDANCE_PARTITION_LOCK})
+    today = date.today()
+    year, month = today.year, today.month
+    for _ in range(months_ahead + 1):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        name = f"attendance_{year:04d}_{month:02d}"
+        if session.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            _create_attendance_partition(session, name, date(year, month, 1), date(next_year, next_month, 1))
+        year, month = next_year, next_month
+    session.commit()
+
+
+def _create_attendance_partition(session: Session, name: str, start: date, end: date) -> None:
+    create = text(
+        f"CREATE TABLE {name} PARTITION OF attendance FOR VALUES "
+        f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}') "
+        f"WITH (autovacuum_vacuum_scale_factor = 0.05, fillfactor = 80)"
+    )
+    in_range = "check_in_time >= :start AND check_in_time < :end"
+    bounds = {"start": start, "end": end}
+    if not session.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM attendance_default WHERE {in_range})"), bounds
+    ).scalar():
+        session.execute(create)
+        return
+    # Postgres refuses a partition whose rows sit in the default partition, so
+    # take the default out, create the month, move its rows over and put the
+    # default back. attendance stays locked against writes until commit.
+    session.execute(text("ALTER TABLE attendance DETACH PARTITION attendance_default"))
+    session.execute(create)
+    session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM attendance_default WHERE {in_range} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    session.execute(text("ALTER TABLE attendance ATTACH PARTITION attendance_default DEFAULT"))
+
+
+def ensure_holiday_occurrences(session: Session) -> None:
+    """Recompute holiday_occurrence for the window around the current year."""
+    # Prestart and the scheduler may refresh at the same time
+    session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _HOLIDAY_OCCURRENCE_LOCK})
+    start_date, end_date = crud.holiday_occurrence_window(extra_years=1)
+    rows = [
+        row
+        for holiday in session.exec(select(Holiday).where(Holiday.is_active == True)).all()
+        for row in crud.holiday_occurrence_rows(holiday, start_date, end_date)
+    ]
+    session.execute(delete(HolidayOccurrence))
+    if rows:
+        # A holiday may be saved, storing its own occurrences, meanwhile
+        session.execute(insert(HolidayOccurrence).on_conflict_do_nothing(), rows)
+    session.commit()
+
+
 def init_db(session: Session) -> None:
     # Tables should be created with Alembic migrations
     # But if you don't want to use migrations, create
@@ -22,6 +147,8 @@ def init_db(session: Session) -> None:
     # This works because the models are already imported and registered from app.models
     # SQLModel.metadata.create_all(engine)
 
+    ensure_attendance_partitions(session)
+
     user = session.exec(
         select(User).where(User.email == settings.FIRST_SUPERUSER)
     ).first()
@@ -252,3 +379,5 @@ def init_db(session: Session) -> None:
                 )
                 session.add(holiday)
             session.commit()
+
+    ensure_holiday_occurrences(session)
@@ -1,5 +1,9 @@
+import logging
 from typing import Any, Dict, Optional
-from fastapi import HTTPException
+from fastapi import Request
+from fastapi.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
 
 class AttendanceManagementException(Exception):
@@ -69,12 +73,17 @@ class DeviceSyncException(AttendanceManagementException):
         )
 
 
-def handle_attendance_exception(exc: AttendanceManagementException) -> HTTPException:
-    """Convert custom exceptions to FastAPI HTTPException"""
-    return HTTPException(
+async def attendance_exception_handler(_request: Request, exc: AttendanceManagementException) -> ORJSONResponse:
+    """Answer a service-layer exception with its status code, message and details"""
+    return ORJSONResponse(
         status_code=exc.status_code,
-        detail={
-            "message": exc.message,
-            "details": exc.details
-        }
+        content={"detail": {"message": exc.message, "details": exc.details}}
+    )
+
+
+async def unhandled_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    """Answer any other error with a bare 500 and log it with its traceback"""
+    logger.exception(
+        "Unhandled %s on %s %s", type(exc).__name__, request.method, request.url.path, exc_info=exc
     )
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
@@ -0,0 +1,63 @@
+from collections.abc import Iterable
+from decimal import Decimal
+from typing import Any, TypeVar
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class PydanticResponse(Response):
+    """JSON response serialized by pydantic-core straight from a model.
+
+    FastAPI hands a returned Response through untouched, so this skips the
+    jsonable_encoder pass and the response_model re-validation. Keep
+    response_model on the route for the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, adapter: TypeAdapter[Any] | None = None, **kwargs: Any) -> None:
+        # For content that is not a model itself, e.g. list[DepartmentPublic]
+        self.adapter = adapter
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.adapter is not None:
+            return self.adapter.dump_json(content)
+        assert isinstance(content, BaseModel)
+        return content.model_dump_json().encode()
+
+
+def orjson_default(obj: Any) -> Any:
+    """Serialize the types our payloads hold that orjson does not handle itself.
+
+    Dispatches on the exact type first, as orjson calls this for every such value.
+    """
+    if type(obj) is Decimal:
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONDefaultResponse(ORJSONResponse):
+    """ORJSONResponse that also takes Decimal values and pydantic models.
+
+    Return it from the route, rather than naming it as response_class, so
+    FastAPI does not run jsonable_encoder over the content first.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=orjson_default)
+
+
+def construct_all(model: type[ModelT], rows: Iterable[Any]) -> list[ModelT]:
+    """Copy loaded table rows into public models without validating them again.
+
+    Only for rows read back from the database, whose values were validated
+    on the way in. Every field of ``model`` must be a column of the row.
+    """
+    return [model.model_construct(**row.__dict__) for row in rows]
@@ -1,16 +1,23 @@
+import calendar
+import threading
+import time
 import uuid
 from datetime import datetime, date, timedelta
-from typing import Any, List
+from typing import Any, Iterator, List
 
 from sqlmodel import Session, select
-from sqlalchemy import extract, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import and_, delete, exists, extract, false, func, insert, lambda_stmt, or_, true, tuple_, update
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+from sqlalchemy.orm import aliased, defer
 
 from app.core.security import get_password_hash, verify_password
 from app.models import (
-    Attendance, AttendanceCreate, AttendanceUpdate, Department, DepartmentCreate, DepartmentUpdate,
+    Attendance, AttendanceCreate, AttendancePublic, AttendanceUpdate,
+    Department, DepartmentCreate, DepartmentUpdate,
     Employee, EmployeeCreate, EmployeeUpdate, Item, ItemCreate, User, UserCreate, UserUpdate,
-    Holiday, HolidayCreate, HolidayUpdate, ZKTecoDevice, ZKTecoDeviceCreate, ZKTecoDeviceUpdate,
-    DeviceSyncLog, DeviceSyncLogBase, Fingerprint, FingerprintCreate, FingerprintUpdate
+    Holiday, HolidayCreate, HolidayOccurrence, HolidayUpdate, ZKTecoDevice, ZKTecoDeviceCreate, ZKTecoDeviceUpdate,
+    DeviceSyncLog, DeviceSyncLogBase, Fingerprint, FingerprintCreate, FingerprintUpdate, split_data_url
 )
 
 
@@ -112,6 +119,11 @@ def get_employee(*, session: Session, employee_id: uuid.UUID) -> Employee | None
     return session.exec(statement).first()
 
 
+def get_employee_updated_at(*, session: Session, employee_id: uuid.UUID) -> datetime | None:
+    """Only the version column, enough to answer a conditional GET"""
+    return session.exec(select(Employee.updated_at).where(Employee.id == employee_id)).first()
+
+
 def get_employee_by_employee_id(*, session: Session, employee_id: str) -> Employee | None:
     statement = select(Employee).where(Employee.employee_id == employee_id)
     return session.exec(statement).first()
@@ -122,16 +134,54 @@ def get_employee_by_cnic(*, session: Session, cnic: str) -> Employee | None:
     return session.exec(statement).first()
 
 
-def get_employees(*, session: Session, skip: int = 0, limit: int = 100, department_id: uuid.UUID | None = None) -> List[Employee]:
-    statement = select(Employee)
+async def get_employees(
+    *,
+    session: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    department_id: uuid.UUID | None = None,
+    cursor: tuple[datetime, uuid.UUID] | None = None
+) -> List[Any]:
+    """Newest first. Pass ``cursor`` (created_at, id) of the last row seen to
+    page by key instead of ``skip``.
+
+    Rows carry ``Employee`` and ``total``, the unpaged number of matches
+    (from the cursor on, if one is given).
+    """
+    statement = select(Employee, func.count().over().label("total"))
     if department_id:
         statement = statement.where(Employee.department_id == department_id)
-    statement = statement.offset(skip).limit(limit)
-    return session.exec(statement).all()
+    if cursor:
+        statement = statement.where(tuple_(Employee.created_at, Employee.id) < cursor)
+    statement = statement.offset(skip).limit(limit).order_by(Employee.created_at.desc(), Employee.id.desc())
+    return (await session.exec(statement)).all()
+
+
+def preflight_employee_write(
+    *,
+    session: Session,
+    employee_id: str | None = None,
+    cnic: str | None = None,
+    department_id: uuid.UUID | None = None,
+    exclude_id: uuid.UUID | None = None
+) -> tuple[bool, bool, bool]:
+    """Check (employee_id taken, cnic taken, department exists) in one round trip.
+
+    Checks for arguments left as None report (False, False, True). Pass
+    ``exclude_id`` to ignore the employee being updated.
+    """
+    others = Employee.id != exclude_id if exclude_id else true()
+    statement = select(
+        exists().where(Employee.employee_id == employee_id, others) if employee_id else false(),
+        exists().where(Employee.cnic == cnic, others) if cnic else false(),
+        exists().where(Department.id == department_id) if department_id else true(),
+    )
+    return tuple(session.exec(statement).one())
 
 
 def update_employee(*, session: Session, db_employee: Employee, employee_in: EmployeeUpdate) -> Employee:
     employee_data = employee_in.model_dump(exclude_unset=True)
+    employee_data["updated_at"] = datetime.utcnow()
     db_employee.sqlmodel_update(employee_data)
     session.add(db_employee)
     session.commit()
@@ -139,13 +189,47 @@ def update_employee(*, session: Session, db_employee: Employee, employee_in: Emp
     return db_employee
 
 
+def update_employee_checked(*, session: Session, employee_id: uuid.UUID, employee_in: EmployeeUpdate) -> Employee | None:
+    """Update an employee in one UPDATE ... RETURNING, guarded like preflight_employee_write.
+
+    Returns None when nothing was updated: the employee is missing, the new
+    employee_id or CNIC belongs to someone else, or the department does not
+    exist. The guards run in the same statement as the write, so a
+    concurrent insert cannot slip in between check and update.
+    """
+    employee_data = employee_in.model_dump(exclude_unset=True)
+    if not employee_data:
+        return get_employee(session=session, employee_id=employee_id)
+    employee_data["updated_at"] = datetime.utcnow()
+    
+    other = aliased(Employee)
+    statement = update(Employee).where(Employee.id == employee_id)
+    if employee_data.get("employee_id"):
+        statement = statement.where(
+            ~exists().where(other.employee_id == employee_data["employee_id"], other.id != employee_id)
+        )
+    if employee_data.get("cnic"):
+        statement = statement.where(~exists().where(other.cnic == employee_data["cnic"], other.id != employee_id))
+    if employee_data.get("department_id"):
+        statement = statement.where(exists().where(Department.id == employee_data["department_id"]))
+    
+    employee = session.execute(statement.values(**employee_data).returning(Employee)).scalar_one_or_none()
+    if employee:
+        # Keep the RETURNING values instead of having commit expire them
+        session.expunge(employee)
+    session.commit()
+    return employee
+
+
 def delete_employee(*, session: Session, employee_id: uuid.UUID) -> bool:
-    employee = get_employee(session=session, employee_id=employee_id)
-    if not employee:
-        return False
-    session.delete(employee)
+    """Delete the employee; returns False if there was none. Attendance and
+    fingerprint rows are removed by their foreign keys' ON DELETE CASCADE
+    (migration 011), since this bypasses the ORM relationship cascade."""
+    deleted = session.execute(
+        delete(Employee).where(Employee.id == employee_id).returning(Employee.id)
+    ).first()
     session.commit()
-    return True
+    return deleted is not None
 
 
 # Attendance CRUD operations
@@ -167,32 +251,95 @@ def get_employee_attendances(*, session: Session, employee_id: uuid.UUID, skip:
     return session.exec(statement).all()
 
 
-def get_attendances(
-    *, 
-    session: Session, 
-    skip: int = 0, 
-    limit: int = 100,
+_ATTENDANCE_PUBLIC_COLUMNS = tuple(getattr(Attendance, name) for name in AttendancePublic.model_fields)
+
+
+def _filter_attendances(
+    statement: StatementLambdaElement,
+    *,
     employee_id: uuid.UUID | None = None,
     device_id: uuid.UUID | None = None,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     status: str | None = None
-) -> List[Attendance]:
-    statement = select(Attendance)
-    
+) -> StatementLambdaElement:
+    # Each criterion is its own lambda, so the compiled SQL is cached per set of
+    # filters in use and only the bound values change between requests
     if employee_id:
-        statement = statement.where(Attendance.employee_id == employee_id)
+        statement += lambda s: s.where(Attendance.employee_id == employee_id)
     if device_id:
-        statement = statement.where(Attendance.zkteco_device_id == device_id)
+        statement += lambda s: s.where(Attendance.zkteco_device_id == device_id)
     if start_date:
-        statement = statement.where(Attendance.check_in_time >= start_date)
+        statement += lambda s: s.where(Attendance.check_in_time >= start_date)
     if end_date:
-        statement = statement.where(Attendance.check_in_time <= end_date)
+        statement += lambda s: s.where(Attendance.check_in_time < end_date)
     if status:
-        statement = statement.where(Attendance.status == status)
+        statement += lambda s: s.where(Attendance.status == status)
+    return statement
+
+
+async def get_attendances(
+    *, 
+    session: AsyncSession, 
+    skip: int = 0, 
+    limit: int = 100,
+    employee_id: uuid.UUID | None = None,
+    device_id: uuid.UUID | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    status: str | None = None,
+    cursor: tuple[datetime, uuid.UUID] | None = None
+) -> List[Any]:
+    """Newest first, with check_in_time in [start_date, end_date). Pass ``cursor``
+    (check_in_time, id) of the last row seen to page by key instead of ``skip``.
+
+    Rows carry ``Attendance`` and ``total``, the number of rows matching the
+    filters (from the cursor on, if one is given), counted in the same query.
+    """
+    statement = _filter_attendances(
+        lambda_stmt(lambda: select(Attendance, func.count().over().label("total"))),
+        employee_id=employee_id,
+        device_id=device_id,
+        start_date=start_date,
+        end_date=end_date,
+        status=status
+    )
+    if cursor:
+        # Built outside the lambda: a tuple of plain values is not a cacheable closure
+        after_cursor = tuple_(Attendance.check_in_time, Attendance.id) < cursor
+        statement += lambda s: s.where(after_cursor)
     
-    statement = statement.offset(skip).limit(limit).order_by(Attendance.check_in_time.desc())
-    return session.exec(statement).all()
+    statement += lambda s: s.offset(skip).limit(limit).order_by(
+        Attendance.check_in_time.desc(), Attendance.id.desc()
+    )
+    return (await session.exec(statement)).all()
+
+
+def stream_attendances(
+    *,
+    session: Session,
+    employee_id: uuid.UUID | None = None,
+    device_id: uuid.UUID | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    status: str | None = None,
+    chunk_size: int = 200
+) -> Iterator[List[Any]]:
+    """Yield the matching attendance rows, newest first, ``chunk_size`` at a time.
+
+    Reads through a server-side cursor, so only one chunk is in memory. Rows
+    hold the AttendancePublic columns, not ORM objects.
+    """
+    statement = _filter_attendances(
+        lambda_stmt(lambda: select(*_ATTENDANCE_PUBLIC_COLUMNS)),
+        employee_id=employee_id,
+        device_id=device_id,
+        start_date=start_date,
+        end_date=end_date,
+        status=status
+    )
+    statement += lambda s: s.order_by(Attendance.check_in_time.desc(), Attendance.id.desc())
+    yield from session.execute(statement, execution_options={"yield_per": chunk_size}).partitions()
 
 
 def update_attendance(*, session: Session, db_attendance: Attendance, attendance_in: AttendanceUpdate) -> Attendance:
@@ -217,28 +364,126 @@ def delete_attendance(*, session: Session, attendance_id: uuid.UUID) -> bool:
     return True
 
 
+def get_daily_attendance_summary(
+    *,
+    session: Session,
+    start_date: datetime,
+    end_date: datetime,
+    department_id: uuid.UUID | None = None,
+    after: str | None = None,
+    limit: int = 100
+) -> List[Any]:
+    """One row per employee with their first open check-in and last check-out in [start_date, end_date).
+
+    Ordered by employee code; pass the last code seen as ``after`` for the next page.
+    """
+    statement = (
+        select(
+            Employee.employee_id,
+            Employee.first_name,
+            Employee.last_name,
+            Department.name.label("department_name"),
+            func.min(Attendance.check_in_time)
+            .filter(Attendance.check_out_time.is_(None))
+            .label("check_in"),
+            func.max(Attendance.check_out_time).label("check_out"),
+        )
+        .select_from(Employee)
+        .join(Department, Employee.department_id == Department.id)
+        .outerjoin(
+            Attendance,
+            and_(
+                Attendance.employee_id == Employee.id,
+                Attendance.check_in_time >= start_date,
+                Attendance.check_in_time < end_date,
+            ),
+        )
+        .group_by(Employee.id, Department.name)
+    )
+    if department_id:
+        statement = statement.where(Employee.department_id == department_id)
+    if after:
+        statement = statement.where(Employee.employee_id > after)
+    statement = statement.order_by(Employee.employee_id).limit(limit)
+    return session.exec(statement).all()
+
+
+def get_monthly_attendance_summary(
+    *,
+    session: Session,
+    start_date: datetime,
+    end_date: datetime,
+    department_id: uuid.UUID | None = None,
+    after: str | None = None,
+    limit: int = 100
+) -> List[Any]:
+    """One row per employee with the days present and hours worked in [start_date, end_date).
+
+    A day's hours run from its first open check-in to its last check-out.
+    Ordered by employee code; pass the last code seen as ``after`` for the next page.
+    """
+    day = func.date_trunc("day", Attendance.check_in_time)
+    per_day = (
+        select(
+            Attendance.employee_id,
+            func.min(Attendance.check_in_time)
+            .filter(Attendance.check_out_time.is_(None))
+            .label("check_in"),
+            func.max(Attendance.check_out_time).label("check_out"),
+        )
+        .where(Attendance.check_in_time >= start_date)
+        .where(Attendance.check_in_time < end_date)
+        .group_by(Attendance.employee_id, day)
+        .cte("per_day")
+    )
+    statement = (
+        select(
+            Employee.employee_id,
+            Employee.first_name,
+            Employee.last_name,
+            Department.name.label("department_name"),
+            func.count(per_day.c.employee_id).label("present_days"),
+            func.coalesce(
+                func.sum(extract("epoch", per_day.c.check_out - per_day.c.check_in)) / 3600, 0
+            ).label("total_hours"),
+        )
+        .select_from(Employee)
+        .join(Department, Employee.department_id == Department.id)
+        .outerjoin(per_day, per_day.c.employee_id == Employee.id)
+        .group_by(Employee.id, Department.name)
+    )
+    if department_id:
+        statement = statement.where(Employee.department_id == department_id)
+    if after:
+        statement = statement.where(Employee.employee_id > after)
+    statement = statement.order_by(Employee.employee_id).limit(limit)
+    return session.exec(statement).all()
+
+
 def get_attendance_count(*, session: Session) -> int:
     return session.exec(select(func.count(Attendance.id))).one()
 
 
 # Holiday CRUD operations
-def create_holiday(*, session: Session, holiday_in: HolidayCreate, created_by: uuid.UUID) -> Holiday:
+async def create_holiday(*, session: AsyncSession, holiday_in: HolidayCreate, created_by: uuid.UUID) -> Holiday:
     holiday_data = holiday_in.model_dump()
     holiday_data["created_by"] = created_by
     holiday = Holiday(**holiday_data)
     session.add(holiday)
-    session.commit()
-    session.refresh(holiday)
+    await session.flush()
+    await _store_holiday_occurrences(session, holiday)
+    await session.commit()
+    await session.refresh(holiday)
     return holiday
 
 
-def get_holiday(*, session: Session, holiday_id: uuid.UUID) -> Holiday | None:
-    return session.get(Holiday, holiday_id)
+async def get_holiday(*, session: AsyncSession, holiday_id: uuid.UUID) -> Holiday | None:
+    return await session.get(Holiday, holiday_id)
 
 
-def get_holidays(
+async def get_holidays(
     *, 
-    session: Session, 
+    session: AsyncSession, 
     skip: int = 0, 
     limit: int = 100,
     year: int | None = None,
@@ -255,53 +500,76 @@ def get_holidays(
         statement = statement.where(Holiday.holiday_type == holiday_type)
     
     statement = statement.offset(skip).limit(limit).order_by(Holiday.holiday_date)
-    return session.exec(statement).all()
+    return (await session.exec(statement)).all()
 
 
-def get_holidays_for_date_range(
+async def get_holidays_for_date_range(
     *, 
-    session: Session, 
+    session: AsyncSession, 
     start_date: date, 
     end_date: date
-) -> List[Holiday]:
-    """Get all holidays (including recurring ones) for a date range"""
-    # Get non-recurring holidays in the date range
-    non_recurring = session.exec(
-        select(Holiday)
-        .where(Holiday.holiday_date >= start_date)
-        .where(Holiday.holiday_date <= end_date)
-        .where(Holiday.is_recurring == False)
-        .where(Holiday.is_active == True)
-    ).all()
+) -> List[tuple[Holiday, date]]:
+    """Get all holidays (including recurring ones) for a date range, each with
+    the date it falls on; a recurring holiday appears once per occurrence."""
+    window_start, window_end = holiday_occurrence_window()
+    if window_start <= start_date and end_date <= window_end:
+        return (await session.exec(
+            select(Holiday, HolidayOccurrence.occurrence_date)
+            .join(HolidayOccurrence, HolidayOccurrence.holiday_id == Holiday.id)
+            .where(HolidayOccurrence.occurrence_date >= start_date)
+            .where(HolidayOccurrence.occurrence_date <= end_date)
+            .order_by(HolidayOccurrence.occurrence_date)
+        )).all()
     
-    # Get recurring holidays
-    recurring = session.exec(
+    # Outside the stored window: one-off holidays in the range and every
+    # recurring one, expanded here
+    holidays = (await session.exec(
         select(Holiday)
-        .where(Holiday.is_recurring == True)
         .where(Holiday.is_active == True)
-    ).all()
+        .where(or_(
+            Holiday.is_recurring == True,
+            and_(Holiday.holiday_date >= start_date, Holiday.holiday_date <= end_date),
+        ))
+    )).all()
     
-    # Generate recurring holiday instances for the date range
-    recurring_instances = []
-    for holiday in recurring:
-        instances = generate_recurring_dates(holiday, start_date, end_date)
-        for instance_date in instances:
-            recurring_instances.append(Holiday(
-                id=holiday.id,
-                title=holiday.title,
-                description=holiday.description,
-                holiday_date=instance_date,
-                holiday_type=holiday.holiday_type,
-                is_recurring=holiday.is_recurring,
-                recurrence_pattern=holiday.recurrence_pattern,
-                color=holiday.color,
-                is_active=holiday.is_active,
-                created_at=holiday.created_at,
-                updated_at=holiday.updated_at,
-                created_by=holiday.created_by
-            ))
-    
-    return non_recurring + recurring_instances
+    occurrences = []
+    for holiday in holidays:
+        occurrences.extend(
+            (holiday, row["occurrence_date"]) for row in holiday_occurrence_rows(holiday, start_date, end_date)
+        )
+    return occurrences
+
+
+# Occurrences are stored for this many years either side of the current one
+HOLIDAY_OCCURRENCE_YEARS = 2
+
+
+def holiday_occurrence_window(today: date | None = None, extra_years: int = 0) -> tuple[date, date]:
+    """First and last date served from holiday_occurrence. Writers store
+    extra_years more, so the window still holds after the year turns."""
+    year = (today or date.today()).year
+    return date(year - HOLIDAY_OCCURRENCE_YEARS, 1, 1), date(year + HOLIDAY_OCCURRENCE_YEARS + extra_years, 12, 31)
+
+
+def holiday_occurrence_rows(holiday: Holiday, start_date: date, end_date: date) -> List[dict[str, Any]]:
+    """holiday_occurrence rows for one holiday between the two dates"""
+    if not holiday.is_active:
+        return []
+    if holiday.is_recurring:
+        dates = generate_recurring_dates(holiday, start_date, end_date)
+    elif start_date <= holiday.holiday_date <= end_date:
+        dates = [holiday.holiday_date]
+    else:
+        dates = []
+    return [{"occurrence_date": occurrence_date, "holiday_id": holiday.id} for occurrence_date in dates]
+
+
+async def _store_holiday_occurrences(session: AsyncSession, holiday: Holiday) -> None:
+    # Replaces the holiday's occurrences; the caller commits
+    await session.execute(delete(HolidayOccurrence).where(HolidayOccurrence.holiday_id == holiday.id))
+    rows = holiday_occurrence_rows(holiday, *holiday_occurrence_window(extra_years=1))
+    if rows:
+        await session.execute(insert(HolidayOccurrence), rows)
 
 
 def generate_recurring_dates(holiday: Holiday, start_date: date, end_date: date) -> List[date]:
@@ -311,49 +579,62 @@ def generate_recurring_dates(holiday: Holiday, start_date: date, end_date: date)
     
     dates = []
     current_date = holiday.holiday_date
+    occurrence = 0
     
     while current_date <= end_date:
         if current_date >= start_date:
             dates.append(current_date)
         
-        # Calculate next occurrence based on pattern
+        # Calculate next occurrence based on pattern, counted from the first
+        # date so a 31st stays on the 31st in months that have one
+        occurrence += 1
         if holiday.recurrence_pattern == "yearly":
-            current_date = current_date.replace(year=current_date.year + 1)
+            current_date = _add_months(holiday.holiday_date, 12 * occurrence)
         elif holiday.recurrence_pattern == "monthly":
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
+            current_date = _add_months(holiday.holiday_date, occurrence)
         elif holiday.recurrence_pattern == "weekly":
-            current_date = current_date + timedelta(days=7)
+            current_date = holiday.holiday_date + timedelta(weeks=occurrence)
         else:
             break
     
     return dates
 
 
-def update_holiday(*, session: Session, db_holiday: Holiday, holiday_in: HolidayUpdate) -> Holiday:
+def _add_months(day: date, months: int) -> date:
+    # Clamped to the last day of shorter months (and Feb 28 outside leap years)
+    year, month = divmod(day.month - 1 + months, 12)
+    year += day.year
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+async def update_holiday(*, session: AsyncSession, holiday_id: uuid.UUID, holiday_in: HolidayUpdate) -> Holiday | None:
+    """Update a holiday in one UPDATE ... RETURNING; returns None if there is none."""
     update_data = holiday_in.model_dump(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    for field, value in update_data.items():
-        setattr(db_holiday, field, value)
-    
-    session.add(db_holiday)
-    session.commit()
-    session.refresh(db_holiday)
-    return db_holiday
+    holiday = (await session.execute(
+        update(Holiday).where(Holiday.id == holiday_id).values(**update_data).returning(Holiday)
+    )).scalar_one_or_none()
+    if holiday:
+        await _store_holiday_occurrences(session, holiday)
+        # Keep the RETURNING values instead of having commit expire them
+        session.expunge(holiday)
+    await session.commit()
+    return holiday
 
 
-def delete_holiday(*, session: Session, holiday_id: uuid.UUID) -> None:
-    holiday = session.get(Holiday, holiday_id)
-    if holiday:
-        session.delete(holiday)
-        session.commit()
+async def delete_holiday(*, session: AsyncSession, holiday_id: uuid.UUID) -> bool:
+    """Delete the holiday; returns False if there was none. Its occurrences
+    go with it through the foreign key's ON DELETE CASCADE."""
+    deleted = (await session.execute(
+        delete(Holiday).where(Holiday.id == holiday_id).returning(Holiday.id)
+    )).first()
+    await session.commit()
+    return deleted is not None
 
 
-def get_holiday_count(*, session: Session) -> int:
-    return session.exec(select(func.count(Holiday.id))).one()
+async def get_holiday_count(*, session: AsyncSession) -> int:
+    return (await session.exec(select(func.count(Holiday.id)))).one()
 
 
 # ZKTeco Device CRUD operations
@@ -370,6 +651,41 @@ def get_zkteco_device(*, session: Session, device_id: uuid.UUID) -> ZKTecoDevice
     return session.get(ZKTecoDevice, device_id)
 
 
+# Detached copies of device rows, for the device endpoints that look one up
+# on every call; status changes made by the sync workers show up within the TTL
+ZKTECO_DEVICE_CACHE_TTL = 5.0
+ZKTECO_DEVICE_CACHE_SIZE = 256
+_zkteco_device_cache: dict[uuid.UUID, tuple[float, ZKTecoDevice]] = {}
+_zkteco_device_cache_lock = threading.Lock()
+
+
+def get_zkteco_device_cached(*, session: Session, device_id: uuid.UUID) -> ZKTecoDevice | None:
+    """Like get_zkteco_device, but answered from memory for ZKTECO_DEVICE_CACHE_TTL
+    seconds. The device is a copy outside any session: read it, do not save it."""
+    now = time.monotonic()
+    with _zkteco_device_cache_lock:
+        entry = _zkteco_device_cache.get(device_id)
+    if entry and entry[0] > now:
+        return entry[1]
+    
+    device = get_zkteco_device(session=session, device_id=device_id)
+    if device is None:
+        return None
+    device = ZKTecoDevice.model_validate(device)
+    with _zkteco_device_cache_lock:
+        if len(_zkteco_device_cache) >= ZKTECO_DEVICE_CACHE_SIZE:
+            # Drop the oldest entry
+            _zkteco_device_cache.pop(next(iter(_zkteco_device_cache)))
+        _zkteco_device_cache[device_id] = (now + ZKTECO_DEVICE_CACHE_TTL, device)
+    return device
+
+
+def invalidate_zkteco_devices(*device_ids: uuid.UUID) -> None:
+    with _zkteco_device_cache_lock:
+        for device_id in device_ids:
+            _zkteco_device_cache.pop(device_id, None)
+
+
 def get_zkteco_device_by_device_id(*, session: Session, device_id: str) -> ZKTecoDevice | None:
     statement = select(ZKTecoDevice).where(ZKTecoDevice.device_id == device_id)
     return session.exec(statement).first()
@@ -383,6 +699,29 @@ def get_zkteco_devices(*, session: Session, skip: int = 0, limit: int = 100, is_
     return session.exec(statement).all()
 
 
+def get_zkteco_devices_page(
+    *,
+    session: Session,
+    skip: int = 0,
+    limit: int = 100,
+    is_active: bool | None = None,
+    cursor: tuple[datetime, uuid.UUID] | None = None
+) -> List[Any]:
+    """Like get_zkteco_devices, newest first and paged by ``cursor``
+    (created_at, id) or ``skip``. Rows carry ``ZKTecoDevice`` and ``total``,
+    the unpaged number of matches (from the cursor on, if one is given).
+    """
+    statement = select(ZKTecoDevice, func.count().over().label("total"))
+    if is_active is not None:
+        statement = statement.where(ZKTecoDevice.is_active == is_active)
+    if cursor:
+        statement = statement.where(tuple_(ZKTecoDevice.created_at, ZKTecoDevice.id) < cursor)
+    statement = statement.offset(skip).limit(limit).order_by(
+        ZKTecoDevice.created_at.desc(), ZKTecoDevice.id.desc()
+    )
+    return session.exec(statement).all()
+
+
 def update_zkteco_device(*, session: Session, db_device: ZKTecoDevice, device_in: ZKTecoDeviceUpdate) -> ZKTecoDevice:
     device_data = device_in.model_dump(exclude_unset=True)
     device_data["updated_at"] = datetime.utcnow()
@@ -393,6 +732,7 @@ def update_zkteco_device(*, session: Session, db_device: ZKTecoDevice, device_in
     session.add(db_device)
     session.commit()
     session.refresh(db_device)
+    invalidate_zkteco_devices(db_device.id)
     return db_device
 
 
@@ -402,12 +742,35 @@ def delete_zkteco_device(*, session: Session, device_id: uuid.UUID) -> bool:
         return False
     session.delete(device)
     session.commit()
+    invalidate_zkteco_devices(device_id)
     return True
 
 
+def get_zkteco_devices_by_ids(*, session: Session, device_ids: List[uuid.UUID]) -> List[ZKTecoDevice]:
+    if not device_ids:
+        return []
+    return session.exec(select(ZKTecoDevice).where(ZKTecoDevice.id.in_(device_ids))).all()
+
+
+def delete_zkteco_devices(*, session: Session, device_ids: List[uuid.UUID]) -> int:
+    """Delete devices with one statement. Like the ORM delete, their attendance
+    records are kept with zkteco_device_id cleared."""
+    if not device_ids:
+        return 0
+    session.execute(
+        update(Attendance)
+        .where(Attendance.zkteco_device_id.in_(device_ids))
+        .values(zkteco_device_id=None)
+    )
+    result = session.execute(delete(ZKTecoDevice).where(ZKTecoDevice.id.in_(device_ids)))
+    session.commit()
+    invalidate_zkteco_devices(*device_ids)
+    return result.rowcount
+
+
 # Fingerprint CRUD operations
 def create_fingerprint(*, session: Session, fingerprint_in: FingerprintCreate) -> Fingerprint:
-    db_fingerprint = Fingerprint.model_validate(fingerprint_in)
+    db_fingerprint = Fingerprint.from_create(fingerprint_in)
     session.add(db_fingerprint)
     session.commit()
     session.refresh(db_fingerprint)
@@ -419,6 +782,25 @@ def get_fingerprint(*, session: Session, fingerprint_id: uuid.UUID) -> Fingerpri
     return session.exec(statement).first()
 
 
+def get_fingerprint_updated_at(*, session: Session, fingerprint_id: uuid.UUID) -> datetime | None:
+    """Only the version column, enough to answer a conditional GET"""
+    return session.exec(select(Fingerprint.updated_at).where(Fingerprint.id == fingerprint_id)).first()
+
+
+def get_fingerprint_image(
+    *, session: Session, fingerprint_id: uuid.UUID
+) -> tuple[str | None, bytes, datetime] | None:
+    """(media type, raw image bytes, updated_at) of a fingerprint"""
+    row = session.exec(
+        select(Fingerprint.fingerprint_media_type, Fingerprint.fingerprint_data, Fingerprint.updated_at)
+        .where(Fingerprint.id == fingerprint_id)
+    ).first()
+    if row is None:
+        return None
+    media_type, payload, updated_at = row
+    return media_type, payload, updated_at
+
+
 def get_employee_fingerprints(*, session: Session, employee_id: uuid.UUID, fingerprint_type: str | None = None) -> List[Fingerprint]:
     statement = select(Fingerprint).where(Fingerprint.employee_id == employee_id)
     if fingerprint_type:
@@ -427,9 +809,9 @@ def get_employee_fingerprints(*, session: Session, employee_id: uuid.UUID, finge
     return session.exec(statement).all()
 
 
-def get_fingerprints(
+async def get_fingerprints(
     *, 
-    session: Session, 
+    session: AsyncSession, 
     skip: int = 0, 
     limit: int = 100,
     employee_id: uuid.UUID | None = None,
@@ -445,13 +827,19 @@ def get_fingerprints(
     if is_active is not None:
         statement = statement.where(Fingerprint.is_active == is_active)
     
+    # Lists leave the images out
+    statement = statement.options(defer(Fingerprint.fingerprint_data))
     statement = statement.offset(skip).limit(limit).order_by(Fingerprint.created_at.desc())
-    return session.exec(statement).all()
+    return (await session.exec(statement)).all()
 
 
 def update_fingerprint(*, session: Session, db_fingerprint: Fingerprint, fingerprint_in: FingerprintUpdate) -> Fingerprint:
     fingerprint_data = fingerprint_in.model_dump(exclude_unset=True)
     fingerprint_data["updated_at"] = datetime.utcnow()
+    if fingerprint_data.get("fingerprint_data") is not None:
+        fingerprint_data["fingerprint_media_type"], fingerprint_data["fingerprint_data"] = split_data_url(
+            fingerprint_data["fingerprint_data"]
+        )
     
     for field, value in fingerprint_data.items():
         setattr(db_fingerprint, field, value)
@@ -463,12 +851,11 @@ def update_fingerprint(*, session: Session, db_fingerprint: Fingerprint, fingerp
 
 
 def delete_fingerprint(*, session: Session, fingerprint_id: uuid.UUID) -> bool:
-    fingerprint = get_fingerprint(session=session, fingerprint_id=fingerprint_id)
-    if not fingerprint:
-        return False
-    session.delete(fingerprint)
+    deleted = session.execute(
+        delete(Fingerprint).where(Fingerprint.id == fingerprint_id).returning(Fingerprint.id)
+    ).first()
     session.commit()
-    return True
+    return deleted is not None
 
 
 def get_fingerprint_count(*, session: Session, employee_id: uuid.UUID | None = None) -> int:
@@ -487,6 +874,28 @@ def create_device_sync_log(*, session: Session, sync_log_in: DeviceSyncLogBase)
     return sync_log
 
 
+def create_device_sync_logs(*, session: Session, sync_logs_in: List[DeviceSyncLogBase]) -> int:
+    """Write a batch of sync logs with a single COPY; id and created_at default server-side."""
+    if not sync_logs_in:
+        return 0
+    cursor = session.connection().connection.cursor()
+    with cursor.copy(
+        "COPY devicesynclog (device_id, sync_type, records_synced, sync_status, error_message, sync_duration) "
+        "FROM STDIN"
+    ) as copy:
+        for sync_log in sync_logs_in:
+            copy.write_row((
+                sync_log.device_id,
+                sync_log.sync_type,
+                sync_log.records_synced,
+                sync_log.sync_status,
+                sync_log.error_message,
+                sync_log.sync_duration,
+            ))
+    session.commit()
+    return len(sync_logs_in)
+
+
 def get_device_sync_logs(
     *, 
     session: Session, 
@@ -509,5 +918,5 @@ def get_device_sync_logs(
     return session.exec(statement).all()
 
 
-def get_device_sync_log(*, session: Session, log_id: uuid.UUID) -> DeviceSyncLog | None:
+def get_device_sync_log(*, session: Session, log_id: int) -> DeviceSyncLog | None:
     return session.get(DeviceSyncLog, log_id)
@@ -1,10 +1,41 @@
+import os
+import time
 import uuid
 from datetime import datetime, date
 
+import pybase64
 from pydantic import EmailStr
+from sqlalchemy import BigInteger, Column, Enum, Identity, Index, LargeBinary, UniqueConstraint, text
 from sqlmodel import Field, Relationship, SQLModel
 
 
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7).
+
+    The leading 48 bits are the Unix time in milliseconds, so new keys land on
+    the right edge of the primary key B-tree instead of a random leaf.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version
+    value = value & ~(0x3 << 62) | 0x2 << 62  # variant
+    return uuid.UUID(int=value)
+
+
+def split_data_url(value: str) -> tuple[str | None, bytes]:
+    """(media type, decoded payload) of a base64 data URL, or (None, UTF-8 bytes) for any other string."""
+    header, sep, payload = value.partition(",")
+    if sep and header.startswith("data:") and header.endswith(";base64"):
+        return header[len("data:"):-len(";base64")], pybase64.b64decode(payload)
+    return None, value.encode()
+
+
+def make_data_url(media_type: str | None, payload: bytes) -> str:
+    """The string split_data_url took apart"""
+    if media_type is None:
+        return payload.decode()
+    return f"data:{media_type};base64,{pybase64.b64encode(payload).decode()}"
+
+
 # Shared properties
 class UserBase(SQLModel):
     email: EmailStr = Field(unique=True, index=True, max_length=255)
@@ -126,6 +157,10 @@ class EmployeeUpdate(EmployeeBase):
 
 
 class Employee(EmployeeBase, table=True):
+    __table_args__ = (
+        Index("ix_employee_created_at_id", text("created_at DESC"), text("id DESC")),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     department_id: uuid.UUID = Field(foreign_key="department.id", nullable=False)
     user_id: uuid.UUID | None = Field(foreign_key="user.id", nullable=True)
@@ -150,14 +185,14 @@ class EmployeePublic(EmployeeBase):
 class EmployeesPublic(SQLModel):
     data: list[EmployeePublic]
     count: int
+    next_cursor: str | None = None
 
 
 # Fingerprint Management Models
 class FingerprintBase(SQLModel):
-    employee_id: uuid.UUID = Field(foreign_key="employee.id", nullable=False)
+    employee_id: uuid.UUID = Field(foreign_key="employee.id", nullable=False, ondelete="CASCADE")
     fingerprint_type: str = Field(max_length=20)  # thumb, index, middle, ring, pinky
     fingerprint_position: int = Field(ge=1, le=5)  # Position 1-5 for each finger type
-    fingerprint_data: str = Field(max_length=1000000)  # Base64 encoded fingerprint image
     fingerprint_format: str = Field(default="base64", max_length=20)  # base64, binary, etc.
     quality_score: float | None = Field(default=None, ge=0, le=100)  # Quality score 0-100
     is_active: bool = Field(default=True)
@@ -165,7 +200,7 @@ class FingerprintBase(SQLModel):
 
 
 class FingerprintCreate(FingerprintBase):
-    pass
+    fingerprint_data: str = Field(max_length=1000000)  # Base64 data URL of the image, or template text
 
 
 class FingerprintUpdate(SQLModel):
@@ -179,18 +214,48 @@ class FingerprintUpdate(SQLModel):
 
 
 class Fingerprint(FingerprintBase, table=True):
+    # Also serves lookups by employee_id, its leading column
+    __table_args__ = (
+        UniqueConstraint(
+            "employee_id", "fingerprint_type", "fingerprint_position",
+            name="uq_fingerprint_employee_type_position",
+        ),
+        Index("ix_fingerprint_inactive", "employee_id", postgresql_where=text("is_active = false")),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # The decoded image, or the UTF-8 bytes of a template
+    fingerprint_data: bytes = Field(sa_type=LargeBinary)
+    # Media type from the image's data URL, None when the data was not one
+    fingerprint_media_type: str | None = Field(default=None, max_length=100)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
     # Relationships
     employee: Employee = Relationship(back_populates="fingerprints")
+    
+    @classmethod
+    def from_create(cls, fingerprint_in: FingerprintCreate) -> "Fingerprint":
+        """A row for fingerprint_in, with its data URL split into bytes and media type"""
+        media_type, payload = split_data_url(fingerprint_in.fingerprint_data)
+        return cls.model_validate(
+            fingerprint_in, update={"fingerprint_data": payload, "fingerprint_media_type": media_type}
+        )
 
 
 class FingerprintPublic(FingerprintBase):
     id: uuid.UUID
+    fingerprint_data: str  # Base64 data URL of the image, or template text
     created_at: datetime
     updated_at: datetime
+    
+    @classmethod
+    def from_fingerprint(cls, fingerprint: Fingerprint) -> "FingerprintPublic":
+        """The API view of a stored fingerprint; the only place its data is base64 encoded"""
+        return cls.model_construct(
+            **fingerprint.model_dump(exclude={"fingerprint_data", "fingerprint_media_type"}),
+            fingerprint_data=make_data_url(fingerprint.fingerprint_media_type, fingerprint.fingerprint_data),
+        )
 
 
 class FingerprintsPublic(SQLModel):
@@ -198,6 +263,25 @@ class FingerprintsPublic(SQLModel):
     count: int
 
 
+# A fingerprint without its image, for lists; GET /fingerprints/{id}/image has the image
+class FingerprintSummaryPublic(SQLModel):
+    id: uuid.UUID
+    employee_id: uuid.UUID
+    fingerprint_type: str
+    fingerprint_position: int
+    fingerprint_format: str
+    quality_score: float | None = None
+    is_active: bool
+    notes: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class FingerprintSummariesPublic(SQLModel):
+    data: list[FingerprintSummaryPublic]
+    count: int
+
+
 # Employee Fingerprint Summary
 class EmployeeFingerprintSummary(SQLModel):
     employee_id: uuid.UUID
@@ -309,6 +393,10 @@ class ZKTecoDeviceUpdate(SQLModel):
 
 
 class ZKTecoDevice(ZKTecoDeviceBase, table=True):
+    __table_args__ = (
+        Index("ix_zktecodevice_inactive", "id", postgresql_where=text("is_active = false")),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -326,6 +414,7 @@ class ZKTecoDevicePublic(ZKTecoDeviceBase):
 class ZKTecoDevicesPublic(SQLModel):
     data: list[ZKTecoDevicePublic]
     count: int
+    next_cursor: str | None = None
 
 
 # Enhanced Attendance Models with device support
@@ -334,8 +423,16 @@ class AttendanceBase(SQLModel):
     check_out_time: datetime | None = None
     device_id: str | None = Field(default=None, max_length=100)  # ZKTeco device ID
     zkteco_device_id: uuid.UUID | None = Field(default=None, foreign_key="zktecodevice.id")
-    attendance_type: str = Field(default="fingerprint", max_length=20)  # fingerprint, card, manual
-    status: str = Field(default="present", max_length=20)  # present, absent, late, early_leave
+    attendance_type: str = Field(
+        default="fingerprint",
+        max_length=20,
+        sa_type=Enum("fingerprint", "card", "manual", name="attendance_type"),
+    )
+    status: str = Field(
+        default="present",
+        max_length=20,
+        sa_type=Enum("present", "absent", "late", "early_leave", name="attendance_status"),
+    )
 
 
 class AttendanceCreate(AttendanceBase):
@@ -348,8 +445,36 @@ class AttendanceUpdate(SQLModel):
 
 
 class Attendance(AttendanceBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    employee_id: uuid.UUID = Field(foreign_key="employee.id", nullable=False)
+    __table_args__ = (
+        Index(
+            "ix_attendance_open", "employee_id", text("check_in_time DESC"),
+            postgresql_where=text("check_out_time IS NULL"),
+        ),
+        Index("ix_attendance_check_in_time_id", text("check_in_time DESC"), text("id DESC")),
+        # check_in_time grows with insertion order, so a BRIN index stays tiny
+        Index(
+            "ix_attendance_check_in_time", "check_in_time",
+            postgresql_using="brin", postgresql_with={"pages_per_range": 32},
+        ),
+        Index(
+            "ix_attendance_employee_id_check_in_time", "employee_id", text("check_in_time DESC"),
+            postgresql_include=["check_out_time"],
+        ),
+        Index("ix_attendance_zkteco_device_id_check_in_time", "zkteco_device_id", text("check_in_time DESC")),
+        # Nearly every row has the default type and status; index the exceptions
+        Index(
+            "ix_attendance_attendance_type", "attendance_type",
+            postgresql_where=text("attendance_type <> 'fingerprint'"),
+        ),
+        Index("ix_attendance_status", "status", postgresql_where=text("status <> 'present'")),
+        Index(
+            "ix_attendance_status_check_in_time_id", "status", text("check_in_time DESC"), text("id DESC"),
+            postgresql_where=text("status <> 'present'"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
+    employee_id: uuid.UUID = Field(foreign_key="employee.id", nullable=False, ondelete="CASCADE")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -368,23 +493,57 @@ class AttendancePublic(AttendanceBase):
 class AttendancesPublic(SQLModel):
     data: list[AttendancePublic]
     count: int
+    next_cursor: str | None = None
+
+
+class FingerprintPunch(SQLModel):
+    device_id: str = Field(max_length=100)  # ZKTeco device ID
+    employee_device_id: str = Field(max_length=50)  # User ID on the device
+    timestamp: datetime
+
+
+class FingerprintPunchRejection(SQLModel):
+    index: int  # Position of the punch in the request
+    reason: str
+
+
+class FingerprintPunchBatchResult(SQLModel):
+    checked_in: int
+    checked_out: int
+    rejected: list[FingerprintPunchRejection]
 
 
 # ZKTeco Device Sync Log
 class DeviceSyncLogBase(SQLModel):
     device_id: uuid.UUID
-    sync_type: str = Field(max_length=20)  # attendance, users, logs
+    sync_type: str = Field(max_length=20)  # attendance, users, logs, enroll, fingerprints
     records_synced: int = 0
-    sync_status: str = Field(max_length=20)  # success, failed, partial
+    sync_status: str = Field(max_length=20)  # queued, running, success, failed, partial
     error_message: str | None = Field(default=None, max_length=1000)
     sync_duration: float | None = Field(default=None)  # in seconds
 
 
 class DeviceSyncLog(DeviceSyncLogBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        # Append-only, so created_at follows the physical order
+        Index(
+            "ix_devicesynclog_created_at", "created_at",
+            postgresql_using="brin", postgresql_with={"pages_per_range": 32},
+        ),
+    )
+
+    id: int | None = Field(
+        default=None,
+        sa_column=Column(BigInteger, Identity(always=True), primary_key=True),
+    )
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class DeviceSyncLogPublic(DeviceSyncLogBase):
+    id: int
+    created_at: datetime
+
+
 class HolidayBase(SQLModel):
     title: str = Field(max_length=255)
     description: str | None = Field(default=None, max_length=1000)
@@ -403,6 +562,15 @@ class Holiday(HolidayBase, table=True):
     created_by: uuid.UUID = Field(foreign_key="user.id")
 
 
+# The dates each active holiday falls on near the current year, so a calendar
+# range is one indexed scan; crud keeps these in step with the holidays
+class HolidayOccurrence(SQLModel, table=True):
+    __tablename__ = "holiday_occurrence"
+
+    occurrence_date: date = Field(primary_key=True)
+    holiday_id: uuid.UUID = Field(foreign_key="holiday.id", primary_key=True, ondelete="CASCADE")
+
+
 class HolidayCreate(HolidayBase):
     pass
 
@@ -3,9 +3,12 @@ from typing import List, Optional, Dict, Any
 from uuid import UUID
 
 from sqlmodel import Session, select
-from sqlalchemy import extract, func, and_, or_
+from sqlalchemy import bindparam, extract, func, and_, insert, lambda_stmt, or_, update
 
-from app.models import Attendance, AttendanceCreate, AttendanceUpdate, Employee, ZKTecoDevice
+from app.models import (
+    Attendance, AttendanceCreate, AttendanceUpdate, Employee, ZKTecoDevice,
+    FingerprintPunch, FingerprintPunchBatchResult, FingerprintPunchRejection
+)
 from app.core.exceptions import (
     EmployeeNotFoundException, 
     AttendanceValidationException,
@@ -91,7 +94,10 @@ class AttendanceService:
         start_of_day = datetime.combine(attendance_date, datetime.min.time())
         end_of_day = datetime.combine(attendance_date, datetime.max.time())
         
-        statement = select(Attendance).where(
+        # Called for every punch and every employee of a department summary;
+        # as a lambda statement the query is built once, not per call
+        statement = lambda_stmt(lambda: select(Attendance))
+        statement += lambda s: s.where(
             and_(
                 Attendance.employee_id == employee_id,
                 Attendance.check_in_time >= start_of_day,
@@ -99,7 +105,7 @@ class AttendanceService:
             )
         )
         
-        return self.db.exec(statement).first()
+        return self.db.execute(statement).scalars().first()
     
     def get_employee_attendance_summary(
         self, 
@@ -280,3 +286,106 @@ class AttendanceService:
                 status="present"
             )
             return self.create_attendance(attendance_data)
+    
+    def mark_attendance_batch(self, punches: List[FingerprintPunch]) -> FingerprintPunchBatchResult:
+        """Mark a batch of device punches in a fixed number of queries.
+
+        Each punch is handled like mark_attendance_by_fingerprint, in time
+        order: the first punch of a day checks in, the next one checks out.
+        New check-ins are written with one multi-row INSERT and check-outs
+        with one executemany UPDATE, in a single commit.
+        """
+        rejected: List[FingerprintPunchRejection] = []
+        if not punches:
+            return FingerprintPunchBatchResult(checked_in=0, checked_out=0, rejected=rejected)
+        
+        employee_ids = dict(self.db.exec(
+            select(Employee.employee_id, Employee.id)
+            .where(Employee.employee_id.in_({p.employee_device_id for p in punches}))
+        ).all())
+        device_ids = dict(self.db.exec(
+            select(ZKTecoDevice.device_id, ZKTecoDevice.id)
+            .where(ZKTecoDevice.device_id.in_({p.device_id for p in punches}))
+        ).all())
+        
+        # Records already stored for the days in the batch, keyed by (employee, day)
+        first_day = min(p.timestamp for p in punches).date()
+        last_day = max(p.timestamp for p in punches).date()
+        day_records: Dict[tuple, Dict[str, Any]] = {}
+        existing = self.db.exec(
+            select(Attendance.id, Attendance.employee_id, Attendance.check_in_time, Attendance.check_out_time)
+            .where(Attendance.employee_id.in_(set(employee_ids.values())))
+            .where(Attendance.check_in_time >= datetime.combine(first_day, datetime.min.time()))
+            .where(Attendance.check_in_time < datetime.combine(last_day + timedelta(days=1), datetime.min.time()))
+        ).all()
+        stored_ids = {row.id for row in existing}
+        for row in existing:
+            day_records.setdefault((row.employee_id, row.check_in_time.date()), row._asdict())
+        
+        new_rows: List[Dict[str, Any]] = []
+        check_outs: List[Dict[str, Any]] = []
+        for index, punch in sorted(enumerate(punches), key=lambda item: item[1].timestamp):
+            employee_id = employee_ids.get(punch.employee_device_id)
+            if not employee_id:
+                rejected.append(FingerprintPunchRejection(
+                    index=index, reason=f"Employee with device ID {punch.employee_device_id} not found"
+                ))
+                continue
+            device_id = device_ids.get(punch.device_id)
+            if not device_id:
+                rejected.append(FingerprintPunchRejection(index=index, reason=f"Device {punch.device_id} not found"))
+                continue
+            
+            key = (employee_id, punch.timestamp.date())
+            record = day_records.get(key)
+            if record is None:
+                record = Attendance(
+                    employee_id=employee_id,
+                    check_in_time=punch.timestamp,
+                    device_id=punch.device_id,
+                    zkteco_device_id=device_id,
+                    attendance_type="fingerprint",
+                    status="present"
+                ).model_dump()
+                new_rows.append(record)
+                day_records[key] = record
+                continue
+            
+            if record["check_out_time"]:
+                rejected.append(FingerprintPunchRejection(
+                    index=index, reason=f"Attendance for {punch.timestamp.date()} is already complete"
+                ))
+                continue
+            try:
+                self.validator.validate_attendance_time(record["check_in_time"], punch.timestamp)
+                self.validator.validate_work_hours(record["check_in_time"], punch.timestamp)
+            except AttendanceValidationException as e:
+                rejected.append(FingerprintPunchRejection(index=index, reason=e.message))
+                continue
+            record["check_out_time"] = punch.timestamp
+            if record["id"] in stored_ids:
+                # Rows new in this batch are inserted with their check-out instead
+                check_outs.append({
+                    "b_id": record["id"],
+                    "b_check_in_time": record["check_in_time"],
+                    "b_check_out_time": punch.timestamp,
+                })
+        
+        if new_rows:
+            self.db.execute(insert(Attendance), new_rows)
+        if check_outs:
+            # check_in_time in the WHERE lets Postgres prune to one partition
+            self.db.execute(
+                update(Attendance.__table__)
+                .where(Attendance.id == bindparam("b_id"))
+                .where(Attendance.check_in_time == bindparam("b_check_in_time"))
+                .values(check_out_time=bindparam("b_check_out_time"), updated_at=datetime.utcnow()),
+                check_outs
+            )
+        self.db.commit()
+        
+        return FingerprintPunchBatchResult(
+            checked_in=len(new_rows),
+            checked_out=len(check_outs) + sum(1 for row in new_rows if row["check_out_time"]),
+            rejected=sorted(rejected, key=lambda rejection: rejection.index)
+        )
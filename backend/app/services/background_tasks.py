@@ -5,22 +5,31 @@ import time
 from datetime import datetime
 from typing import Dict, List
 
+from sqlalchemy import text
 from sqlmodel import Session, create_engine, select
 
 from app.core.config import settings
+from app.core.db import ensure_attendance_partitions, ensure_holiday_occurrences
 from app.models import ZKTecoDevice
 from app.services.zkteco_service import ZKTecoManager
 
 logger = logging.getLogger(__name__)
 
+# pg_try_advisory_lock key held by the one app process that runs the scheduler
+SCHEDULER_LOCK = 4_870_002
+
 
 class BackgroundTaskManager:
     """Manager for background tasks related to ZKTeco devices"""
     
     def __init__(self):
-        self.engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+        # Straight to Postgres: a session-level advisory lock taken through a
+        # transaction-mode pooler would stay on a pooled server connection
+        # that other processes can be handed
+        self.engine = create_engine(str(settings.SQLALCHEMY_DIRECT_DATABASE_URI))
         self.running = False
         self.sync_task = None
+        self.lock_connection = None
     
     def start_sync_scheduler(self):
         """Start the background sync scheduler"""
@@ -28,6 +37,20 @@ class BackgroundTaskManager:
             logger.warning("Sync scheduler is already running")
             return
         
+        # Every app worker calls this at startup; only the one holding the
+        # session lock schedules jobs, the lock goes when its connection closes
+        self.lock_connection = self.engine.connect()
+        if not self.lock_connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": SCHEDULER_LOCK}
+        ).scalar():
+            # Don't keep an idle direct connection in every other process
+            self.lock_connection.invalidate()
+            self.lock_connection.close()
+            self.lock_connection = None
+            logger.info("Sync scheduler runs in another process")
+            return
+        self.lock_connection.commit()
+        
         self.running = True
         
         # Schedule sync tasks for each device based on their sync interval
@@ -41,6 +64,8 @@ class BackgroundTaskManager:
                     )
                     logger.info(f"Scheduled sync for device {device.device_name} every {device.sync_interval} minutes")
         
+        self._schedule_maintenance()
+
         # Start the scheduler in a separate thread
         self.sync_task = asyncio.create_task(self._run_scheduler())
         logger.info("Background sync scheduler started")
@@ -55,19 +80,49 @@ class BackgroundTaskManager:
         
         if self.sync_task:
             self.sync_task.cancel()
+        if self.lock_connection is not None:
+            # Drop the server connection rather than pool it, releasing the lock
+            self.lock_connection.invalidate()
+            self.lock_connection.close()
+            self.lock_connection = None
         
         logger.info("Background sync scheduler stopped")
     
     async def _run_scheduler(self):
         """Run the scheduler loop"""
+        # Reads trust holiday_occurrence inside its window, so catch up on a
+        # refresh missed while no process ran the scheduler
+        await asyncio.to_thread(self._ensure_holiday_occurrences)
         while self.running:
             try:
-                schedule.run_pending()
+                # Jobs talk to devices and the database; keep them off the loop
+                await asyncio.to_thread(schedule.run_pending)
                 await asyncio.sleep(60)  # Check every minute
             except Exception as e:
                 logger.error(f"Error in scheduler loop: {str(e)}")
                 await asyncio.sleep(60)
     
+    def _schedule_maintenance(self):
+        """Schedule database housekeeping that is not tied to a device"""
+        schedule.every().day.at("00:05").do(self._ensure_attendance_partitions)
+        schedule.every().day.at("00:10").do(self._ensure_holiday_occurrences)
+
+    def _ensure_attendance_partitions(self):
+        """Create upcoming monthly attendance partitions"""
+        try:
+            with Session(self.engine) as db:
+                ensure_attendance_partitions(db)
+        except Exception as e:
+            logger.error(f"Error creating attendance partitions: {str(e)}")
+
+    def _ensure_holiday_occurrences(self):
+        """Move the stored holiday occurrences along with the current year"""
+        try:
+            with Session(self.engine) as db:
+                ensure_holiday_occurrences(db)
+        except Exception as e:
+            logger.error(f"Error refreshing holiday occurrences: {str(e)}")
+
     def _sync_device_attendance(self, device_id: str):
         """Sync attendance from a specific device"""
         try:
@@ -104,6 +159,7 @@ class BackgroundTaskManager:
     def update_device_schedules(self):
         """Update sync schedules when device configurations change"""
         schedule.clear()
+        self._schedule_maintenance()
         
         with Session(self.engine) as db:
             devices = db.exec(select(ZKTecoDevice).where(ZKTecoDevice.is_active == True)).all()
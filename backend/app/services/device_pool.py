@@ -0,0 +1,34 @@
+import functools
+import threading
+from typing import Any, Callable, Dict, TypeVar
+
+import zk
+
+# Open pyzk handles, keyed by ZKTecoDevice.device_id, shared by every request
+# and sync worker in the process so each device gets one connection
+device_handles: Dict[str, zk.ZK] = {}
+device_connections: Dict[str, bool] = {}
+
+_device_locks: Dict[str, threading.RLock] = {}
+_device_locks_guard = threading.Lock()
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def device_lock(device_id: str) -> threading.RLock:
+    """The lock to hold while using a device's handle. Re-entrant, since the
+    device methods connect through one another."""
+    with _device_locks_guard:
+        return _device_locks.setdefault(device_id, threading.RLock())
+
+
+def holds_device_lock(method: F) -> F:
+    """Run a device service method under the device's lock. The method's first
+    argument after self is the ZKTecoDevice or its device_id."""
+    @functools.wraps(method)
+    def locked(self: Any, *args: Any, **kwargs: Any) -> Any:
+        device = args[0] if args else kwargs.get("device", kwargs.get("device_id"))
+        device_id = device if isinstance(device, str) else device.device_id
+        with device_lock(device_id):
+            return method(self, *args, **kwargs)
+    return locked  # type: ignore[return-value]
@@ -1,12 +1,13 @@
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
 from sqlmodel import Session, select
-from sqlalchemy import and_
+from sqlalchemy import and_, func, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.models import (
-    Employee, EmployeeCreate, EmployeeUpdate, Department, 
+    Attendance, Employee, EmployeeCreate, EmployeeUpdate, Department, 
     Fingerprint, FingerprintCreate, User, UserCreate
 )
 from app.core.exceptions import (
@@ -25,6 +26,32 @@ class EmployeeService:
         self.db = db
         self.validator = EmployeeValidator()
     
+    def get_employees(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        department_id: Optional[UUID] = None,
+        is_active: Optional[bool] = None,
+        cursor: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[Any]:
+        """Get employees newest first, optionally after a (created_at, id) cursor.
+
+        Rows carry ``Employee`` and ``total``, the unpaged number of matches
+        (from the cursor on, if one is given), counted in the same query.
+        """
+        statement = select(Employee, func.count().over().label("total"))
+        if department_id:
+            statement = statement.where(Employee.department_id == department_id)
+        if is_active is not None:
+            statement = statement.where(Employee.is_active == is_active)
+        if cursor:
+            # Seeks on ix_employee_created_at_id rather than skipping rows
+            statement = statement.where(tuple_(Employee.created_at, Employee.id) < cursor)
+        statement = statement.order_by(Employee.created_at.desc(), Employee.id.desc())
+        if skip:
+            statement = statement.offset(skip)
+        return self.db.exec(statement.limit(limit)).all()
+    
     def create_employee(self, employee_data: EmployeeCreate) -> Employee:
         """Create a new employee with validation"""
         # Validate employee data
@@ -127,24 +154,32 @@ class EmployeeService:
     
     def get_employee_with_details(self, employee_id: UUID) -> Dict[str, Any]:
         """Get employee with detailed information including fingerprints and attendance"""
-        employee = crud.get_employee(session=self.db, employee_id=employee_id)
+        # Department, user account and active fingerprints come with the employee:
+        # one joined SELECT plus one SELECT ... IN for the fingerprints
+        employee = self.db.exec(
+            select(Employee)
+            .where(Employee.id == employee_id)
+            .options(
+                joinedload(Employee.department),
+                joinedload(Employee.user),
+                selectinload(Employee.fingerprints.and_(Fingerprint.is_active == True))
+                .defer(Fingerprint.fingerprint_data),
+            )
+        ).first()
         if not employee:
             raise EmployeeNotFoundException(str(employee_id))
+        fingerprints = employee.fingerprints
         
-        # Get employee fingerprints
-        fingerprints = crud.get_employee_fingerprints(
-            session=self.db, 
-            employee_id=employee_id
-        )
-        
-        # Get recent attendance (last 30 days)
-        thirty_days_ago = datetime.utcnow() - datetime.timedelta(days=30)
-        recent_attendance = crud.get_employee_attendances(
-            session=self.db,
-            employee_id=employee_id,
-            start_date=thirty_days_ago,
-            limit=30
-        )
+        # Get recent attendance (last 30 days), with each record's device loaded
+        # in one more query instead of one per record
+        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        recent_attendance = self.db.exec(
+            select(Attendance)
+            .where(Attendance.employee_id == employee_id, Attendance.check_in_time >= thirty_days_ago)
+            .order_by(Attendance.check_in_time.desc())
+            .limit(30)
+            .options(selectinload(Attendance.device))
+        ).all()
         
         # Calculate attendance statistics
         total_attendance = len(recent_attendance)
@@ -8,10 +8,15 @@ from uuid import UUID
 
 import cv2
 import numpy as np
+import pybase64
 from PIL import Image
+from sqlalchemy import and_, func, insert, update
+from sqlalchemy.orm import defer
 from sqlmodel import Session, select
 
-from app.models import Employee, Fingerprint, FingerprintCreate, FingerprintUpdate, EmployeeFingerprintSummary
+from app.models import (
+    Employee, Fingerprint, FingerprintCreate, FingerprintUpdate, EmployeeFingerprintSummary, split_data_url
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,12 +30,22 @@ class FingerprintStorageService:
         self.max_fingerprints_per_type = 5  # Maximum fingerprints per finger type
         self.supported_formats = ["image", "template", "feature_vector"]
         self.supported_types = ["thumb", "index", "middle", "ring", "pinky"]
-        
-        # Create storage directory if it doesn't exist
-        os.makedirs(self.storage_path, exist_ok=True)
+        # save_fingerprint_image creates the storage directory when it first writes
+    
+    @staticmethod
+    def decode_image(fingerprint_data: str) -> bytes:
+        """Raw bytes of a base64 image data URL"""
+        return pybase64.b64decode(fingerprint_data.partition(",")[2])
+    
+    @staticmethod
+    def _is_image(fingerprint_format: str, media_type: Optional[str]) -> bool:
+        """Whether split_data_url gave the bytes of an image to validate and score"""
+        return fingerprint_format == "image" and media_type is not None and media_type.startswith("image/")
     
-    def validate_fingerprint_data(self, fingerprint_data: str, fingerprint_format: str) -> Tuple[bool, str]:
-        """Validate fingerprint data format and content"""
+    def validate_fingerprint_data(self, fingerprint_data: str, fingerprint_format: str,
+                                  image_bytes: Optional[bytes] = None) -> Tuple[bool, str]:
+        """Validate fingerprint data format and content.
+        Pass image_bytes if the image data URL is already decoded."""
         try:
             if fingerprint_format == "image":
                 # Validate base64 image data
@@ -38,8 +53,8 @@ class FingerprintStorageService:
                     return False, "Invalid image format. Expected base64 encoded image."
                 
                 # Decode and validate image
-                image_data = fingerprint_data.split(",")[1]
-                image_bytes = base64.b64decode(image_data)
+                if image_bytes is None:
+                    image_bytes = self.decode_image(fingerprint_data)
                 image = Image.open(io.BytesIO(image_bytes))
                 
                 # Check image dimensions (typical fingerprint images are 200x200 to 500x500)
@@ -71,13 +86,14 @@ class FingerprintStorageService:
         except Exception as e:
             return False, f"Validation error: {str(e)}"
     
-    def calculate_quality_score(self, fingerprint_data: str, fingerprint_format: str) -> float:
+    def calculate_quality_score(self, fingerprint_data: str, fingerprint_format: str,
+                                image_bytes: Optional[bytes] = None) -> float:
         """Calculate quality score for fingerprint data"""
         try:
             if fingerprint_format == "image":
                 # Decode image and calculate quality metrics
-                image_data = fingerprint_data.split(",")[1]
-                image_bytes = base64.b64decode(image_data)
+                if image_bytes is None:
+                    image_bytes = self.decode_image(fingerprint_data)
                 image = Image.open(io.BytesIO(image_bytes))
                 
                 # Convert to OpenCV format for analysis
@@ -117,7 +133,8 @@ class FingerprintStorageService:
             logger.error(f"Error calculating quality score: {e}")
             return 50.0  # Default score
     
-    def save_fingerprint_image(self, fingerprint_data: str, employee_id: UUID, fingerprint_type: str, position: int) -> str:
+    def save_fingerprint_image(self, fingerprint_data: str, employee_id: UUID, fingerprint_type: str, position: int,
+                               image_bytes: Optional[bytes] = None) -> str:
         """Save fingerprint image to file system"""
         try:
             # Create employee directory
@@ -129,8 +146,8 @@ class FingerprintStorageService:
             filepath = os.path.join(employee_dir, filename)
             
             # Decode and save image
-            image_data = fingerprint_data.split(",")[1]
-            image_bytes = base64.b64decode(image_data)
+            if image_bytes is None:
+                image_bytes = self.decode_image(fingerprint_data)
             
             with open(filepath, "wb") as f:
                 f.write(image_bytes)
@@ -152,10 +169,15 @@ class FingerprintStorageService:
             if not employee:
                 raise ValueError("Employee not found")
             
+            # Decode an image once for validation, scoring, storage and the file copy
+            media_type, payload = split_data_url(fingerprint_in.fingerprint_data)
+            image_bytes = payload if self._is_image(fingerprint_in.fingerprint_format, media_type) else None
+            
             # Validate fingerprint data
             is_valid, error_msg = self.validate_fingerprint_data(
                 fingerprint_in.fingerprint_data, 
-                fingerprint_in.fingerprint_format
+                fingerprint_in.fingerprint_format,
+                image_bytes
             )
             
             if not is_valid:
@@ -177,7 +199,8 @@ class FingerprintStorageService:
             # Calculate quality score
             quality_score = self.calculate_quality_score(
                 fingerprint_in.fingerprint_data, 
-                fingerprint_in.fingerprint_format
+                fingerprint_in.fingerprint_format,
+                image_bytes
             )
             
             # Create fingerprint record
@@ -185,7 +208,8 @@ class FingerprintStorageService:
                 employee_id=fingerprint_in.employee_id,
                 fingerprint_type=fingerprint_in.fingerprint_type,
                 fingerprint_position=fingerprint_in.fingerprint_position,
-                fingerprint_data=fingerprint_in.fingerprint_data,
+                fingerprint_data=payload,
+                fingerprint_media_type=media_type,
                 fingerprint_format=fingerprint_in.fingerprint_format,
                 quality_score=quality_score,
                 notes=fingerprint_in.notes
@@ -197,7 +221,8 @@ class FingerprintStorageService:
                     fingerprint_in.fingerprint_data,
                     fingerprint_in.employee_id,
                     fingerprint_in.fingerprint_type,
-                    fingerprint_in.fingerprint_position
+                    fingerprint_in.fingerprint_position,
+                    image_bytes
                 )
                 fingerprint.notes = f"File saved: {filepath}"
             
@@ -215,11 +240,11 @@ class FingerprintStorageService:
             raise
     
     def get_employee_fingerprints(self, employee_id: UUID, fingerprint_type: Optional[str] = None) -> List[Fingerprint]:
-        """Get all fingerprints for an employee"""
+        """Get all fingerprints for an employee, with fingerprint_data left unloaded"""
         query = select(Fingerprint).where(
             Fingerprint.employee_id == employee_id,
             Fingerprint.is_active == True
-        )
+        ).options(defer(Fingerprint.fingerprint_data))
         
         if fingerprint_type:
             query = query.where(Fingerprint.fingerprint_type == fingerprint_type)
@@ -228,86 +253,101 @@ class FingerprintStorageService:
     
     def get_fingerprint_summary(self, employee_id: UUID) -> EmployeeFingerprintSummary:
         """Get fingerprint summary for an employee"""
-        fingerprints = self.get_employee_fingerprints(employee_id)
-        
-        employee = self.db.exec(
-            select(Employee).where(Employee.id == employee_id)
-        ).first()
-        
-        if not employee:
+        summary = self.get_fingerprint_summaries([employee_id]).get(employee_id)
+        if not summary:
             raise ValueError("Employee not found")
-        
-        # Count fingerprints by type
-        thumb_count = len([f for f in fingerprints if f.fingerprint_type == "thumb"])
-        index_count = len([f for f in fingerprints if f.fingerprint_type == "index"])
-        middle_count = len([f for f in fingerprints if f.fingerprint_type == "middle"])
-        ring_count = len([f for f in fingerprints if f.fingerprint_type == "ring"])
-        pinky_count = len([f for f in fingerprints if f.fingerprint_type == "pinky"])
-        
-        # Get last updated timestamp
-        last_updated = max([f.updated_at for f in fingerprints]) if fingerprints else None
-        
-        return EmployeeFingerprintSummary(
-            employee_id=employee_id,
-            employee_name=f"{employee.first_name} {employee.last_name}",
-            total_fingerprints=len(fingerprints),
-            thumb_fingerprints=thumb_count,
-            index_fingerprints=index_count,
-            middle_fingerprints=middle_count,
-            ring_fingerprints=ring_count,
-            pinky_fingerprints=pinky_count,
-            last_updated=last_updated
-        )
+        return summary
     
-    def update_fingerprint(self, fingerprint_id: UUID, fingerprint_update: FingerprintUpdate) -> Fingerprint:
-        """Update a fingerprint record"""
-        fingerprint = self.db.exec(
-            select(Fingerprint).where(Fingerprint.id == fingerprint_id)
-        ).first()
+    def get_fingerprint_summaries(self, employee_ids: List[UUID]) -> Dict[UUID, EmployeeFingerprintSummary]:
+        """Get fingerprint summaries for several employees, keyed by employee id.
+        Unknown employees are left out."""
+        if not employee_ids:
+            return {}
         
-        if not fingerprint:
-            raise ValueError("Fingerprint not found")
+        # Employees and per-type counts of active fingerprints in one query,
+        # without loading the fingerprint images
+        def count_of(fingerprint_type: str) -> Any:
+            return func.count(Fingerprint.id).filter(Fingerprint.fingerprint_type == fingerprint_type)
         
-        # Update fields
-        update_data = fingerprint_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(fingerprint, field, value)
+        rows = self.db.exec(
+            select(
+                Employee.id,
+                Employee.first_name,
+                Employee.last_name,
+                func.count(Fingerprint.id).label("total"),
+                count_of("thumb").label("thumb_count"),
+                count_of("index").label("index_count"),
+                count_of("middle").label("middle_count"),
+                count_of("ring").label("ring_count"),
+                count_of("pinky").label("pinky_count"),
+                func.max(Fingerprint.updated_at).label("last_updated"),
+            )
+            .outerjoin(Fingerprint, and_(Fingerprint.employee_id == Employee.id, Fingerprint.is_active == True))
+            .where(Employee.id.in_(set(employee_ids)))
+            .group_by(Employee.id)
+        ).all()
         
-        fingerprint.updated_at = datetime.utcnow()
+        return {
+            row.id: EmployeeFingerprintSummary(
+                employee_id=row.id,
+                employee_name=f"{row.first_name} {row.last_name}",
+                total_fingerprints=row.total,
+                thumb_fingerprints=row.thumb_count,
+                index_fingerprints=row.index_count,
+                middle_fingerprints=row.middle_count,
+                ring_fingerprints=row.ring_count,
+                pinky_fingerprints=row.pinky_count,
+                last_updated=row.last_updated
+            )
+            for row in rows
+        }
+    
+    def update_fingerprint(self, fingerprint_id: UUID, fingerprint_update: FingerprintUpdate) -> Optional[Fingerprint]:
+        """Update a fingerprint record in one UPDATE ... RETURNING.
+        Returns None if there is no such fingerprint."""
+        update_data = fingerprint_update.model_dump(exclude_unset=True)
+        update_data["updated_at"] = datetime.utcnow()
         
         # Recalculate quality score if data changed
         if fingerprint_update.fingerprint_data:
-            fingerprint.quality_score = self.calculate_quality_score(
+            fingerprint_format = fingerprint_update.fingerprint_format or self.db.exec(
+                select(Fingerprint.fingerprint_format).where(Fingerprint.id == fingerprint_id)
+            ).first()
+            if fingerprint_format is None:
+                return None
+            update_data["quality_score"] = self.calculate_quality_score(
                 fingerprint_update.fingerprint_data,
-                fingerprint.fingerprint_format
+                fingerprint_format
+            )
+            update_data["fingerprint_media_type"], update_data["fingerprint_data"] = split_data_url(
+                fingerprint_update.fingerprint_data
             )
         
-        self.db.add(fingerprint)
+        fingerprint = self.db.execute(
+            update(Fingerprint).where(Fingerprint.id == fingerprint_id).values(**update_data).returning(Fingerprint)
+        ).scalar_one_or_none()
+        if fingerprint:
+            # Keep the RETURNING values instead of having commit expire them
+            self.db.expunge(fingerprint)
         self.db.commit()
-        self.db.refresh(fingerprint)
         
         return fingerprint
     
     def delete_fingerprint(self, fingerprint_id: UUID) -> bool:
-        """Delete a fingerprint record"""
-        fingerprint = self.db.exec(
-            select(Fingerprint).where(Fingerprint.id == fingerprint_id)
+        """Soft delete a fingerprint record; returns False if there was none"""
+        deleted = self.db.execute(
+            update(Fingerprint)
+            .where(Fingerprint.id == fingerprint_id)
+            .values(is_active=False, updated_at=datetime.utcnow())
+            .returning(Fingerprint.id)
         ).first()
-        
-        if not fingerprint:
-            return False
-        
-        # Soft delete
-        fingerprint.is_active = False
-        fingerprint.updated_at = datetime.utcnow()
-        
-        self.db.add(fingerprint)
         self.db.commit()
         
-        return True
+        return deleted is not None
     
     def bulk_create_fingerprints(self, employee_id: UUID, fingerprints: List[FingerprintCreate]) -> Dict[str, Any]:
-        """Bulk create fingerprints for an employee"""
+        """Bulk create fingerprints for an employee.
+        Fingerprints that fail validation are listed in errors; the rest are inserted together."""
         employee = self.db.exec(
             select(Employee).where(Employee.id == employee_id)
         ).first()
@@ -323,19 +363,77 @@ class FingerprintStorageService:
             "errors": []
         }
         
+        # Every position the unique constraint covers, inactive ones included,
+        # so a single conflict cannot fail the whole insert
+        taken = set(self.db.exec(
+            select(Fingerprint.fingerprint_type, Fingerprint.fingerprint_position).where(
+                Fingerprint.employee_id == employee_id
+            )
+        ).all())
+        
+        rows = []
         for fingerprint_in in fingerprints:
             try:
-                # Set employee_id if not provided
-                if not fingerprint_in.employee_id:
-                    fingerprint_in.employee_id = employee_id
+                if fingerprint_in.employee_id != employee_id:
+                    raise ValueError("Fingerprint belongs to another employee")
+                
+                key = (fingerprint_in.fingerprint_type, fingerprint_in.fingerprint_position)
+                if key in taken:
+                    raise ValueError(f"Fingerprint position {fingerprint_in.fingerprint_position} already exists for {fingerprint_in.fingerprint_type}")
                 
-                self.create_fingerprint(fingerprint_in)
-                results["total_added"] += 1
+                media_type, payload = split_data_url(fingerprint_in.fingerprint_data)
+                image_bytes = payload if self._is_image(fingerprint_in.fingerprint_format, media_type) else None
+                
+                is_valid, error_msg = self.validate_fingerprint_data(
+                    fingerprint_in.fingerprint_data,
+                    fingerprint_in.fingerprint_format,
+                    image_bytes
+                )
+                if not is_valid:
+                    raise ValueError(error_msg)
+                
+                fingerprint = Fingerprint(
+                    employee_id=employee_id,
+                    fingerprint_type=fingerprint_in.fingerprint_type,
+                    fingerprint_position=fingerprint_in.fingerprint_position,
+                    fingerprint_data=payload,
+                    fingerprint_media_type=media_type,
+                    fingerprint_format=fingerprint_in.fingerprint_format,
+                    quality_score=self.calculate_quality_score(
+                        fingerprint_in.fingerprint_data,
+                        fingerprint_in.fingerprint_format,
+                        image_bytes
+                    ),
+                    notes=fingerprint_in.notes
+                )
+                if fingerprint_in.fingerprint_format == "image":
+                    filepath = self.save_fingerprint_image(
+                        fingerprint_in.fingerprint_data,
+                        employee_id,
+                        fingerprint_in.fingerprint_type,
+                        fingerprint_in.fingerprint_position,
+                        image_bytes
+                    )
+                    fingerprint.notes = f"File saved: {filepath}"
+                
+                rows.append(fingerprint.model_dump())
+                taken.add(key)
                 
             except Exception as e:
                 results["total_failed"] += 1
                 results["errors"].append(f"Position {fingerprint_in.fingerprint_position}: {str(e)}")
         
+        if rows:
+            try:
+                self.db.execute(insert(Fingerprint), rows)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Error creating fingerprints: {e}")
+                raise
+            logger.info(f"Created {len(rows)} fingerprints for employee {employee_id}")
+        
+        results["total_added"] = len(rows)
         return results
     
     def get_available_positions(self, employee_id: UUID, fingerprint_type: str) -> List[int]:
@@ -12,6 +12,8 @@ from PIL import Image
 
 from app.models import Employee, Fingerprint, FingerprintCreate, ZKTecoDevice
 from app.crud import create_fingerprint, get_employee_fingerprints, delete_fingerprint
+from app.services import device_pool
+from app.services.device_pool import holds_device_lock
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +21,21 @@ logger = logging.getLogger(__name__)
 class ZKTecoFingerprintService:
     """Service for managing fingerprints with ZKTeco devices"""
     
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        devices: Optional[Dict[str, zk.ZK]] = None,
+        device_connections: Optional[Dict[str, bool]] = None,
+    ):
         self.db = db
-        self.devices: Dict[str, zk.ZK] = {}
-        self.device_connections: Dict[str, bool] = {}
+        # Defaults to the process-wide pool that ZKTecoService also uses, so
+        # both share one connection per device; device methods hold its lock
+        self.devices: Dict[str, zk.ZK] = devices if devices is not None else device_pool.device_handles
+        self.device_connections: Dict[str, bool] = (
+            device_connections if device_connections is not None else device_pool.device_connections
+        )
     
+    @holds_device_lock
     def connect_device(self, device: ZKTecoDevice) -> bool:
         """Connect to a ZKTeco device"""
         try:
@@ -42,20 +54,23 @@ class ZKTecoFingerprintService:
             logger.error(f"Error connecting to device {device.device_name}: {str(e)}")
             return False
     
+    @holds_device_lock
     def disconnect_device(self, device_id: str) -> bool:
-        """Disconnect from a ZKTeco device"""
+        """Disconnect from a ZKTeco device.
+        The handle is dropped even if the device does not answer."""
+        zk_instance = self.devices.pop(device_id, None)
+        if zk_instance is None:
+            return False
+        self.device_connections[device_id] = False
         try:
-            if device_id in self.devices:
-                zk_instance = self.devices[device_id]
-                zk_instance.disconnect()
-                del self.devices[device_id]
-                self.device_connections[device_id] = False
-                logger.info(f"Disconnected from device {device_id}")
-                return True
+            zk_instance.disconnect()
+            logger.info(f"Disconnected from device {device_id}")
+            return True
         except Exception as e:
             logger.error(f"Error disconnecting from device {device_id}: {str(e)}")
         return False
     
+    @holds_device_lock
     def get_device_users(self, device: ZKTecoDevice) -> List[Dict]:
         """Get all users from a ZKTeco device"""
         if device.device_id not in self.devices:
@@ -83,8 +98,11 @@ class ZKTecoFingerprintService:
             
         except Exception as e:
             logger.error(f"Error getting users from device {device.device_name}: {str(e)}")
+            # Handles are kept between requests; reconnect next time
+            self.disconnect_device(device.device_id)
             return []
     
+    @holds_device_lock
     def capture_fingerprint_from_device(self, device: ZKTecoDevice, employee_id: UUID, 
                                       fingerprint_type: str = "thumb", 
                                       position: int = 1) -> Optional[Fingerprint]:
@@ -164,8 +182,10 @@ class ZKTecoFingerprintService:
             
         except Exception as e:
             logger.error(f"Error capturing fingerprint from device {device.device_name}: {str(e)}")
+            self.disconnect_device(device.device_id)
             return None
     
+    @holds_device_lock
     def verify_fingerprint_on_device(self, device: ZKTecoDevice, employee_id: UUID) -> bool:
         """Verify fingerprint on ZKTeco device in real-time"""
         if device.device_id not in self.devices:
@@ -210,8 +230,10 @@ class ZKTecoFingerprintService:
             
         except Exception as e:
             logger.error(f"Error verifying fingerprint on device {device.device_name}: {str(e)}")
+            self.disconnect_device(device.device_id)
             return False
     
+    @holds_device_lock
     def sync_fingerprints_from_device(self, device: ZKTecoDevice) -> Tuple[int, str]:
         """Sync all fingerprints from a ZKTeco device to the database"""
         try:
@@ -301,6 +323,7 @@ class ZKTecoFingerprintService:
             logger.error(f"Error converting device fingerprint to image: {str(e)}")
             return None
     
+    @holds_device_lock
     def enroll_fingerprint_on_device(self, device: ZKTecoDevice, employee_id: UUID, 
                                    fingerprint_type: str = "thumb", 
                                    position: int = 1) -> bool:
@@ -333,4 +356,5 @@ class ZKTecoFingerprintService:
             
         except Exception as e:
             logger.error(f"Error enrolling fingerprint on device {device.device_name}: {str(e)}")
+            self.disconnect_device(device.device_id)
             return False
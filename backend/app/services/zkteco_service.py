@@ -1,15 +1,21 @@
 import asyncio
+import errno
 import logging
-import socket
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from uuid import UUID
 
 import zk
 from sqlmodel import Session, select
 
-from app.models import Attendance, AttendanceCreate, Employee, ZKTecoDevice, DeviceSyncLog
+from app import crud
+from app.core.cache import invalidate_fingerprint_summaries, invalidate_reports
+from app.core.db import engine
+from app.models import Attendance, AttendanceCreate, Employee, ZKTecoDevice, DeviceSyncLog, DeviceSyncLogBase
+from app.services import device_pool
+from app.services.device_pool import holds_device_lock
+from app.services.zkteco_fingerprint_service import ZKTecoFingerprintService
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +23,21 @@ logger = logging.getLogger(__name__)
 class ZKTecoService:
     """Service for managing ZKTeco fingerprint devices"""
     
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        devices: Optional[Dict[str, zk.ZK]] = None,
+        device_connections: Optional[Dict[str, bool]] = None,
+    ):
         self.db = db
-        self.devices: Dict[str, zk.ZK] = {}
-        self.device_connections: Dict[str, bool] = {}
+        # Defaults to the process-wide pool, so requests and sync workers reuse
+        # one connection per device; device methods hold its lock
+        self.devices: Dict[str, zk.ZK] = devices if devices is not None else device_pool.device_handles
+        self.device_connections: Dict[str, bool] = (
+            device_connections if device_connections is not None else device_pool.device_connections
+        )
     
+    @holds_device_lock
     def connect_device(self, device: ZKTecoDevice) -> bool:
         """Connect to a ZKTeco device"""
         try:
@@ -90,6 +106,7 @@ class ZKTecoService:
             logger.error(f"Error connecting to device {device.device_name}: {error_msg}")
             return False
     
+    @holds_device_lock
     def disconnect_device(self, device_id: str) -> bool:
         """Disconnect from a ZKTeco device"""
         try:
@@ -104,6 +121,7 @@ class ZKTecoService:
             logger.error(f"Error disconnecting from device {device_id}: {str(e)}")
         return False
     
+    @holds_device_lock
     def get_device_attendance(self, device: ZKTecoDevice, start_date: datetime = None, end_date: datetime = None) -> List[Dict]:
         """Get attendance records from a ZKTeco device"""
         if device.device_id not in self.devices:
@@ -145,8 +163,23 @@ class ZKTecoService:
             self.db.commit()
             return []
     
-    def sync_attendance_from_device(self, device: ZKTecoDevice) -> Tuple[int, str]:
-        """Sync attendance records from a device to the database"""
+    def _record_sync_log(self, sync_log: DeviceSyncLogBase, sync_logs: Optional[List[DeviceSyncLogBase]]):
+        """Write a sync log now, or queue it when the caller batches them"""
+        if sync_logs is not None:
+            sync_logs.append(sync_log)
+            return
+        self.db.add(DeviceSyncLog.model_validate(sync_log))
+        self.db.commit()
+    
+    @holds_device_lock
+    def sync_attendance_from_device(
+        self, device: ZKTecoDevice, sync_logs: Optional[List[DeviceSyncLogBase]] = None
+    ) -> Tuple[int, str]:
+        """Sync attendance records from a device to the database.
+
+        If ``sync_logs`` is given, the sync log is appended to it instead of
+        being written, so the caller can store a whole cycle in one batch.
+        """
         start_time = time.time()
         records_synced = 0
         sync_status = "success"
@@ -243,6 +276,8 @@ class ZKTecoService:
             
             # Commit all changes
             self.db.commit()
+            if records_synced:
+                invalidate_reports()
             
             # Update device sync time
             device.last_sync = datetime.utcnow()
@@ -253,7 +288,7 @@ class ZKTecoService:
             sync_duration = time.time() - start_time
             
             # Log sync operation
-            sync_log = DeviceSyncLog(
+            sync_log = DeviceSyncLogBase(
                 device_id=device.id,
                 sync_type="attendance",
                 records_synced=records_synced,
@@ -261,8 +296,7 @@ class ZKTecoService:
                 error_message=error_message,
                 sync_duration=sync_duration
             )
-            self.db.add(sync_log)
-            self.db.commit()
+            self._record_sync_log(sync_log, sync_logs)
             
             logger.info(f"Successfully synced {records_synced} attendance records from device {device.device_name}")
             return records_synced, sync_status
@@ -273,7 +307,7 @@ class ZKTecoService:
             error_message = str(e)
             
             # Log failed sync
-            sync_log = DeviceSyncLog(
+            sync_log = DeviceSyncLogBase(
                 device_id=device.id,
                 sync_type="attendance",
                 records_synced=records_synced,
@@ -281,12 +315,12 @@ class ZKTecoService:
                 error_message=error_message,
                 sync_duration=sync_duration
             )
-            self.db.add(sync_log)
-            self.db.commit()
+            self._record_sync_log(sync_log, sync_logs)
             
             logger.error(f"Error syncing attendance from device {device.device_name}: {str(e)}")
             return records_synced, sync_status
     
+    @holds_device_lock
     def upload_users_to_device(self, device: ZKTecoDevice, employees: List[Employee]) -> Tuple[int, str]:
         """Upload employee data to ZKTeco device"""
         if device.device_id not in self.devices:
@@ -326,6 +360,7 @@ class ZKTecoService:
             logger.error(f"Error uploading users to device {device.device_name}: {str(e)}")
             return 0, "failed"
     
+    @holds_device_lock
     def get_device_info(self, device: ZKTecoDevice) -> Dict:
         """Get device information"""
         if device.device_id not in self.devices:
@@ -357,6 +392,7 @@ class ZKTecoService:
             logger.error(f"Error getting device info for {device.device_name}: {str(e)}")
             return {"status": "error", "error": str(e)}
     
+    @holds_device_lock
     def clear_device_attendance(self, device: ZKTecoDevice) -> bool:
         """Clear attendance records from device"""
         if device.device_id not in self.devices:
@@ -378,6 +414,7 @@ class ZKTecoService:
             logger.error(f"Error clearing attendance from device {device.device_name}: {str(e)}")
             return False
     
+    @holds_device_lock
     def restart_device(self, device: ZKTecoDevice) -> bool:
         """Restart ZKTeco device"""
         if device.device_id not in self.devices:
@@ -408,6 +445,194 @@ class ZKTecoService:
         logger.info("Closed all device connections")
 
 
+async def probe_device(device: ZKTecoDevice, timeout: float = 5) -> int:
+    """Open a TCP connection to the device without blocking the event loop.
+
+    Returns 0 if the port accepts connections, otherwise the errno, as
+    socket.connect_ex would.
+    """
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(device.device_ip, device.device_port), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        return errno.ETIMEDOUT
+    except OSError as e:
+        return e.errno or errno.EHOSTUNREACH
+    writer.close()
+    return 0
+
+
+def run_queued_syncs(sync_log_ids: List[int]) -> None:
+    """Run queued attendance syncs in the background.
+
+    Each id is a DeviceSyncLog row created with status "queued". The row is
+    marked "running" and then gets the outcome of the sync. The request
+    session is closed by the time this runs, so it opens its own.
+    """
+    with Session(engine) as db:
+        manager = ZKTecoManager(db)
+        for log_id in sync_log_ids:
+            sync_log = db.get(DeviceSyncLog, log_id)
+            if not sync_log:
+                continue
+            sync_log.sync_status = "running"
+            db.add(sync_log)
+            db.commit()
+            
+            results: List[DeviceSyncLogBase] = []
+            try:
+                device = db.get(ZKTecoDevice, sync_log.device_id)
+                if not device:
+                    raise ValueError("Device not found")
+                manager.get_service(device.id).sync_attendance_from_device(device, sync_logs=results)
+            except Exception as e:
+                logger.error(f"Queued sync {log_id} failed: {str(e)}")
+                db.rollback()
+                results = [DeviceSyncLogBase(
+                    device_id=sync_log.device_id,
+                    sync_type=sync_log.sync_type,
+                    sync_status="failed",
+                    error_message=str(e),
+                )]
+            
+            # No log means there was nothing new on the device
+            if results:
+                sync_log.sqlmodel_update(results[0].model_dump(exclude={"device_id", "sync_type"}))
+            else:
+                sync_log.sync_status = "success"
+            db.add(sync_log)
+            db.commit()
+
+
+def run_queued_enrollment(sync_log_id: int, employee_id: UUID, fingerprint_type: str, position: int) -> None:
+    """Run a queued fingerprint enrollment in the background.
+
+    The DeviceSyncLog row (sync_type "enroll") only tracks the status; the
+    enrollment parameters travel with the queued job.
+    """
+    with Session(engine) as db:
+        sync_log = db.get(DeviceSyncLog, sync_log_id)
+        if not sync_log:
+            return
+        sync_log.sync_status = "running"
+        db.add(sync_log)
+        db.commit()
+        
+        fingerprint_service = ZKTecoFingerprintService(db)
+        error_message = None
+        try:
+            device = db.get(ZKTecoDevice, sync_log.device_id)
+            if not device:
+                raise ValueError("Device not found")
+            if not fingerprint_service.enroll_fingerprint_on_device(
+                device=device, employee_id=employee_id, fingerprint_type=fingerprint_type, position=position
+            ):
+                error_message = "Failed to enroll fingerprint on device"
+        except Exception as e:
+            logger.error(f"Queued enrollment {sync_log_id} failed: {str(e)}")
+            db.rollback()
+            error_message = str(e)
+        
+        sync_log.sync_status = "failed" if error_message else "success"
+        sync_log.error_message = error_message
+        sync_log.records_synced = 0 if error_message else 1
+        db.add(sync_log)
+        db.commit()
+
+
+def run_queued_fingerprint_sync(sync_log_id: int) -> None:
+    """Copy the fingerprints on a device into the database in the background,
+    for a queued DeviceSyncLog row with sync_type "fingerprints"."""
+    with Session(engine) as db:
+        sync_log = db.get(DeviceSyncLog, sync_log_id)
+        if not sync_log:
+            return
+        sync_log.sync_status = "running"
+        db.add(sync_log)
+        db.commit()
+        
+        fingerprint_service = ZKTecoFingerprintService(db)
+        fingerprints_synced = 0
+        error_message = None
+        try:
+            device = db.get(ZKTecoDevice, sync_log.device_id)
+            if not device:
+                raise ValueError("Device not found")
+            fingerprints_synced, status = fingerprint_service.sync_fingerprints_from_device(device)
+            if status.startswith("Error"):
+                error_message = status
+        except Exception as e:
+            logger.error(f"Queued fingerprint sync {sync_log_id} failed: {str(e)}")
+            db.rollback()
+            error_message = str(e)
+        
+        if fingerprints_synced:
+            invalidate_fingerprint_summaries()
+        sync_log.sync_status = "failed" if error_message else "success"
+        sync_log.error_message = error_message
+        sync_log.records_synced = fingerprints_synced
+        db.add(sync_log)
+        db.commit()
+
+
+# Bounded so a burst of sync or enrollment requests waits on the queue instead
+# of piling blocking device IO onto the threadpool
+SYNC_WORKERS = 8
+SYNC_QUEUE_SIZE = 100
+
+_sync_queue: Optional[asyncio.Queue] = None
+_sync_workers: List[asyncio.Task] = []
+
+
+async def _sync_worker(queue: asyncio.Queue) -> None:
+    while True:
+        job, *args = await queue.get()
+        try:
+            await asyncio.to_thread(job, *args)
+        except Exception as e:
+            logger.error(f"Sync worker failed on {job.__name__}{tuple(args)}: {str(e)}")
+        finally:
+            queue.task_done()
+
+
+def start_sync_workers() -> None:
+    """Start the sync worker tasks on the running event loop"""
+    global _sync_queue
+    _sync_queue = asyncio.Queue(maxsize=SYNC_QUEUE_SIZE)
+    _sync_workers.extend(asyncio.create_task(_sync_worker(_sync_queue)) for _ in range(SYNC_WORKERS))
+
+
+async def stop_sync_workers() -> None:
+    for task in _sync_workers:
+        task.cancel()
+    await asyncio.gather(*_sync_workers, return_exceptions=True)
+    _sync_workers.clear()
+
+
+async def enqueue_job(job: Callable[..., None], *args: Any) -> None:
+    """Have a worker thread run job(*args), waiting while the queue is full"""
+    if _sync_queue is None:
+        raise RuntimeError("Sync workers are not running")
+    await _sync_queue.put((job, *args))
+
+
+async def enqueue_enrollment(sync_log_id: int, employee_id: UUID, fingerprint_type: str, position: int) -> None:
+    """Hand a queued enrollment DeviceSyncLog id to the workers"""
+    await enqueue_job(run_queued_enrollment, sync_log_id, employee_id, fingerprint_type, position)
+
+
+async def enqueue_fingerprint_sync(sync_log_id: int) -> None:
+    """Hand a queued fingerprint sync DeviceSyncLog id to the workers"""
+    await enqueue_job(run_queued_fingerprint_sync, sync_log_id)
+
+
+async def enqueue_syncs(sync_log_ids: List[int]) -> None:
+    """Hand queued DeviceSyncLog ids to the workers, waiting while the queue is full"""
+    for log_id in sync_log_ids:
+        await enqueue_job(run_queued_syncs, [log_id])
+
+
 class ZKTecoManager:
     """Manager class for handling multiple ZKTeco devices"""
     
@@ -430,40 +655,32 @@ class ZKTecoManager:
             select(ZKTecoDevice).where(ZKTecoDevice.is_active == True)
         ).all()
         
+        # Collect every device's sync log and store them with one COPY
+        sync_logs: List[DeviceSyncLogBase] = []
         for device in devices:
             service = self.get_service(device.id)
-            records_synced, status = service.sync_attendance_from_device(device)
+            records_synced, status = service.sync_attendance_from_device(device, sync_logs=sync_logs)
             results[device.device_name] = (records_synced, status)
         
+        crud.create_device_sync_logs(session=self.db, sync_logs_in=sync_logs)
         return results
     
-    def check_device_status(self, device: ZKTecoDevice) -> str:
+    async def check_device_status(self, device: ZKTecoDevice) -> str:
         """Check if device is online"""
-        try:
-            # Test TCP connection
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((device.device_ip, device.device_port))
-            sock.close()
-            
-            if result == 0:
-                return "online"
-            else:
-                return "offline"
-        except Exception:
-            return "offline"
+        return "online" if await probe_device(device) == 0 else "offline"
     
-    def update_all_device_statuses(self):
-        """Update status of all devices"""
-        devices = self.db.exec(select(ZKTecoDevice)).all()
+    async def update_all_device_statuses(self):
+        """Update status of all devices, probing them concurrently"""
+        # The session is sync; keep its round trips off the event loop
+        devices = await asyncio.to_thread(lambda: self.db.exec(select(ZKTecoDevice)).all())
+        statuses = await asyncio.gather(*(self.check_device_status(device) for device in devices))
         
-        for device in devices:
-            status = self.check_device_status(device)
+        for device, status in zip(devices, statuses, strict=True):
             if device.device_status != status:
                 device.device_status = status
                 self.db.add(device)
         
-        self.db.commit()
+        await asyncio.to_thread(self.db.commit)
     
     def close_all_services(self):
         """Close all device services"""
@@ -0,0 +1,25 @@
+from fastapi.routing import APIRoute
+
+from app.api.main import ROUTERS, api_router
+from app.core.config import settings
+
+
+def test_api_router_includes_every_route() -> None:
+    expected = sum(len(router.routes) for router, _, _ in ROUTERS)
+    assert len(api_router.routes) == expected
+
+
+def test_api_router_has_no_duplicate_routes() -> None:
+    seen = [
+        (route.path, method)
+        for route in api_router.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    ]
+    assert len(seen) == len(set(seen))
+
+
+def test_api_router_mounts_attendance_fingerprints_holidays() -> None:
+    paths = {route.path for route in api_router.routes}
+    for prefix in ("/attendance", "/fingerprints", "/holidays"):
+        assert any(path.startswith(f"{settings.API_V1_STR}{prefix}") for path in paths)
@@ -0,0 +1,63 @@
+from datetime import date
+
+from app import crud
+from app.models import Holiday
+
+
+def recurring_holiday(holiday_date: date, recurrence_pattern: str) -> Holiday:
+    return Holiday(
+        title="Holiday", holiday_date=holiday_date, is_recurring=True, recurrence_pattern=recurrence_pattern
+    )
+
+
+def test_add_months_clamps_to_month_end() -> None:
+    assert crud._add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
+    assert crud._add_months(date(2028, 1, 31), 1) == date(2028, 2, 29)
+    assert crud._add_months(date(2026, 1, 31), 3) == date(2026, 4, 30)
+    assert crud._add_months(date(2026, 1, 31), 2) == date(2026, 3, 31)
+
+
+def test_add_months_across_years() -> None:
+    assert crud._add_months(date(2026, 11, 15), 2) == date(2027, 1, 15)
+    assert crud._add_months(date(2026, 3, 15), -3) == date(2025, 12, 15)
+    assert crud._add_months(date(2028, 2, 29), 12) == date(2029, 2, 28)
+    assert crud._add_months(date(2028, 2, 29), 48) == date(2032, 2, 29)
+
+
+def test_generate_recurring_dates_monthly_keeps_the_31st() -> None:
+    holiday = recurring_holiday(date(2026, 1, 31), "monthly")
+    dates = crud.generate_recurring_dates(holiday, date(2026, 1, 1), date(2026, 5, 31))
+    assert dates == [
+        date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30), date(2026, 5, 31),
+    ]
+
+
+def test_generate_recurring_dates_yearly_feb_29() -> None:
+    holiday = recurring_holiday(date(2028, 2, 29), "yearly")
+    dates = crud.generate_recurring_dates(holiday, date(2028, 1, 1), date(2032, 12, 31))
+    assert dates == [
+        date(2028, 2, 29), date(2029, 2, 28), date(2030, 2, 28), date(2031, 2, 28), date(2032, 2, 29),
+    ]
+
+
+def test_generate_recurring_dates_range_is_inclusive() -> None:
+    holiday = recurring_holiday(date(2026, 1, 5), "weekly")
+    dates = crud.generate_recurring_dates(holiday, date(2026, 1, 12), date(2026, 1, 26))
+    assert dates == [date(2026, 1, 12), date(2026, 1, 19), date(2026, 1, 26)]
+    assert crud.generate_recurring_dates(holiday, date(2026, 1, 13), date(2026, 1, 25)) == [date(2026, 1, 19)]
+
+
+def test_generate_recurring_dates_skips_non_recurring() -> None:
+    holiday = Holiday(title="Holiday", holiday_date=date(2026, 1, 1), is_recurring=False)
+    assert crud.generate_recurring_dates(holiday, date(2026, 1, 1), date(2026, 12, 31)) == []
+    holiday = recurring_holiday(date(2026, 1, 1), "daily")
+    assert crud.generate_recurring_dates(holiday, date(2026, 1, 1), date(2026, 12, 31)) == [date(2026, 1, 1)]
+
+
+def test_holiday_occurrence_window() -> None:
+    years = crud.HOLIDAY_OCCURRENCE_YEARS
+    assert crud.holiday_occurrence_window(date(2026, 1, 1)) == (date(2026 - years, 1, 1), date(2026 + years, 12, 31))
+    assert crud.holiday_occurrence_window(date(2026, 12, 31)) == (date(2026 - years, 1, 1), date(2026 + years, 12, 31))
+    assert crud.holiday_occurrence_window(date(2026, 6, 15), extra_years=1) == (
+        date(2026 - years, 1, 1), date(2027 + years, 12, 31)
+    )
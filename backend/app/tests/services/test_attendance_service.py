@@ -0,0 +1,109 @@
+import random
+import string
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import (
+    Attendance, DepartmentCreate, Employee, EmployeeCreate, FingerprintPunch, ZKTecoDevice, ZKTecoDeviceCreate
+)
+from app.services.attendance_service import AttendanceService
+from app.tests.utils.utils import random_lower_string
+
+
+def random_digits(k: int) -> str:
+    return "".join(random.choices(string.digits, k=k))
+
+
+def create_random_employee(db: Session) -> Employee:
+    department = crud.create_department(
+        session=db, department_in=DepartmentCreate(name=random_lower_string())
+    )
+    employee_in = EmployeeCreate(
+        employee_id=random_digits(12),
+        cnic=f"{random_digits(5)}-{random_digits(7)}-{random_digits(1)}",
+        first_name=random_lower_string(),
+        last_name=random_lower_string(),
+        phone=random_digits(11),
+        hire_date=datetime(2025, 1, 1),
+        department_id=department.id,
+    )
+    return crud.create_employee(session=db, employee_in=employee_in)
+
+
+def create_random_device(db: Session) -> ZKTecoDevice:
+    device_in = ZKTecoDeviceCreate(
+        device_name=random_lower_string(), device_ip="10.0.0.1", device_id=random_lower_string()
+    )
+    return crud.create_zkteco_device(session=db, device_in=device_in)
+
+
+def get_employee_attendance(db: Session, employee: Employee) -> list[Attendance]:
+    db.expire_all()
+    return db.exec(select(Attendance).where(Attendance.employee_id == employee.id)).all()
+
+
+def test_mark_attendance_batch_check_in_and_out_in_one_batch(db: Session) -> None:
+    employee = create_random_employee(db)
+    device = create_random_device(db)
+    check_in = datetime(2026, 3, 2, 9, 0)
+    check_out = datetime(2026, 3, 2, 17, 30)
+    # Out of order: punches are applied by time, not by position
+    punches = [
+        FingerprintPunch(device_id=device.device_id, employee_device_id=employee.employee_id, timestamp=check_out),
+        FingerprintPunch(device_id=device.device_id, employee_device_id=employee.employee_id, timestamp=check_in),
+    ]
+    result = AttendanceService(db).mark_attendance_batch(punches)
+    assert result.checked_in == 1
+    assert result.checked_out == 1
+    assert result.rejected == []
+    [attendance] = get_employee_attendance(db, employee)
+    assert attendance.check_in_time == check_in
+    assert attendance.check_out_time == check_out
+    assert attendance.zkteco_device_id == device.id
+
+
+def test_mark_attendance_batch_checks_out_stored_attendance(db: Session) -> None:
+    employee = create_random_employee(db)
+    device = create_random_device(db)
+    check_in = datetime(2026, 3, 3, 8, 45)
+    check_out = datetime(2026, 3, 3, 16, 0)
+    service = AttendanceService(db)
+    first = service.mark_attendance_batch([
+        FingerprintPunch(device_id=device.device_id, employee_device_id=employee.employee_id, timestamp=check_in),
+    ])
+    assert (first.checked_in, first.checked_out) == (1, 0)
+    second = service.mark_attendance_batch([
+        FingerprintPunch(device_id=device.device_id, employee_device_id=employee.employee_id, timestamp=check_out),
+    ])
+    assert (second.checked_in, second.checked_out) == (0, 1)
+    [attendance] = get_employee_attendance(db, employee)
+    assert attendance.check_in_time == check_in
+    assert attendance.check_out_time == check_out
+
+
+def test_mark_attendance_batch_rejects_by_position(db: Session) -> None:
+    employee = create_random_employee(db)
+    device = create_random_device(db)
+    punches = [
+        FingerprintPunch(device_id=device.device_id, employee_device_id=random_digits(12), timestamp=datetime(2026, 3, 4, 9)),
+        FingerprintPunch(device_id=device.device_id, employee_device_id=employee.employee_id, timestamp=datetime(2026, 3, 4, 9)),
+        FingerprintPunch(device_id=random_lower_string(), employee_device_id=employee.employee_id, timestamp=datetime(2026, 3, 4, 10)),
+        FingerprintPunch(device_id=device.device_id, employee_device_id=employee.employee_id, timestamp=datetime(2026, 3, 4, 17)),
+        FingerprintPunch(device_id=device.device_id, employee_device_id=employee.employee_id, timestamp=datetime(2026, 3, 4, 18)),
+    ]
+    result = AttendanceService(db).mark_attendance_batch(punches)
+    assert result.checked_in == 1
+    assert result.checked_out == 1
+    assert [rejection.index for rejection in result.rejected] == [0, 2, 4]
+    assert "not found" in result.rejected[0].reason
+    assert "not found" in result.rejected[1].reason
+    assert "already complete" in result.rejected[2].reason
+    [attendance] = get_employee_attendance(db, employee)
+    assert attendance.check_out_time == datetime(2026, 3, 4, 17)
+
+
+def test_mark_attendance_batch_empty(db: Session) -> None:
+    result = AttendanceService(db).mark_attendance_batch([])
+    assert (result.checked_in, result.checked_out, result.rejected) == (0, 0, [])
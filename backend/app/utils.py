@@ -1,11 +1,16 @@
+import base64
+import hashlib
 import logging
+import re
+import uuid
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
 import emails  # type: ignore
 import jwt
+import pybase64
 from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
 
@@ -16,12 +21,71 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# [0-9], not \d, which would also accept non-ASCII digits
+_ISO_DATE_RE = re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})")
+
+
+def parse_iso_date(value: str) -> date:
+    """Parse YYYY-MM-DD with a precompiled regex, without strptime's format parsing."""
+    match = _ISO_DATE_RE.fullmatch(value)
+    if not match:
+        raise ValueError(f"Invalid date: {value!r}")
+    year, month, day = match.groups()
+    return date(int(year), int(month), int(day))
+
+
+def encode_cursor(sort_value: datetime, row_id: uuid.UUID) -> str:
+    """Opaque keyset cursor for the last row of a page sorted by (sort_value, id)."""
+    raw = f"{sort_value.isoformat()}|{row_id.hex}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor."""
+    sort_value, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(sort_value), uuid.UUID(hex=row_id)
+
+
+def make_etag(row_id: uuid.UUID, updated_at: datetime) -> str:
+    """Strong ETag for one version of a row, from its id and updated_at."""
+    digest = hashlib.blake2b(f"{row_id.hex}|{updated_at.isoformat()}".encode(), digest_size=8)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header names etag; weak comparison, as RFC 9110 asks."""
+    if not if_none_match:
+        return False
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(","))
+
+
 @dataclass
 class EmailData:
     html_content: str
     subject: str
 
 
+# A multiple of 3, so every chunk but the last encodes without padding
+_UPLOAD_CHUNK_SIZE = 3 * 64 * 1024
+
+
+def read_upload_base64(file: BinaryIO, max_bytes: int | None = None) -> str:
+    """Base64-encode an uploaded file a chunk at a time.
+
+    Holds one raw chunk next to the encoded output rather than the whole raw
+    file and its encoding at once. Raises ValueError as soon as more than
+    ``max_bytes`` have been read.
+    """
+    parts = []
+    size = 0
+    while chunk := file.read(_UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise ValueError(f"Upload exceeds {max_bytes} bytes")
+        parts.append(pybase64.b64encode(chunk))
+    return b"".join(parts).decode("ascii")
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
     template_str = (
         Path(__file__).parent / "email-templates" / "build" / template_name
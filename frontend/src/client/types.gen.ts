@@ -520,7 +520,7 @@ export type DepartmentsDeleteDepartmentData = {
     departmentId: string;
 };
 
-export type DepartmentsDeleteDepartmentResponse = (unknown);
+export type DepartmentsDeleteDepartmentResponse = (void);
 
 export type EmployeesReadEmployeesData = {
     /**
@@ -556,7 +556,7 @@ export type EmployeesDeleteEmployeeData = {
     employeeId: string;
 };
 
-export type EmployeesDeleteEmployeeResponse = (unknown);
+export type EmployeesDeleteEmployeeResponse = (void);
 
 export type EmployeesReadEmployeeByEmployeeIdData = {
     employeeId: string;
@@ -41,9 +41,8 @@ export const DeviceDetails: React.FC<DeviceDetailsProps> = ({ device, onClose, o
   const handleSync = async () => {
     setIsLoading(true);
     try {
-      const result = await AttendanceService.syncDeviceAttendance({ deviceId: device.id });
-      const recordsSynced = (result as any)?.records_synced || 0;
-      showToast('Success', `Sync completed: ${recordsSynced} records synced`, 'success');
+      await AttendanceService.syncDeviceAttendance({ deviceId: device.id });
+      showToast('Success', 'Sync started, records will appear shortly', 'success');
       onRefresh();
     } catch (error) {
       showToast('Error', 'Failed to sync device', 'error');